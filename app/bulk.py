@@ -0,0 +1,351 @@
+"""
+Bulk export / import of the social graph as JSON Lines.
+
+    python -m app.bulk export backup.jsonl.gz
+    python -m app.bulk import backup.jsonl.gz --batch-size 1000 --workers 4
+
+Every line is one entity: {"kind": ..., "props": {...}, ...relationship keys}. Exports
+stream straight from the driver to the (optionally gzipped, by ".gz" suffix) file, so
+memory stays flat regardless of graph size. Imports send `--batch-size` rows per
+UNWIND transaction with up to `--workers` transactions in flight, and MERGE on ids,
+so re-running an import is safe. Exports include password hashes: store them accordingly.
+Cache version counters (:CacheVersion) are not exported; an import bumps them instead.
+"""
+import argparse
+import contextlib
+import gzip
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from neo4j import Query
+
+from app import db, schema
+from app.cache import BUMP_CACHE_VERSIONS, DOMAINS
+
+# Properties stored as Neo4j datetimes; exported as ISO strings and parsed back on import
+TEMPORAL_FIELDS = ("created_at", "updated_at", "deleted_at", "flushed_at")
+
+# In dependency order: each kind only points at kinds exported before it
+EXPORTS = {
+    "user": """
+    MATCH (u:User)
+    RETURN properties(u) AS props
+    """,
+    "post": """
+    MATCH (u:User)-[:CREATED]->(p:Post)
+    RETURN properties(p) AS props, u.user_id AS author_id
+    """,
+    "comment": """
+    MATCH (u:User)-[:COMMENTED]->(c:Comment)-[:ON]->(p:Post)
+    OPTIONAL MATCH (c)-[:REPLIED_TO]->(parent:Comment)
+    RETURN properties(c) AS props, u.user_id AS author_id, p.id AS post_id, parent.id AS parent_id
+    """,
+    "reaction": """
+    MATCH (u:User)-[r:REACTED]->(p:Post)
+    RETURN properties(r) AS props, u.user_id AS user_id, p.id AS post_id
+    """,
+    "notification": """
+    MATCH (u:User)-[:HAS_NOTIFICATION]->(n:Notification)
+    RETURN properties(n) AS props, u.user_id AS user_id
+    """,
+    "post_mention": """
+    MATCH (p:Post)-[m:MENTIONS]->(u:User)
+    RETURN properties(m) AS props, p.id AS post_id, u.user_id AS user_id
+    """,
+    "comment_mention": """
+    MATCH (c:Comment)-[m:MENTIONS]->(u:User)
+    RETURN properties(m) AS props, c.id AS comment_id, u.user_id AS user_id
+    """,
+    # Unique-viewer sketches (app.views)
+    "post_views": """
+    MATCH (v:PostViews)
+    RETURN properties(v) AS props
+    """,
+    # Kept after their post is purged, for GET /posts/changes clients
+    "post_tombstone": """
+    MATCH (t:PostTombstone)
+    RETURN properties(t) AS props
+    """,
+}
+
+IMPORTS = {
+    "user": """
+    UNWIND $rows AS row
+    MERGE (u:User {user_id: row.props.user_id})
+    SET u += row.props
+    RETURN count(*) AS written
+    """,
+    "post": """
+    UNWIND $rows AS row
+    MATCH (u:User {user_id: row.author_id})
+    MERGE (p:Post {id: row.props.id})
+    SET p += row.props
+    MERGE (u)-[:CREATED]->(p)
+    RETURN count(*) AS written
+    """,
+    "comment": """
+    UNWIND $rows AS row
+    MATCH (u:User {user_id: row.author_id}), (p:Post {id: row.post_id})
+    MERGE (c:Comment {id: row.props.id})
+    SET c += row.props
+    MERGE (u)-[:COMMENTED]->(c)
+    MERGE (c)-[:ON]->(p)
+    RETURN count(*) AS written
+    """,
+    # Runs after every comment exists, so a reply never arrives before its parent
+    "reply": """
+    UNWIND $rows AS row
+    MATCH (c:Comment {id: row.id}), (parent:Comment {id: row.parent_id})
+    MERGE (c)-[:REPLIED_TO]->(parent)
+    RETURN count(*) AS written
+    """,
+    "reaction": """
+    UNWIND $rows AS row
+    MATCH (u:User {user_id: row.user_id}), (p:Post {id: row.post_id})
+    MERGE (u)-[r:REACTED]->(p)
+    SET r += row.props
+    RETURN count(*) AS written
+    """,
+    "notification": """
+    UNWIND $rows AS row
+    MATCH (u:User {user_id: row.user_id})
+    MERGE (n:Notification {id: row.props.id})
+    SET n += row.props
+    MERGE (u)-[:HAS_NOTIFICATION]->(n)
+    RETURN count(*) AS written
+    """,
+    "post_mention": """
+    UNWIND $rows AS row
+    MATCH (p:Post {id: row.post_id}), (u:User {user_id: row.user_id})
+    MERGE (p)-[m:MENTIONS]->(u)
+    SET m += row.props
+    RETURN count(*) AS written
+    """,
+    "comment_mention": """
+    UNWIND $rows AS row
+    MATCH (c:Comment {id: row.comment_id}), (u:User {user_id: row.user_id})
+    MERGE (c)-[m:MENTIONS]->(u)
+    SET m += row.props
+    RETURN count(*) AS written
+    """,
+    "post_views": """
+    UNWIND $rows AS row
+    MERGE (v:PostViews {post_id: row.props.post_id})
+    SET v += row.props
+    RETURN count(*) AS written
+    """,
+    "post_tombstone": """
+    UNWIND $rows AS row
+    MERGE (t:PostTombstone {post_id: row.props.post_id})
+    SET t += row.props
+    RETURN count(*) AS written
+    """,
+}
+
+
+def open_file(path: str, mode: str):
+    """Text-mode file, gzipped when the name ends in .gz; "-" is stdin/stdout."""
+    if path == "-":
+        return contextlib.nullcontext(sys.stdout if "w" in mode else sys.stdin)
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows} rows in {seconds:.1f}s ({rows / seconds if seconds else 0:.0f} rows/s)"
+
+
+# ===========================
+# ✅ EXPORT
+# ===========================
+def _to_json(props: dict) -> dict:
+    out = {}
+    for key, value in props.items():
+        if hasattr(value, "to_native"):
+            value = value.to_native()
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        out[key] = value
+    return out
+
+
+def export_graph(path: str) -> dict:
+    counts = {}
+    started = time.perf_counter()
+    with open_file(path, "w") as out, db.open_session(read=True) as session:
+        for kind, query in EXPORTS.items():
+            kind_started = time.perf_counter()
+            rows = 0
+            # Iterating the result streams records in fetch_size chunks instead of loading them all
+            for record in session.run(Query(query, metadata={"query_name": f"bulk.export_{kind}"})):
+                line = {"kind": kind, **{k: v for k, v in record.items() if v is not None}}
+                line["props"] = _to_json(record["props"])
+                out.write(json.dumps(line, separators=(",", ":")) + "\n")
+                rows += 1
+            counts[kind] = rows
+            print(f"📤 {kind}: {_rate(rows, time.perf_counter() - kind_started)}", file=sys.stderr)
+    total = sum(counts.values())
+    print(f"✅ Exported {_rate(total, time.perf_counter() - started)}", file=sys.stderr)
+    return counts
+
+
+# ===========================
+# ✅ IMPORT
+# ===========================
+def _from_json(props: dict) -> dict:
+    for key in TEMPORAL_FIELDS:
+        if isinstance(props.get(key), str):
+            props[key] = datetime.fromisoformat(props[key])
+    return props
+
+
+class BatchWriter:
+    """Sends UNWIND batches for one kind with at most `workers` transactions in flight."""
+
+    def __init__(self, executor: ThreadPoolExecutor, workers: int, batch_size: int):
+        self.executor = executor
+        self.workers = workers
+        self.batch_size = batch_size
+        self.pending = set()
+        self.written = 0
+        self.rows = 0
+
+    def _write(self, kind: str, rows: list) -> int:
+        # No bookmarks: batches are independent and nothing reads them back mid-import
+        result = db.execute_query(f"bulk.import_{kind}", IMPORTS[kind], {"rows": rows}, bookmark_manager_=None)
+        return result.records[0]["written"]
+
+    def submit(self, kind: str, rows: list):
+        while len(self.pending) >= self.workers:
+            done, self.pending = wait(self.pending, return_when=FIRST_COMPLETED)
+            self._collect(done)
+        self.rows += len(rows)
+        self.pending.add(self.executor.submit(self._write, kind, rows))
+
+    def drain(self):
+        done, _ = wait(self.pending)
+        self.pending = set()
+        self._collect(done)
+
+    def _collect(self, futures):
+        for future in futures:
+            self.written += future.result()
+
+    def write_all(self, kind: str, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.submit(kind, batch)
+                batch = []
+        if batch:
+            self.submit(kind, batch)
+        self.drain()
+
+
+def _lines_by_kind(lines):
+    """Yield (kind, rows) chunks of consecutive lines of the same kind."""
+    current, rows = None, []
+    for line in lines:
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        kind = row.pop("kind")
+        if kind not in IMPORTS:
+            raise ValueError(f"Unknown kind {kind!r}")
+        if kind != current and rows:
+            yield current, rows
+            rows = []
+        current = kind
+        rows.append(row)
+        # Hand over full chunks without waiting for the kind to end
+        if len(rows) >= 10_000:
+            yield current, rows
+            rows = []
+    if rows:
+        yield current, rows
+
+
+def import_graph(path: str, batch_size: int, workers: int, setup_schema: bool = True) -> dict:
+    if setup_schema:
+        # MERGE on ids needs the id indexes, or every row scans its label
+        schema.ensure_schema()
+
+    stats = {}
+    replies = []
+    started = time.perf_counter()
+
+    def report(kind, writer, kind_started):
+        stats[kind] = {"rows": writer.rows, "written": writer.written}
+        skipped = writer.rows - writer.written
+        note = f", {skipped} skipped (missing endpoints)" if skipped else ""
+        print(f"📥 {kind}: {_rate(writer.rows, time.perf_counter() - kind_started)}{note}", file=sys.stderr)
+
+    with open_file(path, "r") as src, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk") as pool:
+        writer, kind_started, current = None, None, None
+        for kind, rows in _lines_by_kind(src):
+            if kind != current:
+                # Kinds depend on earlier ones, so finish one before starting the next
+                if writer is not None:
+                    report(current, writer, kind_started)
+                writer, kind_started, current = BatchWriter(pool, workers, batch_size), time.perf_counter(), kind
+            for row in rows:
+                _from_json(row["props"])
+                if kind == "comment" and row.get("parent_id"):
+                    replies.append({"id": row["props"]["id"], "parent_id": row["parent_id"]})
+            writer.write_all(kind, rows)
+        if writer is not None:
+            report(current, writer, kind_started)
+
+        if replies:
+            writer, kind_started = BatchWriter(pool, workers, batch_size), time.perf_counter()
+            writer.write_all("reply", replies)
+            report("reply", writer, kind_started)
+
+    # Every worker's in-process caches predate the import
+    db.execute_query(
+        "bulk.bump_cache_versions",
+        BUMP_CACHE_VERSIONS,
+        {"cache_domains": list(DOMAINS)},
+    )
+    total = sum(s["rows"] for s in stats.values())
+    print(f"✅ Imported {_rate(total, time.perf_counter() - started)}", file=sys.stderr)
+    return stats
+
+
+# ===========================
+# ✅ CLI
+# ===========================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.bulk", description="Export or import the graph as JSONL.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export", help="stream the graph to a JSONL file (.gz to compress, - for stdout)")
+    export_cmd.add_argument("path")
+
+    import_cmd = commands.add_parser("import", help="load a JSONL export with batched UNWIND writes")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument("--batch-size", type=int, default=1000, help="rows per transaction")
+    import_cmd.add_argument("--workers", type=int, default=4, help="transactions in flight")
+    import_cmd.add_argument("--skip-schema", action="store_true", help="don't create missing indexes first")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        if args.command == "export":
+            export_graph(args.path)
+        else:
+            import_graph(args.path, args.batch_size, args.workers, setup_schema=not args.skip_schema)
+    finally:
+        db.close_driver()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
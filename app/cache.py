@@ -0,0 +1,219 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import CACHE_COHERENCE_INTERVAL_MS, CACHE_TTL_S, CACHE_BUMP_INTERVAL_MS
+from app.metrics import Counter
+
+# In-process caches kept coherent across uvicorn workers with version counters stored
+# in Neo4j: after a write, `coherence.bump(domain)` drops this worker's entries at once
+# and queues the domain; a background thread bumps the queued (:CacheVersion {domain})
+# counters in one short transaction every CACHE_BUMP_INTERVAL_MS. The counters are never
+# touched inside a write's own transaction, so writes do not queue behind each other on
+# the counter node's lock. Each worker reads all counters in one query at most every
+# CACHE_COHERENCE_INTERVAL_MS, dropping local entries of any domain whose counter moved,
+# so other workers see a write within the sum of both intervals (the TTL bounds it if a
+# bump is lost).
+
+DOMAINS = ("posts", "comments", "reactions", "users")
+
+# Standalone query with a `cache_domains` parameter
+BUMP_CACHE_VERSIONS = """
+UNWIND $cache_domains AS domain
+MERGE (v:CacheVersion {domain: domain})
+ON CREATE SET v.version = 1
+ON MATCH SET v.version = v.version + 1
+RETURN count(v) AS bumped
+"""
+
+cache_requests = Counter(
+    "local_cache_requests_total",
+    "In-process cache lookups by cache and result.",
+    ("cache", "result"),
+)
+cache_invalidations = Counter(
+    "local_cache_invalidations_total",
+    "In-process cache invalidations by cache and reason.",
+    ("cache", "reason"),
+)
+
+_MISSING = object()
+
+
+class LocalCache:
+    """
+    Bounded LRU cache with a TTL safety net. `domains` are the graph domains whose
+    writes make its entries stale.
+
+    `generation` moves on every invalidation. A loader reads it before querying and
+    passes it to `set`, so a result read before a write that was invalidated meanwhile
+    is dropped instead of cached until its TTL.
+    """
+
+    def __init__(self, name: str, domains: tuple, maxsize: int = 1024, ttl: float = CACHE_TTL_S):
+        self.name = name
+        self.domains = tuple(domains)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        coherence.register(self)
+
+    def get(self, key, default=None):
+        coherence.maybe_sync()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] > now:
+                self._data.move_to_end(key)
+                cache_requests.inc(cache=self.name, result="hit")
+                return entry[0]
+            if entry is not _MISSING:
+                del self._data[key]
+        cache_requests.inc(cache=self.name, result="miss")
+        return default
+
+    def set(self, key, value, generation: int | None = None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                cache_invalidations.inc(cache=self.name, reason="stale_load")
+                return
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key=_MISSING, reason: str = "explicit"):
+        with self._lock:
+            self.generation += 1
+            if key is _MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+        cache_invalidations.inc(cache=self.name, reason=reason)
+
+    def items(self) -> list:
+        """Unexpired (key, value) pairs, least recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (value, expires) in self._data.items() if expires > now]
+
+    def restore(self, items):
+        """Load (key, value) pairs saved by `items`, e.g. from a warm snapshot (app.warm_snapshot)."""
+        for key, value in items:
+            self.set(key, value)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CacheCoherence:
+    """Tracks the last seen version per domain and invalidates registered caches."""
+
+    def __init__(self, interval_ms: float, bump_interval_ms: float):
+        self.interval = interval_ms / 1000
+        self.bump_interval = bump_interval_ms / 1000
+        self.versions = {}
+        self.caches = []
+        self._last_sync = 0.0
+        self._sync_lock = threading.Lock()
+        # Set once `versions` reflects the graph (a sync succeeded or a snapshot was restored)
+        self.synced = False
+        self._pending_bumps = set()
+        self._bump_lock = threading.Lock()
+        self._bump_thread = None
+
+    def register(self, cache: LocalCache):
+        self.caches.append(cache)
+
+    def invalidate_local(self, *domains, reason: str = "local_write"):
+        """Drop this worker's entries right after its own write, without waiting for a sync."""
+        for cache in self.caches:
+            if set(domains) & set(cache.domains):
+                cache.invalidate(reason=reason)
+
+    def bump(self, *domains):
+        """
+        Record a committed write: this worker's entries are dropped now, other workers'
+        at their next sync after the queued version bump has been written.
+        """
+        self.invalidate_local(*domains)
+        with self._bump_lock:
+            self._pending_bumps.update(domains)
+            if self._bump_thread is None:
+                self._bump_thread = threading.Thread(target=self._run_bumps, name="cache-bumps", daemon=True)
+                self._bump_thread.start()
+
+    def flush_bumps(self):
+        """Write the queued version bumps now; on failure they stay queued for the next attempt."""
+        from app.db import execute_query
+
+        with self._bump_lock:
+            domains, self._pending_bumps = self._pending_bumps, set()
+        if not domains:
+            return
+        try:
+            execute_query("cache.bump_versions", BUMP_CACHE_VERSIONS, {"cache_domains": sorted(domains)})
+        except Exception:
+            with self._bump_lock:
+                self._pending_bumps.update(domains)
+            raise
+
+    def _run_bumps(self):
+        while True:
+            time.sleep(self.bump_interval)
+            try:
+                self.flush_bumps()
+            except Exception as e:
+                print(f"⚠️ Cache version bump failed, retrying: {e}")
+
+    def restore(self, versions: dict, hold: float):
+        """
+        Adopt the versions a warm snapshot was taken at. The next check against the
+        graph waits up to `hold` seconds, so restored entries are served while the
+        database connection is still being set up.
+        """
+        self.versions = dict(versions)
+        self.synced = True
+        self._last_sync = time.monotonic() + max(0.0, hold - self.interval)
+
+    def maybe_sync(self):
+        if time.monotonic() - self._last_sync < self.interval:
+            return
+        # One thread syncs; concurrent requests keep serving from the current entries
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self.sync()
+        finally:
+            self._sync_lock.release()
+
+    def sync(self):
+        from app.db import read_query
+
+        self._last_sync = time.monotonic()
+        query = """
+        MATCH (v:CacheVersion)
+        WHERE v.domain IN $domains
+        RETURN v.domain AS domain, v.version AS version
+        """
+        try:
+            result = read_query("cache.versions", query, {"domains": list(DOMAINS)})
+        except Exception as e:
+            # Entries still expire by TTL; try again next interval
+            print(f"⚠️ Cache coherence check failed: {e}")
+            return
+
+        self.synced = True
+        changed = set()
+        for record in result.records:
+            domain, version = record["domain"], record["version"]
+            if self.versions.get(domain) != version:
+                changed.add(domain)
+                self.versions[domain] = version
+        if changed:
+            self.invalidate_local(*changed, reason="remote_write")
+
+
+coherence = CacheCoherence(CACHE_COHERENCE_INTERVAL_MS, CACHE_BUMP_INTERVAL_MS)
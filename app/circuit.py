@@ -0,0 +1,229 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+
+from app.config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_SLOW_QUERY_MS,
+    CIRCUIT_OPEN_S,
+    CIRCUIT_HALF_OPEN_PROBES,
+    STALE_MAX_AGE_S,
+)
+from app.metrics import Counter, Gauge
+
+# Circuit breaker around every query (app.db._observe). Consecutive outage errors or
+# slow request-path queries open it (background work such as purge passes, backfills
+# and bulk imports is slow by design and does not count toward latency); while open, queries fail at once with CircuitOpenError instead
+# of piling up on a dead or overloaded AuraDB. After CIRCUIT_OPEN_S a few half-open
+# probes go through: a healthy probe closes the circuit, a failed one re-opens it.
+#
+# Public reads that can live with old data (feed, comments, reaction counts) keep their
+# last good result in a LastGood store and serve it while the database is unavailable,
+# with an X-Stale-Age header. Every other route answers 503 right away while the
+# circuit is open.
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STALE_HEADER = "X-Stale-Age"
+
+# Errors that say the database is unreachable. Anything else came back from a working
+# server: a constraint violation, a bad query, or a TransientError such as a deadlock or
+# lock timeout, which is contention on a few hot nodes rather than an outage.
+OUTAGE_ERRORS = (ServiceUnavailable, SessionExpired, TimeoutError, ConnectionError)
+
+circuit_state = Gauge("db_circuit_state", "Database circuit breaker state (0 closed, 1 half-open, 2 open).")
+circuit_transitions = Counter(
+    "db_circuit_transitions_total",
+    "Database circuit breaker state changes by new state.",
+    ("state",),
+)
+circuit_rejections = Counter("db_circuit_rejected_queries_total", "Queries failed fast while the circuit was open.")
+stale_responses = Counter(
+    "stale_responses_total",
+    "Reads answered from the last good result while the database was unavailable.",
+    ("store",),
+)
+
+
+class CircuitOpenError(ServiceUnavailable):
+    """Raised instead of running a query while the circuit is open."""
+
+
+def is_outage(error: Exception) -> bool:
+    return isinstance(error, OUTAGE_ERRORS)
+
+
+def unavailable(retry_after: float = CIRCUIT_OPEN_S) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Database temporarily unavailable. Please retry shortly.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, slow_query_ms: float, open_s: float, half_open_probes: int):
+        self.failure_threshold = failure_threshold
+        self.slow_query = slow_query_ms / 1000
+        self.open_s = open_s
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            circuit_transitions.inc(state=state)
+            circuit_state.set({CLOSED: 0, HALF_OPEN: 1, OPEN: 2}[state])
+            print(f"🔌 Database circuit {state}" + (f" ({self.last_error})" if state == OPEN else ""))
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.open_s - time.monotonic())
+
+    def is_open(self) -> bool:
+        """True while queries are being refused (open and not yet due for a probe)."""
+        return self.state == OPEN and self.retry_after() > 0
+
+    def before_query(self) -> bool:
+        """Admit a query or raise CircuitOpenError; returns True if the query is a half-open probe."""
+        with self._lock:
+            if self.state == OPEN and self.retry_after() <= 0:
+                self._set_state(HALF_OPEN)
+                self.probes = 0
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self.probes < self.half_open_probes:
+                self.probes += 1
+                return True
+        circuit_rejections.inc()
+        raise CircuitOpenError("Database circuit is open")
+
+    def after_query(self, elapsed: float, error: Exception | None, probe: bool, timed: bool = True):
+        """Record a query's outcome; its latency only counts if `timed` (a request-path query)."""
+        slow = timed and error is None and elapsed >= self.slow_query
+        failed = (error is not None and is_outage(error)) or slow
+        with self._lock:
+            if probe:
+                self.probes -= 1
+            if not failed:
+                self.failures = 0
+                if self.state == HALF_OPEN and probe:
+                    self._set_state(CLOSED)
+                return
+            self.failures += 1
+            self.last_error = repr(error) if error is not None else f"slow query {elapsed * 1000:.0f}ms"
+            if probe or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_after_s": round(self.retry_after(), 1) if self.state == OPEN else 0,
+            "last_error": self.last_error,
+        }
+
+
+breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_SLOW_QUERY_MS, CIRCUIT_OPEN_S, CIRCUIT_HALF_OPEN_PROBES)
+
+
+# ===========================
+# ✅ STALE-WHILE-UNAVAILABLE READS
+# ===========================
+_request_staleness: ContextVar[dict | None] = ContextVar("request_staleness", default=None)
+
+
+class LastGood:
+    """Bounded store of the last successful result per key, for serving while the database is down."""
+
+    def __init__(self, name: str, maxsize: int = 1024, max_age: float = STALE_MAX_AGE_S):
+        self.name = name
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def call(self, key, fn):
+        """
+        Return `fn()` and remember it. If the database is unavailable, return the last
+        good result for `key` instead (and mark the response stale), or raise a 503.
+        """
+        try:
+            value = fn()
+        except Exception as e:
+            if not is_outage(e):
+                raise
+            with self._lock:
+                entry = self._data.get(key)
+            age = time.time() - entry[1] if entry else None
+            if entry is None or age > self.max_age:
+                raise unavailable(breaker.retry_after() or CIRCUIT_OPEN_S) from e
+            stale_responses.inc(store=self.name)
+            staleness = _request_staleness.get()
+            if staleness is not None:
+                staleness["age"] = max(staleness.get("age", 0), age)
+            return entry[0]
+
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+
+def serves_stale(endpoint):
+    """Mark a route whose controller falls back to a LastGood store, so it stays up while the circuit is open."""
+    endpoint.serves_stale = True
+    return endpoint
+
+
+def circuit_guard(request: Request):
+    """Router-level dependency: fail fast with 503 while the circuit is open, except on stale-capable routes."""
+    if not breaker.is_open():
+        return
+    endpoint = request.scope.get("endpoint")
+    if getattr(endpoint, "serves_stale", False):
+        return
+    raise unavailable(breaker.retry_after())
+
+
+async def outage_exception_handler(request: Request, exc: Exception):
+    """Outage errors that escape a controller become a 503 with Retry-After instead of a 500."""
+    error = unavailable(breaker.retry_after() or CIRCUIT_OPEN_S)
+    return JSONResponse({"detail": error.detail}, status_code=error.status_code, headers=error.headers)
+
+
+class StalenessMiddleware:
+    """ASGI middleware adding X-Stale-Age (seconds) to responses served from a LastGood store."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # A mutable holder: sync routes run in a worker thread with a copy of this context
+        staleness = {}
+        _request_staleness.set(staleness)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and "age" in staleness:
+                headers = list(message.get("headers", []))
+                headers.append((STALE_HEADER.encode("latin-1"), str(math.ceil(staleness["age"])).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
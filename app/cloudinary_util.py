@@ -1,15 +1,50 @@
-import cloudinary
-import cloudinary.uploader
 import os
+import re
+import time
+from urllib.parse import urlparse
 from fastapi import UploadFile, HTTPException
+from app import request_costs
+from app.metrics import cloudinary_upload_seconds
+
+_uploader = None
+_api = None
+
+# Cloudinary's Admin API deletes at most this many assets per call
+DELETE_BATCH = 100
+_VERSION = re.compile(r"v\d+")
+
+
+def get_uploader():
+    """
+    Import and configure Cloudinary on first use; most requests never upload an image,
+    so it stays out of the cold-start import path.
+    """
+    global _uploader
+    if _uploader is None:
+        import cloudinary
+        import cloudinary.uploader
+
+        # Configure Cloudinary
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+            secure=True
+        )
+        _uploader = cloudinary.uploader
+    return _uploader
+
+
+def get_api():
+    """Cloudinary Admin API (bulk deletes), configured the same way on first use."""
+    global _api
+    if _api is None:
+        get_uploader()
+        import cloudinary.api
+
+        _api = cloudinary.api
+    return _api
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
 
 async def upload_image(file: UploadFile, folder: str = "drawsphere") -> dict:
     """
@@ -20,15 +55,26 @@ async def upload_image(file: UploadFile, folder: str = "drawsphere") -> dict:
         contents = await file.read()
         
         # Upload to Cloudinary
-        result = cloudinary.uploader.upload(
-            contents,
-            folder=folder,
-            resource_type="auto",
-            transformation=[
-                {"width": 1200, "height": 1200, "crop": "limit"},
-                {"quality": "auto:good"}
-            ]
-        )
+        uploader = get_uploader()
+        start = time.perf_counter()
+        try:
+            result = uploader.upload(
+                contents,
+                folder=folder,
+                resource_type="auto",
+                transformation=[
+                    {"width": 1200, "height": 1200, "crop": "limit"},
+                    {"quality": "auto:good"}
+                ]
+            )
+        except Exception:
+            elapsed = time.perf_counter() - start
+            cloudinary_upload_seconds.observe(elapsed, folder=folder, outcome="error")
+            request_costs.add_cloudinary(elapsed)
+            raise
+        elapsed = time.perf_counter() - start
+        cloudinary_upload_seconds.observe(elapsed, folder=folder, outcome="ok")
+        request_costs.add_cloudinary(elapsed)
         
         return {
             "url": result.get("secure_url"),
@@ -44,9 +90,49 @@ def delete_image(public_id: str) -> bool:
     """
     Delete an image from Cloudinary by public_id
     """
+    start = time.perf_counter()
     try:
-        result = cloudinary.uploader.destroy(public_id)
+        result = get_uploader().destroy(public_id)
         return result.get("result") == "ok"
     except Exception as e:
         print(f"❌ Cloudinary delete error: {e}")
         return False
+    finally:
+        request_costs.add_cloudinary(time.perf_counter() - start)
+
+
+def public_id_from_url(url: str) -> str | None:
+    """
+    Recover the public_id from a delivery URL (only URLs are stored in the graph):
+    .../image/upload/[transformations/]v123/drawsphere/posts/abc.jpg -> drawsphere/posts/abc
+    """
+    if not url:
+        return None
+    _, found, rest = urlparse(url).path.partition("/upload/")
+    if not found:
+        return None
+    parts = rest.split("/")
+    for i, part in enumerate(parts):
+        if _VERSION.fullmatch(part):
+            parts = parts[i + 1:]
+            break
+    return os.path.splitext("/".join(parts))[0] or None
+
+
+def delete_images(public_ids: list) -> list:
+    """
+    Delete assets in bulk, DELETE_BATCH per Admin API call.
+    Returns the public_ids that could not be deleted, so the caller can retry them.
+    """
+    failed = []
+    for i in range(0, len(public_ids), DELETE_BATCH):
+        chunk = public_ids[i:i + DELETE_BATCH]
+        try:
+            result = get_api().delete_resources(chunk)
+            deleted = result.get("deleted", {})
+            # "not_found" means it is already gone, which is what we wanted
+            failed.extend(pid for pid in chunk if deleted.get(pid) not in ("deleted", "not_found"))
+        except Exception as e:
+            print(f"❌ Cloudinary bulk delete error: {e}")
+            failed.extend(chunk)
+    return failed
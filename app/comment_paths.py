@@ -0,0 +1,110 @@
+import time
+
+from app.cache import coherence
+from app.config import COMMENT_PATH_BACKFILL_BATCH
+
+# Comment threads are stored as materialized paths. Every comment carries `post_id`,
+# `depth` (0 for a top-level comment, replies also keep `parent_id`) and `path`: its
+# parent's path + "/" + one segment per level. A segment is the creation time in epoch
+# milliseconds, zero-padded to 13 digits, then the first 8 characters of the comment
+# id, so ordering by path gives the whole thread depth-first, siblings oldest first. A thread, or any comment's
+# subtree, is one range seek on the (post_id, path) index (see app.schema):
+#
+#   subtree of X:  X.path + "/" < path < X.path + "0"   ("0" sorts right after "/")
+#
+# Comments written before paths existed are filled in by `backfill` at startup, top
+# level first and then one reply level per pass. A reply to such a comment fills in its
+# parent chain in the same write (`fill_chain_paths`), so it is readable right away.
+
+PATH_SEPARATOR = "/"
+# Upper bound of a subtree range: the character after PATH_SEPARATOR
+PATH_END = "0"
+# Upper bound of a whole post's range: above every digit and hex letter
+THREAD_END = "~"
+
+
+def path_segment(created_at: str, comment_id: str) -> str:
+    """Cypher expression for one path segment, from expressions for the comment's created_at and id."""
+    return f"right('0000000000000' + toString({created_at}.epochMillis), 13) + substring({comment_id}, 0, 8)"
+
+
+def parent_path(path: str) -> str | None:
+    head, sep, _ = path.rpartition(PATH_SEPARATOR)
+    return head if sep else None
+
+
+def backfill_created_at(node: str) -> str:
+    """Comments without created_at still get a path, sorted before their siblings."""
+    return f"coalesce({node}.created_at, datetime({{epochMillis: 0}}))"
+
+
+def fill_chain_paths(parent: str, post: str) -> str:
+    """
+    Cypher giving `parent` and its ancestors the post_id, depth and path `backfill` would
+    give them, if `parent` was written before paths existed. A unit subquery: the row
+    passes through unchanged and later clauses see `parent.path` set.
+    """
+    return f"""
+    CALL {{
+        WITH {parent}, {post}
+        WITH {parent}, {post} WHERE {parent}.path IS NULL
+        MATCH chain = ({parent})-[:REPLIED_TO*0..]->(root:Comment)
+        WHERE NOT EXISTS {{ MATCH (root)-[:REPLIED_TO]->(:Comment) }}
+        WITH {post}, reverse(nodes(chain)) AS ancestors
+        WITH {post}, ancestors, [a IN ancestors | {path_segment(backfill_created_at("a"), "a.id")}] AS segments
+        UNWIND range(0, size(ancestors) - 1) AS i
+        WITH {post}, ancestors[i] AS a, i, CASE WHEN i > 0 THEN ancestors[i - 1].id END AS parent_id,
+             reduce(s = segments[0], j IN range(1, i) | s + '{PATH_SEPARATOR}' + segments[j]) AS derived
+        WHERE a.path IS NULL
+        SET a.post_id = {post}.id,
+            a.parent_id = parent_id,
+            a.depth = i,
+            a.path = derived
+    }}
+    """
+
+
+BACKFILL_STEPS = [
+    ("top_level", """
+    MATCH (c:Comment)-[:ON]->(p:Post)
+    WHERE c.path IS NULL AND NOT EXISTS { MATCH (c)-[:REPLIED_TO]->(:Comment) }
+    WITH c, p LIMIT $batch
+    SET c.post_id = p.id,
+        c.depth = 0,
+        c.path = """ + path_segment(backfill_created_at("c"), "c.id") + """
+    RETURN count(c.path) AS updated
+    """),
+    # Only replies whose parent already has a path; deeper levels follow on later passes
+    ("replies", """
+    MATCH (c:Comment)-[:REPLIED_TO]->(parent:Comment)
+    WHERE c.path IS NULL AND parent.path IS NOT NULL
+    WITH c, parent LIMIT $batch
+    SET c.post_id = parent.post_id,
+        c.parent_id = parent.id,
+        c.depth = parent.depth + 1,
+        c.path = parent.path + '""" + PATH_SEPARATOR + """' + """ + path_segment(backfill_created_at("c"), "c.id") + """
+    RETURN count(c.path) AS updated
+    """),
+]
+
+
+def backfill(batch_size: int = COMMENT_PATH_BACKFILL_BATCH) -> int:
+    """Give every comment without a path its post_id, depth and path. Returns the number updated."""
+    from app.db import execute_query
+
+    started = time.perf_counter()
+    total = 0
+    while True:
+        # Only comments that actually got a path count, so a pass that fills none ends the loop
+        progress = 0
+        for step, query in BACKFILL_STEPS:
+            updated = execute_query(f"comments.backfill_{step}", query, {"batch": batch_size}).records[0]["updated"]
+            progress += updated
+        total += progress
+        if not progress:
+            break
+
+    if total:
+        coherence.bump("comments")
+        print(f"🧵 Backfilled paths of {total} comments in {time.perf_counter() - started:.1f}s")
+    return total
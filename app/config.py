@@ -8,8 +8,164 @@ load_dotenv()
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
-NEO4J_DATABASE = os.getenv("NEO4J_DATABASE")
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or "neo4j"
 
 # Safety check
 if not all([NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD]):
     raise ValueError("❌ Missing Neo4j environment variables. Check your .env file.")
+
+# Neo4j driver pool
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+NEO4J_ACQUISITION_TIMEOUT_S = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT_S", "60"))
+NEO4J_CONNECTION_TIMEOUT_S = float(os.getenv("NEO4J_CONNECTION_TIMEOUT_S", "30"))
+NEO4J_MAX_CONNECTION_LIFETIME_S = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME_S", "3600"))
+# Connections idle longer than this are pinged before reuse (empty = never).
+# AuraDB closes idle connections, so a stale one otherwise surfaces as a failed query.
+NEO4J_LIVENESS_CHECK_S = float(os.getenv("NEO4J_LIVENESS_CHECK_S")) if os.getenv("NEO4J_LIVENESS_CHECK_S") else None
+
+# Admission control
+# Per-client token buckets: "<tokens per second>:<burst>" applied to every route,
+# with per-route overrides keyed by route template, e.g.
+# RATE_LIMITS="POST /reactions/=1:5;GET /reactions/=0.5:3"
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "5:20")
+RATE_LIMITS = os.getenv(
+    "RATE_LIMITS",
+    "POST /reactions/=2:10;GET /reactions/=0.5:3;POST /users/login=0.2:5;GET /users/suggest=20:40",
+)
+# IP buckets are shared by everyone behind the same NAT, so they get a larger burst
+RATE_LIMIT_IP_MULTIPLIER = float(os.getenv("RATE_LIMIT_IP_MULTIPLIER", "4"))
+
+# Global concurrency limit (keep below anyio's default threadpool of 40)
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "32"))
+MAX_QUEUE_WAIT_MS = int(os.getenv("MAX_QUEUE_WAIT_MS", "2000"))
+
+# Query diagnostics
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Fraction of slow queries re-run under PROFILE (in a rolled-back transaction)
+SLOW_QUERY_PROFILE_RATE = float(os.getenv("SLOW_QUERY_PROFILE_RATE", "0.05"))
+# The /debug routes are off unless enabled, and then only open to these user ids
+DEBUG_QUERIES_ENABLED = os.getenv("DEBUG_QUERIES_ENABLED", "false").lower() == "true"
+DEBUG_ADMIN_USER_IDS = {
+    user_id.strip() for user_id in os.getenv("DEBUG_ADMIN_USER_IDS", "").split(",") if user_id.strip()
+}
+
+# Startup
+# Connectivity check and pool warm-up run in the background after the server starts
+DB_CONNECT_TIMEOUT_S = float(os.getenv("DB_CONNECT_TIMEOUT_S", "10"))
+DB_WARM_CONNECTIONS = int(os.getenv("DB_WARM_CONNECTIONS", "2"))
+
+# In-process caches
+# Each worker checks the graph's cache version counters at most this often
+CACHE_COHERENCE_INTERVAL_MS = float(os.getenv("CACHE_COHERENCE_INTERVAL_MS", "500"))
+# Upper bound on staleness if a coherence check fails
+CACHE_TTL_S = float(os.getenv("CACHE_TTL_S", "300"))
+# Writes bump the graph's version counters from a background thread, batched this often
+CACHE_BUMP_INTERVAL_MS = float(os.getenv("CACHE_BUMP_INTERVAL_MS", "200"))
+
+# Schema
+# Indexes are created with IF NOT EXISTS during startup; disable where the app user lacks schema rights
+SCHEMA_SETUP_ENABLED = os.getenv("SCHEMA_SETUP_ENABLED", "true").lower() == "true"
+
+# Trending posts
+# A reaction or comment counts half as much after this many hours
+TRENDING_HALF_LIFE_H = float(os.getenv("TRENDING_HALF_LIFE_H", "6"))
+# Reconciliation only looks at activity this recent (older events have decayed to ~nothing)
+TRENDING_WINDOW_H = float(os.getenv("TRENDING_WINDOW_H", "48"))
+# How often each worker rebuilds its scores from the graph (picks up other workers' activity)
+TRENDING_RECONCILE_S = float(os.getenv("TRENDING_RECONCILE_S", "300"))
+# Posts tracked per worker; the lowest score is evicted beyond this
+TRENDING_CAPACITY = int(os.getenv("TRENDING_CAPACITY", "500"))
+
+# Deletes
+# Deletes only mark entities; the purger removes them and their subtrees in the background
+PURGE_INTERVAL_S = float(os.getenv("PURGE_INTERVAL_S", "30"))
+# Rows per purge transaction, and the pause between transactions
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+PURGE_PAUSE_MS = float(os.getenv("PURGE_PAUSE_MS", "50"))
+# User profiles (username, picture, ...) cached per worker for hydrating author fields
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+
+# Post views
+# Views are counted in memory and written to the graph in batches this often
+VIEWS_FLUSH_INTERVAL_S = float(os.getenv("VIEWS_FLUSH_INTERVAL_S", "10"))
+VIEWS_FLUSH_BATCH_SIZE = int(os.getenv("VIEWS_FLUSH_BATCH_SIZE", "500"))
+# Unflushed views are saved here on shutdown and flushed on the next start
+VIEWS_SPOOL_PATH = os.getenv("VIEWS_SPOOL_PATH", "views_spool.json")
+
+# Reaction write coalescing (off by default)
+# Reaction upserts/deletes wait this long per post and are written in one UNWIND transaction
+REACTION_COALESCE_ENABLED = os.getenv("REACTION_COALESCE_ENABLED", "false").lower() == "true"
+REACTION_COALESCE_WINDOW_MS = float(os.getenv("REACTION_COALESCE_WINDOW_MS", "50"))
+# A post's buffer is flushed early once it holds this many users' actions
+REACTION_COALESCE_MAX_BATCH = int(os.getenv("REACTION_COALESCE_MAX_BATCH", "500"))
+
+# Database circuit breaker
+# This many consecutive outage errors or slow request-path queries open the circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_SLOW_QUERY_MS = float(os.getenv("CIRCUIT_SLOW_QUERY_MS", "5000"))
+# How long queries fail fast before half-open probes are let through
+CIRCUIT_OPEN_S = float(os.getenv("CIRCUIT_OPEN_S", "15"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+# Last good results older than this are not served while the database is unavailable
+STALE_MAX_AGE_S = float(os.getenv("STALE_MAX_AGE_S", "3600"))
+
+# Delta sync (GET /posts/changes)
+# More changes than this since a token and the client is told to refetch the whole feed
+POST_CHANGES_LIMIT = int(os.getenv("POST_CHANGES_LIMIT", "500"))
+# New tokens point this far back, so writes still committing during the read are not missed
+POST_CHANGES_OVERLAP_S = float(os.getenv("POST_CHANGES_OVERLAP_S", "5"))
+# Tombstones of deleted posts are kept this long; older tokens get 410 Gone
+POST_TOMBSTONE_RETENTION_DAYS = int(os.getenv("POST_TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Comment threads (materialized paths, see app.comment_paths)
+# Comments per page of GET /comments/{post_id}, and the most a client may ask for
+COMMENTS_PAGE_SIZE = int(os.getenv("COMMENTS_PAGE_SIZE", "200"))
+COMMENTS_PAGE_MAX = int(os.getenv("COMMENTS_PAGE_MAX", "500"))
+# Comments written before paths existed get one at startup; turn off once every comment has one
+COMMENT_PATH_BACKFILL_ENABLED = os.getenv("COMMENT_PATH_BACKFILL_ENABLED", "true").lower() == "true"
+COMMENT_PATH_BACKFILL_BATCH = int(os.getenv("COMMENT_PATH_BACKFILL_BATCH", "500"))
+
+# Per-user totals (see app.user_counters)
+# Users from before the counters existed are counted once at startup; turn off once all have them
+USER_COUNTER_BACKFILL_ENABLED = os.getenv("USER_COUNTER_BACKFILL_ENABLED", "true").lower() == "true"
+USER_COUNTER_BACKFILL_BATCH = int(os.getenv("USER_COUNTER_BACKFILL_BATCH", "200"))
+# Page size of GET /users/{user_id}/posts
+AUTHOR_POSTS_PAGE_SIZE = int(os.getenv("AUTHOR_POSTS_PAGE_SIZE", "20"))
+
+# Warm cache snapshot (see app.warm_snapshot)
+# Feed, profile and reaction-count caches are saved here periodically and on shutdown,
+# and restored at startup (empty = off)
+WARM_SNAPSHOT_PATH = os.getenv("WARM_SNAPSHOT_PATH", "warm_cache.json.gz")
+WARM_SNAPSHOT_INTERVAL_S = float(os.getenv("WARM_SNAPSHOT_INTERVAL_S", "60"))
+# Older snapshots are ignored
+WARM_SNAPSHOT_MAX_AGE_S = float(os.getenv("WARM_SNAPSHOT_MAX_AGE_S", "86400"))
+# Restored entries are served without a version check for at most this long after startup
+WARM_SNAPSHOT_HOLD_S = float(os.getenv("WARM_SNAPSHOT_HOLD_S", "30"))
+
+# Request trace capture (see app.tracing; replay with benchmarks.replay)
+# Fraction of requests recorded (0 = off)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_PATH = os.getenv("TRACE_PATH", "traces.jsonl")
+# Capture stops once the file reaches this size
+TRACE_MAX_MB = float(os.getenv("TRACE_MAX_MB", "100"))
+# Parameters whose values are recorded as-is (everything else only by shape)
+TRACE_VERBATIM_PARAMS = [
+    name.strip() for name in os.getenv("TRACE_VERBATIM_PARAMS", "type,limit,depth,order_by").split(",") if name.strip()
+]
+
+# Request costs (see app.request_costs)
+# Report DB and Cloudinary time per request in a Server-Timing response header
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+# Routes over their @query_budget: "warn" logs and counts them, "enforce" answers 500 (tests, benchmarks), "off"
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "warn").lower()
+
+# Domain events (see app.events and app.subscribers)
+# Events waiting per subscriber before new ones are dropped
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+# Most queued events a subscriber handles at once
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "100"))
+
+# @mentions (see app.mentions)
+# Only this many distinct usernames per post or comment are linked and notified
+MENTIONS_MAX = int(os.getenv("MENTIONS_MAX", "10"))
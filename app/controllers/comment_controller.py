@@ -1,12 +1,22 @@
+import base64
+import binascii
 from fastapi import HTTPException, UploadFile
-from app.db import get_db
+from app.db import execute_query, read_query
+from app.cache import coherence
+from app.config import COMMENTS_PAGE_SIZE
+from app import comment_paths, mentions, profiles, purge
+from app.events import bus, CommentCreated, CommentDeleted
+from app.singleflight import flights
+from app.circuit import LastGood
 from app.models.comment import CommentCreate, ReplyCreate, CommentUpdate, CommentResponse, ReplyResponse
 from app.cloudinary_util import upload_image
-from app.controllers import notification_controller
 from datetime import datetime
 from neo4j.time import DateTime
 from typing import Optional
 
+# Last comment list per post, served while the database is unavailable (see app.circuit)
+comments_last_good = LastGood("comments", maxsize=2048)
+
 # Convert Neo4j datetime to Python datetime
 def neo4j_datetime_to_python(neo_dt):
     if isinstance(neo_dt, datetime):
@@ -17,14 +27,13 @@ def neo4j_datetime_to_python(neo_dt):
 
 # Create top-level comment
 async def create_comment(post_id: str, content: str, image: Optional[UploadFile], current_user: dict):
-    db = get_db()
-    
     # Get post author for notification
     post_query = """
     MATCH (p:Post {id: $post_id})<-[:CREATED]-(author:User)
+    WHERE p.deleted_at IS NULL
     RETURN author.user_id AS author_id
     """
-    post_result = db.execute_query(post_query, {"post_id": post_id}, database_="neo4j")
+    post_result = read_query("comments.post_author", post_query, {"post_id": post_id})
     post_records = post_result[0] if post_result and len(post_result) > 0 else []
     author_id = post_records[0].get("author_id") if post_records else None
     
@@ -36,29 +45,40 @@ async def create_comment(post_id: str, content: str, image: Optional[UploadFile]
     
     query = """
     MATCH (u:User {user_id: $user_id}), (p:Post {id: $post_id})
+    WHERE p.deleted_at IS NULL
+    WITH u, p, randomUUID() AS id, datetime() AS now
     CREATE (u)-[:COMMENTED]->(c:Comment {
-        id: randomUUID(),
+        id: id,
         content: $content,
         image_url: $image_url,
-        created_at: datetime(),
-        author_id: $user_id
+        created_at: now,
+        author_id: $user_id,
+        post_id: $post_id,
+        depth: 0,
+        path: """ + comment_paths.path_segment("now", "id") + """
     })-[:ON]->(p)
-    RETURN c, u.username AS username, u.user_id AS user_id, u.profile_picture AS profile_picture
+    SET u.comment_count = u.comment_count + 1
+    WITH c, u
+    """ + mentions.link_mentions("c", "u") + """
+    WITH c, u, mentioned_ids
+    RETURN c, u.username AS username, u.user_id AS user_id, u.profile_picture AS profile_picture, mentioned_ids
     """
     params = {
         "user_id": current_user["user_id"],
         "post_id": post_id,
         "content": content,
+        "mentions": mentions.parse_mentions(content),
         "image_url": image_url
     }
 
     try:
-        result = db.execute_query(query, params, database_="neo4j")
+        result = execute_query("comments.create", query, params)
 
         # Handle EagerResult or list of records
         records = getattr(result, "records", result)
         if not records or len(records) == 0:
             raise HTTPException(status_code=500, detail="Failed to create comment")
+        coherence.bump("comments")
 
         record = records[0]  # first record
         # Access record fields
@@ -79,15 +99,14 @@ async def create_comment(post_id: str, content: str, image: Optional[UploadFile]
         # Convert datetime to Python datetime
         created_at = neo4j_datetime_to_python(c.get("created_at"))
         
-        # Create notification for post author
-        if author_id:
-            notification_controller.create_notification(
-                user_id=author_id,
-                actor_id=current_user["user_id"],
-                notification_type="comment",
-                post_id=post_id,
-                comment_id=c["id"]
-            )
+        # Notifying the post author and mentioned users, and trending, follow in app.subscribers
+        bus.publish(CommentCreated(
+            comment_id=c["id"],
+            post_id=post_id,
+            author_id=current_user["user_id"],
+            post_author_id=author_id,
+            mentioned_ids=tuple(record["mentioned_ids"]),
+        ))
 
         return CommentResponse(
             comment_id=c["id"],
@@ -106,58 +125,67 @@ async def create_comment(post_id: str, content: str, image: Optional[UploadFile]
         raise HTTPException(status_code=500, detail=str(e))
 # Create reply
 async def create_reply(post_id: str, parent_comment_id: str, content: str, image: Optional[UploadFile], current_user: dict):
-    db = get_db()
-    
     # Upload image if provided
     image_url = None
     if image:
         result = await upload_image(image, folder="drawsphere/comments")
         image_url = result["url"]
     
+    # A parent written before paths existed gets its path (and its ancestors') in this write
     query = """
-    MATCH (u:User {user_id: $user_id}), (p:Post {id: $post_id}), (parent:Comment {id: $parent_comment_id})
+    MATCH (u:User {user_id: $user_id}), (parent:Comment {id: $parent_comment_id})-[:ON]->(p:Post {id: $post_id})
+    WHERE p.deleted_at IS NULL AND parent.deleted_at IS NULL
+    """ + comment_paths.fill_chain_paths("parent", "p") + """
+    WITH u, p, parent, randomUUID() AS id, datetime() AS now
     CREATE (u)-[:COMMENTED]->(c:Comment {
-        id: randomUUID(),
+        id: id,
         content: $content,
         image_url: $image_url,
-        created_at: datetime(),
-        author_id: $user_id
+        created_at: now,
+        author_id: $user_id,
+        post_id: $post_id,
+        parent_id: parent.id,
+        depth: parent.depth + 1,
+        path: parent.path + '""" + comment_paths.PATH_SEPARATOR + """' + """ + comment_paths.path_segment("now", "id") + """
     })-[:ON]->(p)
     CREATE (c)-[:REPLIED_TO]->(parent)
-    RETURN c, u.username AS username, u.user_id AS user_id, u.profile_picture AS profile_picture
+    SET u.comment_count = u.comment_count + 1
+    WITH c, u
+    """ + mentions.link_mentions("c", "u") + """
+    WITH c, u, mentioned_ids
+    RETURN c, u.username AS username, u.user_id AS user_id, u.profile_picture AS profile_picture, mentioned_ids
     """
     params = {
         "user_id": current_user["user_id"],
         "post_id": post_id,
         "content": content,
+        "mentions": mentions.parse_mentions(content),
         "parent_comment_id": parent_comment_id,
         "image_url": image_url
     }
 
     try:
-        result = db.execute_query(query, params, database_="neo4j")
-
-        # Handle both dict or list return
-        records = result.get("records", []) if isinstance(result, dict) else result
-        if not records:
-            raise HTTPException(status_code=500, detail="Failed to create reply — no records returned")
-
-        record = records[0]
-        if isinstance(record, dict):
-            r = record.get("c")
-            username = record.get("username")
-            user_id = record.get("user_id")
-            profile_picture = record.get("profile_picture")
-        elif isinstance(record, (list, tuple)):
-            r = record[0].get("c") if isinstance(record[0], dict) else record[0]
-            username = record[1] if len(record) > 1 else current_user.get("username")
-            user_id = record[2] if len(record) > 2 else current_user["user_id"]
-            profile_picture = None
-        else:
-            raise HTTPException(status_code=500, detail="Unexpected Neo4j reply structure")
+        result = execute_query("comments.reply", query, params)
+
+        if not result.records:
+            raise HTTPException(status_code=404, detail="Parent comment not found on this post")
+        coherence.bump("comments")
+
+        record = result.records[0]
+        r = record.get("c")
+        username = record.get("username")
+        user_id = record.get("user_id")
+        profile_picture = record.get("profile_picture")
 
         if not r:
             raise HTTPException(status_code=500, detail="Failed to create reply — missing node data")
+        bus.publish(CommentCreated(
+            comment_id=r["id"],
+            post_id=post_id,
+            author_id=current_user["user_id"],
+            parent_id=parent_comment_id,
+            mentioned_ids=tuple(record["mentioned_ids"]),
+        ))
 
         created_at = r.get("created_at")
         if hasattr(created_at, "to_native"):
@@ -170,73 +198,123 @@ async def create_reply(post_id: str, parent_comment_id: str, content: str, image
             username=username or current_user.get("username", "Unknown"),
             user_id=user_id or current_user["user_id"],
             image_url=r.get("image_url"),
-            profile_picture=profile_picture
+            profile_picture=profile_picture,
+            parent_id=parent_comment_id,
+            depth=r.get("depth") or 1
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"⚠️ Error in create_reply: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Get comments with nested replies
-def get_comments(post_id: str):
-    db = get_db()
-    query = """
-    MATCH (u:User)-[:COMMENTED]->(c:Comment)-[:ON]->(p:Post {id: $post_id})
-    OPTIONAL MATCH (c)<-[:REPLIED_TO]-(r:Comment)<-[:COMMENTED]-(ru:User)
-    RETURN c, u.username AS username, u.user_id AS user_id, u.profile_picture AS profile_picture,
-           collect({reply: r, reply_user: ru.username, reply_user_id: ru.user_id, reply_profile: ru.profile_picture}) AS replies
-    ORDER BY c.created_at ASC
-    """
+# Get comments as nested threads (materialized paths, see app.comment_paths)
+THREAD_QUERY = """
+MATCH (p:Post {id: $post_id})
+WHERE p.deleted_at IS NULL
+MATCH (c:Comment)
+WHERE c.post_id = $post_id AND c.path > $after AND c.path < $end
+  AND ($depth IS NULL OR c.depth < $depth)
+RETURN c
+ORDER BY c.path
+LIMIT $limit
+"""
+
+SUBTREE_QUERY = """
+MATCH (p:Post {id: $post_id})
+WHERE p.deleted_at IS NULL
+MATCH (root:Comment {id: $root_id})
+WHERE root.post_id = $post_id AND root.deleted_at IS NULL
+MATCH (c:Comment)
+WHERE c.post_id = $post_id
+  AND c.path > coalesce($after, root.path + $separator) AND c.path < root.path + $end
+  AND ($depth IS NULL OR c.depth <= root.depth + $depth)
+RETURN c
+ORDER BY c.path
+LIMIT $limit
+"""
+
+
+def _encode_comments_cursor(path: str) -> str:
+    return base64.urlsafe_b64encode(path.encode()).decode().rstrip("=")
+
+
+def _decode_comments_cursor(cursor: str) -> str:
     try:
-        result = db.execute_query(query, {"post_id": post_id}, database_="neo4j")
-
-        # 🧩 Handle Neo4j EagerResult directly
-        records = []
-        if hasattr(result, "records"):
-            records = result.records
-        elif isinstance(result, list):
-            records = result
-        else:
-            raise HTTPException(status_code=500, detail="Unexpected response format from Neo4j")
-
-        comments = []
-        for record in records:
-            # Access record fields by key (not .get)
-            c = record["c"]
-            if not c:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def get_comments(post_id: str, root_id: Optional[str] = None, depth: Optional[int] = None,
+                 limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    One page of a post's comments in thread order, nested to any depth. `root_id`
+    limits it to the replies under that comment, `depth` to that many levels below
+    the post (or the root). Comments whose parent is on an earlier page start the
+    page's list; their `parent_id` says where they belong.
+    """
+    limit = limit or COMMENTS_PAGE_SIZE
+    after = _decode_comments_cursor(cursor) if cursor else None
+    if root_id is None:
+        name, query = "comments.thread", THREAD_QUERY
+        params = {"post_id": post_id, "after": after or "", "end": comment_paths.THREAD_END, "depth": depth}
+    else:
+        name, query = "comments.subtree", SUBTREE_QUERY
+        params = {"post_id": post_id, "root_id": root_id, "after": after, "depth": depth,
+                  "separator": comment_paths.PATH_SEPARATOR, "end": comment_paths.PATH_END}
+    # One extra row says whether there is another page
+    params["limit"] = limit + 1
+    key = (post_id, root_id, depth, limit, after)
+
+    def load():
+        # A shared post brings many identical requests at once; they share one query
+        result = flights.do(name, key, lambda: read_query(name, query, params))
+        nodes = [record["c"] for record in result.records]
+        next_cursor = _encode_comments_cursor(nodes[limit - 1]["path"]) if len(nodes) > limit else None
+        nodes = nodes[:limit]
+
+        # One batched profile lookup for every author on the page
+        authors = profiles.get_profiles(c.get("author_id") for c in nodes if c.get("deleted_at") is None)
+
+        # Rows come depth-first, so a parent is always placed before its replies. Deleted
+        # comments (and those of deleted authors) hide their subtree until app.purge
+        # removes it.
+        placed, hidden, comments = {}, set(), []
+        for c in nodes:
+            parent = comment_paths.parent_path(c["path"])
+            author = authors.get(c.get("author_id"))
+            if c.get("deleted_at") is not None or not author or parent in hidden:
+                hidden.add(c["path"])
                 continue
 
-            created_at = neo4j_datetime_to_python(c["created_at"])
-            replies_data = record["replies"] or []
-
-            replies = []
-            for reply_data in replies_data:
-                r = reply_data.get("reply")
-                if r:
-                    replies.append(ReplyResponse(
-                        reply_id=r.get("id"),
-                        content=r.get("content"),
-                        created_at=neo4j_datetime_to_python(r.get("created_at")),
-                        username=reply_data.get("reply_user"),
-                        user_id=reply_data.get("reply_user_id"),
-                        image_url=r.get("image_url"),
-                        profile_picture=reply_data.get("reply_profile")
-                    ))
-
-            comments.append(CommentResponse(
-                comment_id=c["id"],
-                post_id=post_id,
+            fields = dict(
                 content=c["content"],
-                created_at=created_at,
-                username=record["username"],
-                user_id=record["user_id"],
+                created_at=neo4j_datetime_to_python(c["created_at"]),
+                username=author["username"],
+                user_id=author["user_id"],
                 image_url=c.get("image_url"),
-                profile_picture=record.get("profile_picture"),
-                replies=replies
-            ))
+                profile_picture=author.get("profile_picture"),
+            )
+            if c.get("depth", 0) == 0:
+                item = CommentResponse(comment_id=c["id"], post_id=post_id, **fields)
+            else:
+                item = ReplyResponse(reply_id=c["id"], parent_id=c.get("parent_id"), depth=c["depth"], **fields)
+            placed[c["path"]] = item
+
+            if parent in placed:
+                placed[parent].replies.append(item)
+            else:
+                comments.append(item)
+
+        return {"comments": comments, "next_cursor": next_cursor}
 
-        return {"comments": comments}
+    try:
+        return comments_last_good.call(key, load)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"⚠️ Error in get_comments: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -245,24 +323,22 @@ def get_comments(post_id: str):
 # Update and delete remain mostly the same, just ensure datetime is handled if needed
 # ✅ Delete a comment or reply
 def delete_comment(comment_id: str, current_user: dict):
-    db = get_db()
-
     try:
         # Fetch author
         check_query = """
         MATCH (c:Comment {id: $comment_id})
+        WHERE c.deleted_at IS NULL
         OPTIONAL MATCH (c)<-[:COMMENTED]-(u:User)
         RETURN c, u.user_id AS author_id
         """
-        result = db.execute_query(check_query, {"comment_id": comment_id}, database_="neo4j")
+        result = read_query("comments.check_owner", check_query, {"comment_id": comment_id})
 
-        records = result.get("records", []) if isinstance(result, dict) else result
-        if not records:
+        if not result.records:
             raise HTTPException(status_code=404, detail="Comment not found")
 
-        record = records[0]
-        c = record.get("c") if isinstance(record, dict) else record[0]
-        author_id = record.get("author_id") if isinstance(record, dict) else None
+        record = result.records[0]
+        c = record["c"]
+        author_id = record["author_id"]
 
         if not c:
             raise HTTPException(status_code=404, detail="Comment node missing")
@@ -270,21 +346,29 @@ def delete_comment(comment_id: str, current_user: dict):
         if author_id != current_user["user_id"]:
             raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
 
-        # Delete
+        # Mark deleted; app.purge removes it with its replies and notifications
         delete_query = """
         MATCH (c:Comment {id: $comment_id})
-        DETACH DELETE c
+        WHERE c.deleted_at IS NULL
+        """ + purge.claim("c") + """
+        WITH c WHERE c.deleted_at IS NULL
+        SET c.deleted_at = datetime()
+        WITH c
+        OPTIONAL MATCH (author:User)-[:COMMENTED]->(c)
+        SET author.comment_count = author.comment_count - 1
         RETURN COUNT(c) AS deleted
         """
-        del_result = db.execute_query(delete_query, {"comment_id": comment_id}, database_="neo4j")
-        deleted_records = del_result.get("records", []) if isinstance(del_result, dict) else del_result
-        deleted = deleted_records[0].get("deleted") if deleted_records and isinstance(deleted_records[0], dict) else 1
-
-        if deleted == 0:
+        del_result = execute_query("comments.delete", delete_query, {"comment_id": comment_id})
+        purge.purger.wake()
+        if del_result.records[0]["deleted"] == 0:
             raise HTTPException(status_code=500, detail="Failed to delete comment")
+        coherence.bump("comments")
+        bus.publish(CommentDeleted(comment_id=comment_id, author_id=author_id))
 
         return {"message": "Comment deleted successfully", "comment_id": comment_id}
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"⚠️ Error in delete_comment: {e}")
         raise HTTPException(status_code=500, detail=str(e))
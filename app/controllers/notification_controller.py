@@ -1,5 +1,6 @@
 from fastapi import HTTPException
-from app.db import get_db
+from app.db import execute_query, read_query
+from app import profiles
 from app.models.notification import NotificationResponse
 from datetime import datetime
 from neo4j.time import DateTime
@@ -13,99 +14,90 @@ def neo4j_datetime_to_python(neo_dt):
     return None
 
 
-def create_notification(user_id: str, actor_id: str, notification_type: str, post_id: str = None, comment_id: str = None):
-    """Create a notification for a user"""
-    db = get_db()
-    
-    # Don't create notification if user is reacting to their own content
-    if user_id == actor_id:
-        return None
-    
-    # Get actor details
-    actor_query = """
-    MATCH (u:User {user_id: $actor_id})
-    RETURN u.username AS username, u.profile_picture AS profile_picture
+def create_notifications(notifications: list):
     """
-    actor_result = db.execute_query(actor_query, {"actor_id": actor_id}, database_="neo4j")
-    actor_records = actor_result[0] if actor_result and len(actor_result) > 0 else []
-    
-    if not actor_records:
-        return None
-    
-    actor = actor_records[0]
-    actor_username = actor.get("username", "Someone")
-    actor_profile = actor.get("profile_picture")
-    
-    # Create message based on type
-    messages = {
-        "like": f"{actor_username} liked your post",
-        "love": f"{actor_username} loved your post",
-        "haha": f"{actor_username} reacted 😆 to your post",
-        "care": f"{actor_username} reacted ❤️ to your post",
-        "comment": f"{actor_username} commented on your post",
-        "reply": f"{actor_username} replied to your comment"
-    }
-    message = messages.get(notification_type, f"{actor_username} interacted with your content")
-    
+    Create many notifications in one UNWIND query. Each item has user_id, actor_id,
+    type and optionally post_id / comment_id; self-notifications and deleted actors are skipped.
+    """
+    notifications = [n for n in notifications if n["user_id"] != n["actor_id"]]
+    actors = profiles.get_profiles(n["actor_id"] for n in notifications)
+    rows = [
+        {
+            "user_id": n["user_id"],
+            "actor_id": n["actor_id"],
+            "type": n["type"],
+            "post_id": n.get("post_id"),
+            "comment_id": n.get("comment_id"),
+            "message": _message(n["type"], actors[n["actor_id"]].get("username") or "Someone"),
+        }
+        for n in notifications
+        if n["actor_id"] in actors
+    ]
+    if not rows:
+        return 0
+
     query = """
-    MATCH (u:User {user_id: $user_id})
+    UNWIND $rows AS row
+    MATCH (u:User {user_id: row.user_id})
     CREATE (u)-[:HAS_NOTIFICATION]->(n:Notification {
         id: randomUUID(),
-        actor_id: $actor_id,
-        type: $type,
-        post_id: $post_id,
-        comment_id: $comment_id,
-        message: $message,
+        actor_id: row.actor_id,
+        type: row.type,
+        post_id: row.post_id,
+        comment_id: row.comment_id,
+        message: row.message,
         is_read: false,
         created_at: datetime()
     })
-    RETURN n
+    RETURN count(n) AS created
     """
-    
-    try:
-        result = db.execute_query(
-            query,
-            {
-                "user_id": user_id,
-                "actor_id": actor_id,
-                "type": notification_type,
-                "post_id": post_id,
-                "comment_id": comment_id,
-                "message": message
-            },
-            database_="neo4j"
-        )
-        return result
-    except Exception as e:
-        print(f"⚠️ Error creating notification: {e}")
-        return None
+    # Errors propagate: the event bus worker logs them and counts the batch as failed
+    result = execute_query("notifications.create_many", query, {"rows": rows})
+    return result.records[0]["created"]
+
+
+def _message(notification_type: str, actor_username: str) -> str:
+    messages = {
+        "like": f"{actor_username} liked your post",
+        "love": f"{actor_username} loved your post",
+        "haha": f"{actor_username} reacted 😆 to your post",
+        "care": f"{actor_username} reacted ❤️ to your post",
+        "comment": f"{actor_username} commented on your post",
+        "reply": f"{actor_username} replied to your comment",
+        "mention": f"{actor_username} mentioned you"
+    }
+    return messages.get(notification_type, f"{actor_username} interacted with your content")
 
 
 def get_user_notifications(user_id: str, limit: int = 20):
     """Get notifications for a user"""
-    db = get_db()
     
     query = """
     MATCH (u:User {user_id: $user_id})-[:HAS_NOTIFICATION]->(n:Notification)
-    MATCH (actor:User {user_id: n.actor_id})
-    RETURN n, actor.username AS actor_username, actor.profile_picture AS actor_profile_picture
+    RETURN n
     ORDER BY n.created_at DESC
     LIMIT $limit
     """
     
     try:
-        result = db.execute_query(query, {"user_id": user_id, "limit": limit}, database_="neo4j")
+        result = read_query("notifications.list", query, {"user_id": user_id, "limit": limit})
         records = result[0] if result and len(result) > 0 else []
         
+        actors = profiles.get_profiles(record["n"].get("actor_id") for record in records)
+
         notifications = []
         for record in records:
             n = record["n"]
+            actor = actors.get(n.get("actor_id"))
+            # Notifications from deleted users are skipped (the purger removes them)
+            if not actor:
+                continue
             notifications.append(NotificationResponse(
                 notification_id=n["id"],
                 user_id=user_id,
                 actor_id=n["actor_id"],
-                actor_username=record.get("actor_username", "Unknown"),
-                actor_profile_picture=record.get("actor_profile_picture"),
+                actor_username=actor.get("username") or "Unknown",
+                actor_profile_picture=actor.get("profile_picture"),
                 type=n["type"],
                 post_id=n.get("post_id"),
                 comment_id=n.get("comment_id"),
@@ -123,7 +115,6 @@ def get_user_notifications(user_id: str, limit: int = 20):
 
 def mark_notification_read(notification_id: str, user_id: str):
     """Mark a notification as read"""
-    db = get_db()
     
     query = """
     MATCH (u:User {user_id: $user_id})-[:HAS_NOTIFICATION]->(n:Notification {id: $notification_id})
@@ -132,7 +123,7 @@ def mark_notification_read(notification_id: str, user_id: str):
     """
     
     try:
-        result = db.execute_query(query, {"user_id": user_id, "notification_id": notification_id}, database_="neo4j")
+        result = execute_query("notifications.mark_read", query, {"user_id": user_id, "notification_id": notification_id})
         records = result[0] if result and len(result) > 0 else []
         
         if not records:
@@ -147,7 +138,6 @@ def mark_notification_read(notification_id: str, user_id: str):
 
 def mark_all_notifications_read(user_id: str):
     """Mark all notifications as read for a user"""
-    db = get_db()
     
     query = """
     MATCH (u:User {user_id: $user_id})-[:HAS_NOTIFICATION]->(n:Notification)
@@ -157,7 +147,7 @@ def mark_all_notifications_read(user_id: str):
     """
     
     try:
-        result = db.execute_query(query, {"user_id": user_id}, database_="neo4j")
+        result = execute_query("notifications.mark_all_read", query, {"user_id": user_id})
         records = result[0] if result and len(result) > 0 else []
         count = records[0].get("count", 0) if records else 0
         
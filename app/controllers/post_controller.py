@@ -1,17 +1,35 @@
 from fastapi import HTTPException, status, UploadFile
-from datetime import datetime as _py_datetime
-from app.db import get_db
+from datetime import datetime as _py_datetime, timedelta, timezone
+import base64
+import binascii
+from app.db import execute_query, read_query
 from app.models.post import PostCreate, PostUpdate
 from app.cloudinary_util import upload_image, delete_image
+from app.cache import LocalCache, coherence
+from app import mentions, profiles, purge, trending, views
+from app.singleflight import flights
+from app.circuit import LastGood
+from app.events import bus, PostCreated, PostDeleted
+from app.config import (
+    POST_CHANGES_LIMIT,
+    POST_CHANGES_OVERLAP_S,
+    POST_TOMBSTONE_RETENTION_DAYS,
+    AUTHOR_POSTS_PAGE_SIZE,
+)
 from typing import Optional
 
+# The whole public feed, kept coherent across workers (see app.cache)
+feed_cache = LocalCache("feed", domains=("posts", "users"), maxsize=1)
+# Trending posts by id; scores come from app.trending, not from here
+trending_cache = LocalCache("trending_posts", domains=("posts", "users"), maxsize=1024)
+# Last feed built from the graph, served while the database is unavailable (see app.circuit)
+feed_last_good = LastGood("feed", maxsize=1)
+
 
 # ========================================
 # ✅ CREATE POST (Authenticated)
 # ========================================
 async def create_post(content: str, image: Optional[UploadFile], current_user: dict):
-    db = get_db()
-    
     # Upload image to Cloudinary if provided
     image_url = None
     if image:
@@ -25,20 +43,27 @@ async def create_post(content: str, image: Optional[UploadFile], current_user: d
         content: $content,
         image_url: $image_url,
         created_at: datetime(),
+        updated_at: datetime(),
         author_id: $author_id
     })
-    RETURN p, u.username AS username, u.profile_picture AS profile_picture
+    SET u.post_count = u.post_count + 1
+    WITH p, u
+    """ + mentions.link_mentions("p", "u") + """
+    WITH p, u, mentioned_ids
+    RETURN p, u.username AS username, u.profile_picture AS profile_picture, mentioned_ids
     """
 
-    result = db.execute_query(
+    result = execute_query(
+        "posts.create",
         query,
         {
             "content": content,
             "image_url": image_url,
-            "author_id": current_user["user_id"]
-        },
-        database_="neo4j"
+            "author_id": current_user["user_id"],
+            "mentions": mentions.parse_mentions(content),
+        }
     )
+    coherence.bump("posts")
 
     # ✅ Neo4j returns (records, summary, keys)
     records = result[0]
@@ -53,134 +78,286 @@ async def create_post(content: str, image: Optional[UploadFile], current_user: d
     post_node = record["p"]
     post_data = dict(post_node)
     # normalize Neo4j datetime objects to ISO strings for the frontend
-    try:
-        ca = post_node.get("created_at")
-        if ca is not None:
-            # handle Neo4j datetime wrappers
-            if hasattr(ca, "to_native"):
-                native = ca.to_native()
-                if isinstance(native, _py_datetime):
-                    post_data["created_at"] = native.isoformat()
-                else:
-                    post_data["created_at"] = str(native)
-            elif isinstance(ca, _py_datetime):
-                post_data["created_at"] = ca.isoformat()
-            else:
-                post_data["created_at"] = str(ca)
-    except Exception:
-        # fallback: leave as-is
-        pass
+    for key in ("created_at", "updated_at"):
+        if post_node.get(key) is not None:
+            post_data[key] = _isoformat(post_node.get(key))
     post_data["id"] = str(post_node.get("id"))
     post_data["author_id"] = current_user["user_id"]
     post_data["username"] = record.get("username")
     post_data["profile_picture"] = record.get("profile_picture")
+    # Notifying the mentioned users follows in app.subscribers
+    bus.publish(PostCreated(
+        post_id=post_data["id"], author_id=current_user["user_id"], mentioned_ids=tuple(record["mentioned_ids"])
+    ))
 
     return {
         "message": "Post created successfully",
         "post": post_data
     }
 
+def _isoformat(value) -> str:
+    """ISO string for a Neo4j or Python datetime, so the frontend's Date parsing works."""
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    if isinstance(value, _py_datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _post_payload(post_node) -> dict:
+    """Feed shape of a Post node; author fields are filled in by profiles.hydrate."""
+    post_data = dict(post_node)
+    for key in ("created_at", "updated_at"):
+        if post_node.get(key) is not None:
+            post_data[key] = _isoformat(post_node.get(key))
+    post_data["author_id"] = post_node.get("author_id")
+    # View counters as of the last flush (app.views)
+    post_data["views"] = post_node.get("view_count") or 0
+    post_data.pop("view_count", None)
+    post_data["unique_viewers"] = post_node.get("unique_viewers") or 0
+    return post_data
+
+
 # ========================================
 # ✅ GET ALL POSTS (Public)
 # ========================================
 def get_all_posts():
-    db = get_db()
+    cached = feed_cache.get("all")
+    if cached is not None:
+        return {**cached, "posts": views.counter.overlay_all(cached["posts"])}
 
     query = """
-    MATCH (u:User)-[:CREATED]->(p:Post)
-    RETURN p, u.user_id AS user_id, u.username AS username, u.profile_picture AS profile_picture
+    MATCH (p:Post)
+    WHERE p.deleted_at IS NULL
+    RETURN p
     ORDER BY p.created_at DESC
     """
 
-    try:
-        result = db.execute_query(query, database_="neo4j")
+    def load():
+        # On a cache miss every concurrent feed request would rebuild it; one query serves them all.
+        # The generation is read by the query's leader, so callers sharing it cache nothing older
+        generation, result = flights.do("posts.list", None, lambda: (feed_cache.generation, read_query("posts.list", query)))
         records = result[0] if result and len(result) > 0 else []
 
-        posts = []
-        for record in records:
-            post_node = record["p"]
-            post_data = dict(post_node)
-            # normalize created_at to a string (ISO) so frontend's Date parsing works
-            try:
-                ca = post_node.get("created_at")
-                if ca is not None:
-                    if hasattr(ca, "to_native"):
-                        native = ca.to_native()
-                        if isinstance(native, _py_datetime):
-                            post_data["created_at"] = native.isoformat()
-                        else:
-                            post_data["created_at"] = str(native)
-                    elif isinstance(ca, _py_datetime):
-                        post_data["created_at"] = ca.isoformat()
-                    else:
-                        post_data["created_at"] = str(ca)
-            except Exception:
-                pass
-            post_data["author_id"] = record.get("user_id")
-            post_data["username"] = record.get("username")
-            post_data["profile_picture"] = record.get("profile_picture")
-            posts.append(post_data)
-
-        return {"total": len(posts), "posts": posts}
+        # Posts of deleted authors drop out here
+        posts = profiles.hydrate([_post_payload(record["p"]) for record in records], "author_id")
+
+        response = {"total": len(posts), "posts": posts}
+        feed_cache.set("all", response, generation)
+        return response
+
+    try:
+        response = feed_last_good.call("all", load)
+        return {**response, "posts": views.counter.overlay_all(response["posts"])}
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"⚠️ Error in get_all_posts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ========================================
-# ✅ GET POST BY ID (Authenticated)
+# ✅ TRENDING POSTS (Public)
+# ========================================
+def get_trending_posts(limit: int = 20):
+    """
+    Rank by the in-process hot scores (app.trending), then load only the posts that
+    are not already cached, in one query.
+    """
+    trending.scores.maybe_reconcile()
+    ranked = trending.scores.top(limit)
+
+    posts = {}
+    missing = []
+    for post_id, _ in ranked:
+        cached = trending_cache.get(post_id)
+        if cached is not None:
+            posts[post_id] = cached
+        else:
+            missing.append(post_id)
+
+    if missing:
+        query = """
+        UNWIND $ids AS id
+        MATCH (p:Post {id: id})
+        WHERE p.deleted_at IS NULL
+        RETURN p
+        """
+        generation = trending_cache.generation
+        try:
+            result = read_query("posts.by_ids", query, {"ids": missing})
+        except Exception as e:
+            print(f"⚠️ Error in get_trending_posts: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        for post_data in profiles.hydrate([_post_payload(record["p"]) for record in result.records], "author_id"):
+            trending_cache.set(post_data["id"], post_data, generation)
+            posts[post_data["id"]] = post_data
+
+    # Posts deleted since they were scored are simply skipped
+    trending_posts = [
+        {**views.counter.overlay(posts[post_id]), "score": round(score, 4)}
+        for post_id, score in ranked
+        if post_id in posts
+    ]
+    return {"total": len(trending_posts), "posts": trending_posts}
+
+
+def _encode_timestamp(at: _py_datetime) -> str:
+    """Opaque token for a point in time (changes tokens, per-author page cursors)."""
+    return base64.urlsafe_b64encode(at.isoformat().encode()).decode().rstrip("=")
+
+
+def _decode_timestamp(token: str, detail: str) -> _py_datetime:
+    try:
+        at = _py_datetime.fromisoformat(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode())
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail=detail)
+    if at.tzinfo is None:
+        raise HTTPException(status_code=400, detail=detail)
+    return at
+
+
+# ========================================
+# ✅ POSTS BY ONE AUTHOR (Public)
 # ========================================
-def get_post_by_id(post_id: str):
-    db = get_db()
+def get_posts_by_author(user_id: str, cursor: Optional[str] = None, limit: int = AUTHOR_POSTS_PAGE_SIZE):
+    """
+    One page of a user's posts, newest first, read from the (author_id, created_at)
+    index. `next_cursor` is the created_at of the last post on the page.
+    """
+    author = profiles.get_profile(user_id)
+    if not author:
+        raise HTTPException(status_code=404, detail="User not found")
+
     query = """
-    MATCH (u:User)-[:CREATED]->(p:Post {id: $id})
-    RETURN p, u.user_id AS user_id, u.username AS username
+    MATCH (p:Post)
+    WHERE p.author_id = $user_id AND p.created_at < $before AND p.deleted_at IS NULL
+    RETURN p
+    ORDER BY p.created_at DESC
+    LIMIT $limit
     """
-    result = db.execute_query(query, {"id": post_id}, database_="neo4j")
-    records = result.get("records", []) if isinstance(result, dict) else result
+    # No cursor: start from the far future (the index range needs a bound)
+    before = _decode_timestamp(cursor, "Invalid cursor") if cursor else _py_datetime.max.replace(tzinfo=timezone.utc)
+    try:
+        result = read_query("posts.by_author", query, {"user_id": user_id, "before": before, "limit": limit + 1})
+    except Exception as e:
+        print(f"⚠️ Error in get_posts_by_author: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-    if not records:
-        raise HTTPException(status_code=404, detail="Post not found")
+    records = result.records
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1]["p"]["created_at"]
+        next_cursor = _encode_timestamp(last.to_native() if hasattr(last, "to_native") else last)
 
-    record = records[0]
-    post_node = record["p"]
+    posts = profiles.hydrate([_post_payload(record["p"]) for record in records], "author_id")
+    return {"posts": views.counter.overlay_all(posts), "next_cursor": next_cursor}
+
+
+# ========================================
+# ✅ POST CHANGES SINCE A TOKEN (Public)
+# ========================================
+def get_post_changes(since: Optional[str] = None):
+    """
+    Posts created or edited, and ids of posts deleted, since `since` (a token from an
+    earlier call), plus the token for the next call. Both sets are range reads on
+    indexed timestamps, so the cost follows the amount of change, not the feed size.
+
+    Without a token, or when more than POST_CHANGES_LIMIT posts changed, the response
+    has `full_resync: true` and no changes: the client refetches GET /posts/ and keeps
+    the returned token. Tokens older than the tombstone retention get 410 Gone.
+    New tokens overlap the previous window by a few seconds, so the same post can come
+    back twice; clients apply changes by id.
+    """
+    # Each subquery aggregates, so both return one row (maybe empty lists) and so does the query
+    query = """
+    CALL {
+        MATCH (p:Post)
+        WHERE p.updated_at > $since AND p.deleted_at IS NULL
+        WITH p ORDER BY p.updated_at LIMIT $limit
+        RETURN collect(p) AS posts
+    }
+    CALL {
+        MATCH (t:PostTombstone)
+        WHERE t.deleted_at > $since
+        WITH t ORDER BY t.deleted_at LIMIT $limit
+        RETURN collect(t.post_id) AS deleted
+    }
+    RETURN posts, deleted, datetime() AS now
+    """
+    now = _py_datetime.now(timezone.utc)
+    if since is not None:
+        since_at = _decode_timestamp(since, "Invalid changes token")
+        if since_at < now - timedelta(days=POST_TOMBSTONE_RETENTION_DAYS):
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Changes token expired; refetch the feed")
+    else:
+        # Nothing to compare against: only the token is needed
+        since_at = now
 
-    post_data = dict(post_node)
     try:
-        ca = post_node.get("created_at")
-        if ca is not None:
-            if hasattr(ca, "to_native"):
-                native = ca.to_native()
-                if isinstance(native, _py_datetime):
-                    post_data["created_at"] = native.isoformat()
-                else:
-                    post_data["created_at"] = str(native)
-            elif isinstance(ca, _py_datetime):
-                post_data["created_at"] = ca.isoformat()
-            else:
-                post_data["created_at"] = str(ca)
-    except Exception:
-        pass
-    post_data["author_id"] = record["user_id"]
-    post_data["username"] = record["username"]
-
-    return {"post": post_data}
+        result = read_query("posts.changes", query, {"since": since_at, "limit": POST_CHANGES_LIMIT + 1})
+    except Exception as e:
+        print(f"⚠️ Error in get_post_changes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not result.records:
+        # Should not happen (see the query); a resync is always a correct answer
+        print("⚠️ posts.changes returned no row, asking the client to resync")
+        token = _encode_timestamp(now - timedelta(seconds=POST_CHANGES_OVERLAP_S))
+        return {"full_resync": True, "posts": [], "deleted": [], "token": token}
+
+    record = result.records[0]
+    db_now = record["now"].to_native() if hasattr(record["now"], "to_native") else record["now"]
+    token = _encode_timestamp(db_now - timedelta(seconds=POST_CHANGES_OVERLAP_S))
+    posts, deleted = record["posts"], record["deleted"]
+
+    if since is None or len(posts) > POST_CHANGES_LIMIT or len(deleted) > POST_CHANGES_LIMIT:
+        return {"full_resync": True, "posts": [], "deleted": [], "token": token}
+
+    posts = profiles.hydrate([_post_payload(p) for p in posts], "author_id")
+    return {
+        "full_resync": False,
+        "posts": views.counter.overlay_all(posts),
+        "deleted": deleted,
+        "token": token,
+    }
+
+
+# ========================================
+# ✅ GET POST BY ID (Authenticated)
+# ========================================
+def get_post_by_id(post_id: str, viewer_id: Optional[str] = None):
+    query = """
+    MATCH (p:Post {id: $id})
+    WHERE p.deleted_at IS NULL
+    RETURN p
+    """
+    result = flights.do("posts.get", post_id, lambda: read_query("posts.get", query, {"id": post_id}))
+    posts = profiles.hydrate([_post_payload(record["p"]) for record in result.records], "author_id", fields=("username",))
+
+    if not posts:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    if viewer_id:
+        views.counter.record(post_id, viewer_id)
+    return {"post": views.counter.overlay(posts[0])}
 
 
 # ========================================
 # ✅ UPDATE POST (Authenticated + Ownership Check)
 # ========================================
 async def update_post(post_id: str, content: Optional[str], image: Optional[UploadFile], current_user: dict):
-    db = get_db()
     user_id = current_user["user_id"]
 
     # Check ownership
     check_query = """
     MATCH (u:User {user_id: $user_id})-[:CREATED]->(p:Post {id: $id})
+    WHERE p.deleted_at IS NULL
     RETURN p
     """
-    check = db.execute_query(check_query, {"user_id": user_id, "id": post_id}, database_="neo4j")
+    check = read_query("posts.check_owner", check_query, {"user_id": user_id, "id": post_id})
     check_records = check.get("records", []) if isinstance(check, dict) else check
     if not check_records:
         raise HTTPException(status_code=403, detail="You are not allowed to update this post")
@@ -204,32 +381,18 @@ async def update_post(post_id: str, content: Optional[str], image: Optional[Uplo
     # Perform update
     update_query = """
     MATCH (p:Post {id: $id})
-    SET p += $updates
+    WHERE p.deleted_at IS NULL
+    SET p += $updates, p.updated_at = datetime()
     RETURN p
     """
-    result = db.execute_query(update_query, {"id": post_id, "updates": updates}, database_="neo4j")
-    records = result.get("records", []) if isinstance(result, dict) else result
+    result = execute_query("posts.update", update_query, {"id": post_id, "updates": updates})
+    records = result.records
 
     if not records:
         raise HTTPException(status_code=404, detail="Post not found")
+    coherence.bump("posts")
 
-    post_data = dict(records[0]["p"])
-    # normalize created_at if present
-    try:
-        ca = records[0]["p"].get("created_at")
-        if ca is not None:
-            if hasattr(ca, "to_native"):
-                native = ca.to_native()
-                if isinstance(native, _py_datetime):
-                    post_data["created_at"] = native.isoformat()
-                else:
-                    post_data["created_at"] = str(native)
-            elif isinstance(ca, _py_datetime):
-                post_data["created_at"] = ca.isoformat()
-            else:
-                post_data["created_at"] = str(ca)
-    except Exception:
-        pass
+    post_data = views.counter.overlay(_post_payload(records[0]["p"]))
     return {"message": "Post updated successfully", "post": post_data}
 
 
@@ -237,29 +400,42 @@ async def update_post(post_id: str, content: Optional[str], image: Optional[Uplo
 # ✅ DELETE POST (Authenticated + Ownership Check)
 # ========================================
 def delete_post(post_id: str, current_user: dict):
-    db = get_db()
     user_id = current_user["user_id"]
 
     # Check ownership
     check_query = """
     MATCH (u:User {user_id: $user_id})-[:CREATED]->(p:Post {id: $id})
+    WHERE p.deleted_at IS NULL
     RETURN p
     """
-    check = db.execute_query(check_query, {"user_id": user_id, "id": post_id}, database_="neo4j")
+    check = read_query("posts.check_owner", check_query, {"user_id": user_id, "id": post_id})
     check_records = check.get("records", []) if isinstance(check, dict) else check
     if not check_records:
         raise HTTPException(status_code=403, detail="You are not allowed to delete this post")
 
-    # Delete post
+    # Mark the post deleted; app.purge removes it with its comments, reactions,
+    # notifications and images in the background
     delete_query = """
     MATCH (p:Post {id: $id})
-    DETACH DELETE p
+    WHERE p.deleted_at IS NULL
+    """ + purge.claim("p") + """
+    WITH p WHERE p.deleted_at IS NULL
+    SET p.deleted_at = datetime()
+    // Outlives the post once app.purge removes it, for clients syncing via /posts/changes
+    MERGE (t:PostTombstone {post_id: p.id})
+    ON CREATE SET t.deleted_at = p.deleted_at
+    WITH p
+    OPTIONAL MATCH (author:User)-[:CREATED]->(p)
+    SET author.post_count = author.post_count - 1
     RETURN $id AS id
     """
-    result = db.execute_query(delete_query, {"id": post_id}, database_="neo4j")
-    records = result.get("records", []) if isinstance(result, dict) else result
+    result = execute_query("posts.delete", delete_query, {"id": post_id})
+    purge.purger.wake()
+    records = result.records
 
     if not records:
         raise HTTPException(status_code=404, detail="Post not found")
+    coherence.bump("posts")
+    bus.publish(PostDeleted(post_id=post_id, author_id=user_id))
 
     return {"message": "Post deleted successfully", "post_id": post_id}
@@ -1,59 +1,73 @@
 from fastapi import HTTPException
-from app.db import get_db
+from app.db import execute_query, read_query
+from app.cache import LocalCache, coherence
+from app import purge, reaction_buffer
+from app.events import bus, ReactionChanged
+from app.singleflight import flights
+from app.circuit import LastGood
 from app.models.reaction import ReactionCreate, ReactionResponse
-from app.controllers import notification_controller
 from datetime import datetime
 from app.auth import SECRET_KEY, ALGORITHM
 from jose import jwt
 
+# Aggregated counts per post id, kept coherent across workers (see app.cache)
+counts_cache = LocalCache("reaction_counts", domains=("reactions",), maxsize=4096)
+# Last counts read from the graph, served while the database is unavailable (see app.circuit)
+counts_last_good = LastGood("reaction_counts", maxsize=4096)
+
 def create_reaction(reaction: ReactionCreate, current_user: dict):
-    db = get_db()
-    
     # First get the post author to create notification
     post_query = """
     MATCH (p:Post {id: $post_id})<-[:CREATED]-(author:User)
+    WHERE p.deleted_at IS NULL
     RETURN author.user_id AS author_id
     """
-    post_result = db.execute_query(post_query, {"post_id": reaction.post_id}, database_="neo4j")
+    post_result = read_query("reactions.post_author", post_query, {"post_id": reaction.post_id})
     post_records = post_result[0] if post_result and len(post_result) > 0 else []
     
     author_id = post_records[0].get("author_id") if post_records else None
+
+    if reaction_buffer.buffer.enabled:
+        return _buffer_reaction(reaction, current_user, author_id)
     
     # Use MERGE to ensure a single REACTED relationship per user-post pair
     # If it exists, update the type; otherwise create it.
     query = """
     MATCH (u:User {user_id: $user_id}), (p:Post {id: $post_id})
+    WHERE p.deleted_at IS NULL
     MERGE (u)-[r:REACTED]->(p)
-    SET r.type = $type, r.created_at = datetime()
-    RETURN r, u.user_id AS user_id, u.username AS username, p.id AS post_id
+    WITH u, p, r, r.type IS NULL AS created
+    SET r.type = $type, r.created_at = datetime(),
+        u.reaction_count = u.reaction_count + CASE WHEN created THEN 1 ELSE 0 END
+    RETURN r, u.user_id AS user_id, u.username AS username, p.id AS post_id, created
     """
     try:
-        result = db.execute_query(
+        result = execute_query(
+            "reactions.upsert",
             query,
             {
                 "user_id": current_user["user_id"],
                 "post_id": reaction.post_id,
                 "type": reaction.type,
             },
-            database_="neo4j",
         )
 
         if not result or not result[0]:
             raise HTTPException(status_code=500, detail="Failed to create reaction")
+        coherence.bump("reactions")
 
         record = result[0][0]
+        # Trending and notifying the post author follow in app.subscribers
+        bus.publish(ReactionChanged(
+            post_id=reaction.post_id,
+            user_id=current_user["user_id"],
+            type=reaction.type,
+            created=record["created"],
+            post_author_id=author_id,
+        ))
         created_at = record["r"]["created_at"]
         if hasattr(created_at, "to_native"):
             created_at = created_at.to_native()
-        
-        # Create notification for post author (only if author exists and actor is not the author)
-        if author_id and author_id != current_user.get("user_id"):
-            notification_controller.create_notification(
-                user_id=author_id,
-                actor_id=current_user["user_id"],
-                notification_type=reaction.type,  # "like", "love", "haha", "care"
-                post_id=reaction.post_id
-            )
 
         return ReactionResponse(
             reaction_id=f"{record['user_id']}_{record['post_id']}",
@@ -69,20 +83,65 @@ def create_reaction(reaction: ReactionCreate, current_user: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _buffer_reaction(reaction: ReactionCreate, current_user: dict, author_id: str | None):
+    """Coalesced path: queue the upsert; trending and notifications follow the flush."""
+    if not author_id:
+        raise HTTPException(status_code=404, detail="Post not found")
+    reaction_buffer.buffer.add(reaction.post_id, current_user["user_id"], reaction.type)
+    return ReactionResponse(
+        reaction_id=f"{current_user['user_id']}_{reaction.post_id}",
+        post_id=reaction.post_id,
+        user_id=current_user["user_id"],
+        username=current_user.get("username"),
+        type=reaction.type,
+        created_at=datetime.now(),
+    )
+
+
+def _after_flush(post_id: str, rows: list):
+    """Publish the changes of a coalesced flush, once per surviving (user, post) action."""
+    changed = [row for row in rows if row["changed"]]
+    author_id = None
+    if any(row["type"] is not None for row in changed):
+        # Only upserts notify the post author
+        author_result = read_query("reactions.post_author", """
+        MATCH (p:Post {id: $post_id})<-[:CREATED]-(author:User)
+        RETURN author.user_id AS author_id
+        """, {"post_id": post_id})
+        if author_result.records:
+            author_id = author_result.records[0]["author_id"]
+    for row in changed:
+        bus.publish(ReactionChanged(
+            post_id=post_id, user_id=row["user_id"], type=row["type"], created=row["created"], post_author_id=author_id,
+            reacted_at=_epoch_seconds(row["reacted_at"]),
+        ))
+
+
+def _epoch_seconds(value) -> float | None:
+    if value is None:
+        return None
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    return value.timestamp()
+
+
+reaction_buffer.buffer.on_flush = _after_flush
+
+
 def get_all_reactions():
     """
     Fetch all reactions with related users (username) and posts.
     Handles both Neo4j Aura list and Record structures.
     """
-    db = get_db()
     query = """
     MATCH (u:User)-[r:REACTED]->(p:Post)
+    WHERE p.deleted_at IS NULL AND u.deleted_at IS NULL
     RETURN r AS reaction, u AS user, p AS post
     ORDER BY r.created_at DESC
     """
 
     try:
-        result = db.execute_query(query, database_="neo4j")
+        result = read_query("reactions.list", query)
         # Depending on driver version, `result` may be dict or list-like
         records = result.get("records", []) if isinstance(result, dict) else result
 
@@ -151,16 +210,34 @@ def delete_reaction(post_id: str, current_user: dict):
     """
     Delete the REACTED relationship for the current user on the given post.
     """
-    db = get_db()
+    if reaction_buffer.buffer.enabled:
+        reaction_buffer.buffer.add(post_id, current_user["user_id"], None)
+        return {"success": True, "post_id": post_id}
+
+    # Claimed like app.purge's post_reactions step, so the two never both subtract one reaction
     query = """
-    MATCH (u:User {user_id: $user_id})-[r:REACTED]->(p:Post {id: $post_id})
-    WITH u, p, r.type AS type
+    MATCH (u:User {user_id: $user_id})
+    """ + purge.claim("u") + """
+    WITH u
+    MATCH (u)-[r:REACTED]->(p:Post {id: $post_id})
+    WITH u, p, r, r.type AS type, r.created_at AS reacted_at
     DELETE r
-    RETURN u.user_id AS user_id, p.id AS post_id, type AS type
+    SET u.reaction_count = u.reaction_count - 1
+    RETURN u.user_id AS user_id, p.id AS post_id, type AS type, reacted_at
     """
 
     try:
-        result = db.execute_query(query, {"user_id": current_user["user_id"], "post_id": post_id}, database_="neo4j")
+        result = execute_query(
+            "reactions.delete",
+            query,
+            {"user_id": current_user["user_id"], "post_id": post_id},
+        )
+        if result.records:
+            coherence.bump("reactions")
+            bus.publish(ReactionChanged(
+                post_id=post_id, user_id=current_user["user_id"], type=None, created=False,
+                reacted_at=_epoch_seconds(result.records[0]["reacted_at"]),
+            ))
         # result may be list-like or dict depending on driver
         records = result[0] if isinstance(result, (list, tuple)) and len(result) > 0 else (result.get("records") if isinstance(result, dict) else result)
 
@@ -176,7 +253,6 @@ def get_reactions_for_post(post_id: str, token: str | None = None):
     Return aggregated reaction counts for a post and optionally the current user's reaction if a valid token is provided.
     Response shape: { counts: {like, love, haha, care, total}, user_reaction: str|null, reactions: [..] }
     """
-    db = get_db()
     user_id = None
     if token:
         try:
@@ -188,7 +264,8 @@ def get_reactions_for_post(post_id: str, token: str | None = None):
 
     # Aggregate counts per type
     counts_query = """
-    MATCH (:User)-[r:REACTED]->(p:Post {id: $post_id})
+    MATCH (u:User)-[r:REACTED]->(p:Post {id: $post_id})
+    WHERE u.deleted_at IS NULL
     RETURN r.type AS type, count(r) AS cnt
     """
 
@@ -199,44 +276,47 @@ def get_reactions_for_post(post_id: str, token: str | None = None):
     """
 
     try:
-        counts_result = db.execute_query(counts_query, {"post_id": post_id}, database_="neo4j")
-        counts_records = counts_result.get("records", []) if isinstance(counts_result, dict) else counts_result
-
-        counts = {"like": 0, "love": 0, "haha": 0, "care": 0, "total": 0}
-        for rec in counts_records:
-            # rec may be dict-like or tuple-like
-            if isinstance(rec, dict):
-                t = rec.get("type")
-                c = rec.get("cnt")
-            else:
-                try:
-                    t, c = rec
-                except Exception:
-                    continue
-            if t and counts.get(t) is not None:
-                counts[t] = int(c)
-                counts["total"] += int(c)
+        counts = counts_cache.get(post_id)
+        if counts is None:
+            def load():
+                generation, fresh = flights.do(
+                    "reactions.counts", post_id,
+                    lambda: (counts_cache.generation, _count_reactions(post_id, counts_query)),
+                )
+                counts_cache.set(post_id, fresh, generation)
+                return fresh
+
+            counts = counts_last_good.call(post_id, load)
+        counts = dict(counts)
 
         user_reaction = None
-        if user_id:
+        buffered, buffered_reaction = reaction_buffer.buffer.pending_reaction(post_id, user_id) if user_id else (False, None)
+        if buffered:
+            # The user's own action is still waiting in the coalescing buffer
+            user_reaction = buffered_reaction
+        elif user_id:
             try:
-                user_result = db.execute_query(user_query, {"post_id": post_id, "user_id": user_id}, database_="neo4j")
-                user_records = user_result.get("records", []) if isinstance(user_result, dict) else user_result
-                if user_records:
-                    # record may be dict-like or tuple-like
-                    rec = user_records[0]
-                    if isinstance(rec, dict):
-                        user_reaction = rec.get("type")
-                    else:
-                        try:
-                            user_reaction = rec[0]
-                        except Exception:
-                            user_reaction = None
+                user_result = read_query("reactions.user_reaction", user_query, {"post_id": post_id, "user_id": user_id})
+                if user_result.records:
+                    user_reaction = user_result.records[0]["type"]
             except Exception:
                 user_reaction = None
 
         return {"counts": counts, "user_reaction": user_reaction}
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"⚠️ Error in get_reactions_for_post: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _count_reactions(post_id: str, counts_query: str) -> dict:
+    counts_result = read_query("reactions.counts", counts_query, {"post_id": post_id})
+    counts = {"like": 0, "love": 0, "haha": 0, "care": 0, "total": 0}
+    for rec in counts_result.records:
+        t, c = rec["type"], rec["cnt"]
+        if t and counts.get(t) is not None:
+            counts[t] = int(c)
+            counts["total"] += int(c)
+    return counts
@@ -0,0 +1,123 @@
+import base64
+import binascii
+import json
+import re
+from fastapi import HTTPException
+from app.db import read_query
+from app import profiles
+
+# Ranking happens inside the full-text indexes (see app.schema), which yield hits best
+# first. Soft-deleted nodes stay in the index until app.purge removes them, so they are
+# filtered out before SKIP/LIMIT: a page is always full while live hits remain, and the
+# pipeline stops pulling hits from Lucene once the page is complete. Only that page is
+# projected.
+
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/&|])')
+_LUCENE_OPERATORS = {"AND", "OR", "NOT", "TO"}
+
+SEARCH_QUERIES = {
+    "posts": """
+    CALL db.index.fulltext.queryNodes("post_content_fulltext", $q)
+    YIELD node AS p, score
+    WHERE p.deleted_at IS NULL
+    WITH p, score SKIP $skip LIMIT $limit
+    RETURN p.id AS post_id, p.content AS content, p.image_url AS image_url, p.created_at AS created_at,
+           p.author_id AS user_id, score
+    ORDER BY score DESC
+    """,
+    "comments": """
+    CALL db.index.fulltext.queryNodes("comment_content_fulltext", $q)
+    YIELD node AS c, score
+    WHERE c.deleted_at IS NULL
+    WITH c, score SKIP $skip LIMIT $limit
+    OPTIONAL MATCH (c)-[:ON]->(p:Post)
+    RETURN c.id AS comment_id, p.id AS post_id, c.content AS content, c.image_url AS image_url,
+           c.created_at AS created_at, c.author_id AS user_id, score
+    ORDER BY score DESC
+    """,
+    "users": """
+    CALL db.index.fulltext.queryNodes("user_name_fulltext", $q)
+    YIELD node AS u, score
+    WHERE u.deleted_at IS NULL
+    WITH u, score SKIP $skip LIMIT $limit
+    RETURN u.user_id AS user_id, u.username AS username, u.name AS name,
+           u.profile_picture AS profile_picture, score
+    ORDER BY score DESC
+    """,
+}
+
+
+def to_lucene(text: str) -> str:
+    """
+    Turn free text into a Lucene query: every term is escaped so user input can't break
+    the query syntax, and the last term also matches as a prefix for search-as-you-type.
+    """
+    terms = [
+        term.lower() if term in _LUCENE_OPERATORS else _LUCENE_SPECIAL.sub(r"\\\1", term)
+        for term in text.split()
+    ]
+    if not terms:
+        return ""
+    terms[-1] = f"({terms[-1]} OR {terms[-1]}*)"
+    return " ".join(terms)
+
+
+def encode_cursor(search_type: str, offset: int) -> str:
+    raw = json.dumps({"t": search_type, "o": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, search_type: str) -> int:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(data["o"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data.get("t") != search_type or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this search")
+    return offset
+
+
+def search(q: str, search_type: str, cursor: str | None, limit: int):
+    if search_type not in SEARCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"type must be one of {sorted(SEARCH_QUERIES)}")
+    lucene_query = to_lucene(q)
+    if not lucene_query:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    offset = decode_cursor(cursor, search_type) if cursor else 0
+
+    try:
+        # One extra hit tells us whether there is a next page without a count query
+        result = read_query(
+            f"search.{search_type}",
+            SEARCH_QUERIES[search_type],
+            {"q": lucene_query, "skip": offset, "limit": limit + 1},
+        )
+    except Exception as e:
+        print(f"⚠️ Error in search: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = []
+    for record in result.records[:limit]:
+        item = record.data()
+        created_at = item.get("created_at")
+        if hasattr(created_at, "to_native"):
+            item["created_at"] = created_at.to_native()
+        item["score"] = round(item["score"], 4)
+        results.append(item)
+
+    if search_type != "users":
+        # Author fields come from the profile cache; a missing author leaves them empty
+        authors = profiles.get_profiles(item["user_id"] for item in results)
+        for item in results:
+            author = authors.get(item["user_id"]) or {}
+            item["username"] = author.get("username")
+            item["profile_picture"] = author.get("profile_picture")
+
+    has_more = len(result.records) > limit
+    return {
+        "type": search_type,
+        "query": q,
+        "results": results,
+        "next_cursor": encode_cursor(search_type, offset + limit) if has_more else None,
+    }
@@ -1,25 +1,26 @@
 import uuid
 from datetime import timedelta
 from fastapi import HTTPException, UploadFile
-from app.db import get_db, hash_password, verify_password
+from app.db import open_session, run_query, hash_password, verify_password
 from app.models.user_model import User, UpdateUser, LoginRequest
 from app.auth import create_access_token
 from app.cloudinary_util import upload_image
+from app.cache import coherence
+from app import purge, typeahead
 
 
 def register_user(user: User):
-    db = get_db()
     hashed_password = hash_password(user.password)
 
-    with db.session() as session:
+    with open_session() as session:
         # Check if user exists
         query = """
         MATCH (u:User)
         WHERE u.email = $email OR u.username = $username
         RETURN u
         """
-        result = session.run(query, email=user.email, username=user.username)
-        if result.single():
+        result = run_query(session, "users.exists", query, email=user.email, username=user.username)
+        if result.records:
             raise HTTPException(status_code=400, detail="Username or email already exists")
 
         user_id = str(uuid.uuid4())
@@ -30,11 +31,16 @@ def register_user(user: User):
             username: $username,
             name: $name,
             email: $email,
-            password: $password
+            password: $password,
+            post_count: 0,
+            comment_count: 0,
+            reaction_count: 0
         })
         RETURN u
         """
-        session.run(
+        run_query(
+            session,
+            "users.create",
             query,
             user_id=user_id,
             username=user.username,
@@ -42,18 +48,19 @@ def register_user(user: User):
             email=user.email,
             password=hashed_password,
         )
+        coherence.bump("users")
+        typeahead.index.upsert({"user_id": user_id, "username": user.username, "name": user.name})
 
         return {"message": "User registered successfully", "user_id": user_id}
 
 
 def authenticate_user(login_request: LoginRequest):
-    db = get_db()
-    with db.session() as session:
+    with open_session(read=True) as session:
         try:
             print("🔍 Checking email:", login_request.email)
-            query = "MATCH (u:User {email: $email}) RETURN u"
-            result = session.run(query, email=login_request.email)
-            record = result.single()
+            query = "MATCH (u:User {email: $email}) WHERE u.deleted_at IS NULL RETURN u"
+            result = run_query(session, "users.login", query, email=login_request.email)
+            record = result.records[0] if result.records else None
 
             if not record:
                 raise HTTPException(status_code=404, detail="User not found")
@@ -95,70 +102,103 @@ def authenticate_user(login_request: LoginRequest):
 
 def get_users():
     
-    db = get_db()
-    with db.session() as session:
-        query = "MATCH (u:User) RETURN u"
-        results = session.run(query)
-        users = [record["u"] for record in results]
+    with open_session(read=True) as session:
+        query = "MATCH (u:User) WHERE u.deleted_at IS NULL RETURN u"
+        results = run_query(session, "users.list", query)
+        users = [record["u"] for record in results.records]
         return {"users": users}
 
 
 def get_user_by_email(email: str):
-    db = get_db()
-    with db.session() as session:
-        query = "MATCH (u:User {email: $email}) RETURN u"
-        result = session.run(query, email=email)
-        record = result.single()
+    with open_session(read=True) as session:
+        query = "MATCH (u:User {email: $email}) WHERE u.deleted_at IS NULL RETURN u"
+        result = run_query(session, "users.by_email", query, email=email)
+        record = result.records[0] if result.records else None
         if not record:
             raise HTTPException(status_code=404, detail="User not found")
         return {"user": record["u"]}
 
 
+def get_user_profile(user_id: str):
+    """Public profile with post, comment and reaction totals kept on the User node (see app.user_counters)."""
+    with open_session(read=True) as session:
+        query = """
+        MATCH (u:User {user_id: $user_id})
+        WHERE u.deleted_at IS NULL
+        RETURN u.user_id AS user_id, u.username AS username, u.name AS name,
+               u.profile_picture AS profile_picture,
+               u.post_count AS post_count, u.comment_count AS comment_count, u.reaction_count AS reaction_count
+        """
+        result = run_query(session, "users.profile", query, user_id=user_id)
+        record = result.records[0] if result.records else None
+        if not record:
+            raise HTTPException(status_code=404, detail="User not found")
+        # Counters are null only until the startup backfill has reached this user
+        return {"profile": record.data()}
+
+
 def update_user(email: str, data: UpdateUser):
-    db = get_db()
-    with db.session() as session:
+    with open_session() as session:
         updates = {k: v for k, v in data.dict().items() if v is not None}
         query = """
         MATCH (u:User {email: $email})
+        WHERE u.deleted_at IS NULL
         SET u += $updates
         RETURN u
         """
-        result = session.run(query, email=email, updates=updates)
-        record = result.single()
+        result = run_query(session, "users.update", query, email=email, updates=updates)
+        record = result.records[0] if result.records else None
         if not record:
             raise HTTPException(status_code=404, detail="User not found")
+        coherence.bump("users")
+        typeahead.index.upsert(record["u"])
         return {"message": "User updated", "user": record["u"]}
 
 
 def delete_user(email: str):
-    db = get_db()
-    with db.session() as session:
-        query = "MATCH (u:User {email: $email}) DETACH DELETE u RETURN COUNT(u) AS deleted"
-        result = session.run(query, email=email)
-        count = result.single()["deleted"]
+    with open_session() as session:
+        # Mark the user deleted; app.purge removes their posts, comments, reactions,
+        # notifications and images, then the user, in the background
+        query = """
+        MATCH (u:User {email: $email})
+        WHERE u.deleted_at IS NULL
+        SET u.deleted_at = datetime()
+        RETURN COUNT(u) AS deleted, collect(u.user_id) AS user_ids
+        """
+        # Their posts drop out of the feed right away (it skips deleted authors)
+        result = run_query(session, "users.delete", query, email=email)
+        count = result.records[0]["deleted"]
         if count == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        coherence.bump("users", "posts")
+        for user_id in result.records[0]["user_ids"]:
+            typeahead.index.remove(user_id)
+        purge.purger.wake()
         return {"message": "User deleted"}
 
 
 async def upload_profile_picture(image: UploadFile, current_user: dict):
     """Upload or update user profile picture"""
-    db = get_db()
-    
     # Upload image to Cloudinary
     result = await upload_image(image, folder="drawsphere/profiles")
     image_url = result["url"]
     
-    with db.session() as session:
+    with open_session() as session:
         query = """
         MATCH (u:User {user_id: $user_id})
+        WHERE u.deleted_at IS NULL
         SET u.profile_picture = $profile_picture
         RETURN u
         """
-        result = session.run(query, user_id=current_user["user_id"], profile_picture=image_url)
-        record = result.single()
+        result = run_query(
+            session, "users.set_profile_picture", query,
+            user_id=current_user["user_id"], profile_picture=image_url,
+        )
+        record = result.records[0] if result.records else None
         if not record:
             raise HTTPException(status_code=404, detail="User not found")
+        coherence.bump("users")
+        typeahead.index.upsert(record["u"])
         
         return {
             "message": "Profile picture updated successfully",
@@ -1,40 +1,251 @@
-from passlib.context import CryptContext
-from neo4j import GraphDatabase
-from app.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
-
-# Create the database driver
-try:
-    driver = GraphDatabase.driver(
-        NEO4J_URI,
-        auth=(NEO4J_USER, NEO4J_PASSWORD),
-        keep_alive=True
-    )
+import threading
+import time
+from contextvars import ContextVar
+from neo4j import GraphDatabase, Query, RoutingControl, READ_ACCESS, WRITE_ACCESS
+from neo4j.api import BookmarkManager
+from app.config import (
+    NEO4J_URI,
+    NEO4J_USER,
+    NEO4J_PASSWORD,
+    NEO4J_DATABASE,
+    NEO4J_MAX_POOL_SIZE,
+    NEO4J_ACQUISITION_TIMEOUT_S,
+    NEO4J_CONNECTION_TIMEOUT_S,
+    NEO4J_MAX_CONNECTION_LIFETIME_S,
+    NEO4J_LIVENESS_CHECK_S,
+)
+from app import query_log, request_costs
+from app.circuit import breaker
+from app.metrics import db_query_seconds, db_query_errors, db_pool_connections, db_pool_max_size, register_collector
 
-    # Test connection once on startup
-    with driver.session() as session:
-        session.run("RETURN 1 AS test")
-    print("✅ Successfully connected to Neo4j AuraDB!")
+# The driver is created on first use (or by the app lifespan), never at import time:
+# creating it is cheap and local, but verifying connectivity is an AuraDB round trip
+# that must not block importing the app.
+driver = None
+_driver_lock = threading.Lock()
 
-except Exception as e:
-    # If we can't connect at import time (for example during local development
-    # without network access to AuraDB), don't raise here - allow the app to
-    # start and fail later when a DB operation is attempted. Keep driver as
-    # None so callers can detect the absence of a connection.
-    print("❌ Failed to connect to Neo4j AuraDB:", e)
-    driver = None
+# Password hashing is set up lazily too (passlib + argon2 are only needed for auth routes)
+pwd_context = None
 
-# Password hashing setup
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
-def get_db():
+def init_driver():
+    """Create the driver if needed. Does not touch the network."""
+    global driver
+    with _driver_lock:
+        if driver is None:
+            driver = GraphDatabase.driver(
+                NEO4J_URI,
+                auth=(NEO4J_USER, NEO4J_PASSWORD),
+                keep_alive=True,
+                max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT_S,
+                connection_timeout=NEO4J_CONNECTION_TIMEOUT_S,
+                max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME_S,
+                liveness_check_timeout=NEO4J_LIVENESS_CHECK_S,
+            )
     return driver
 
+
+def verify_connectivity():
+    """One round trip to AuraDB; raises if the database is unreachable."""
+    init_driver().verify_connectivity()
+
+
+def warm_pool(connections: int):
+    """Open `connections` pooled connections up front so the first requests don't pay for TLS + auth."""
+    sessions = [init_driver().session(database=NEO4J_DATABASE) for _ in range(connections)]
+    try:
+        # An open transaction pins its connection, so each one forces a new pooled connection
+        for session in sessions:
+            session.begin_transaction().run("RETURN 1").consume()
+    finally:
+        for session in sessions:
+            session.close()
+
+
+def close_driver():
+    global driver
+    with _driver_lock:
+        if driver is not None:
+            driver.close()
+            driver = None
+
+
+def get_db():
+    return driver if driver is not None else init_driver()
+
+
+# ===========================
+# ✅ CAUSAL BOOKMARKS
+# ===========================
+class RequestBookmarkManager(BookmarkManager):
+    """
+    Bookmarks for one HTTP request: the process-wide bookmarks (so this worker always
+    reads its own writes, as before) plus any bookmarks the client sent back from an
+    earlier response, which may come from another worker. Writes update the shared
+    manager and are remembered so the response can hand them to the client.
+    """
+
+    def __init__(self, shared: BookmarkManager, client_bookmarks=()):
+        self.shared = shared
+        self.client_bookmarks = set(client_bookmarks)
+        self.latest = None
+
+    def get_bookmarks(self):
+        return set(self.shared.get_bookmarks()) | self.client_bookmarks
+
+    def update_bookmarks(self, previous_bookmarks, new_bookmarks):
+        self.shared.update_bookmarks(previous_bookmarks, new_bookmarks)
+        self.client_bookmarks.difference_update(previous_bookmarks)
+        self.latest = set(new_bookmarks)
+
+
+_request_bookmarks: ContextVar[RequestBookmarkManager | None] = ContextVar("request_bookmarks", default=None)
+
+
+def begin_request_bookmarks(client_bookmarks=()) -> RequestBookmarkManager:
+    manager = RequestBookmarkManager(get_db().execute_query_bookmark_manager, client_bookmarks)
+    _request_bookmarks.set(manager)
+    return manager
+
+
+def current_bookmark_manager():
+    """The request's bookmark manager, or the driver's process-wide one outside a request."""
+    return _request_bookmarks.get() or get_db().execute_query_bookmark_manager
+
+
+def open_session(read: bool = False, **config):
+    """Open a session on the configured database, routed to a reader for `read=True`."""
+    return get_db().session(
+        database=NEO4J_DATABASE,
+        default_access_mode=READ_ACCESS if read else WRITE_ACCESS,
+        bookmark_manager=current_bookmark_manager(),
+        **config,
+    )
+
+
+BOOKMARK_HEADER = "X-Neo4j-Bookmark"
+
+
+class BookmarkMiddleware:
+    """
+    ASGI middleware propagating causal bookmarks: the client echoes the
+    X-Neo4j-Bookmark value from a write response (e.g. create_post, create_comment)
+    on its next request, and reads then wait for that write even on another worker
+    or a read replica.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client_bookmarks = [
+            bookmark.strip()
+            for name, value in scope["headers"] if name.decode("latin-1").lower() == BOOKMARK_HEADER.lower()
+            for bookmark in value.decode("latin-1").split(",") if bookmark.strip()
+        ]
+        manager = begin_request_bookmarks(client_bookmarks)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and manager.latest:
+                headers = list(message.get("headers", []))
+                headers.append((BOOKMARK_HEADER.encode("latin-1"), ",".join(sorted(manager.latest)).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# ===========================
+# ✅ INSTRUMENTED QUERY HELPERS
+# ===========================
+def execute_query(name: str, query: str, parameters: dict | None = None, **kwargs):
+    """
+    Run `driver.execute_query` under a stable query name and record its timings.
+    Uses the configured database and the request's causal bookmarks; routed to the
+    leader unless `routing_` says otherwise. Returns the driver's EagerResult unchanged.
+    """
+    kwargs.setdefault("database_", NEO4J_DATABASE)
+    kwargs.setdefault("bookmark_manager_", current_bookmark_manager())
+    return _observe(name, query, parameters, lambda: get_db().execute_query(_named(name, query), parameters, **kwargs))
+
+
+def read_query(name: str, query: str, parameters: dict | None = None, **kwargs):
+    """`execute_query` routed to a read replica/follower."""
+    return execute_query(name, query, parameters, routing_=RoutingControl.READ, **kwargs)
+
+
+def run_query(session, name: str, query: str, /, **parameters):
+    """
+    Run `session.run` under a stable query name. The result is consumed eagerly so the
+    server timings are available; returns an EagerResult like `execute_query`.
+    """
+    return _observe(name, query, parameters, lambda: session.run(_named(name, query), parameters).to_eager_result())
+
+
+def _named(name: str, query: str):
+    # The name travels as transaction metadata, so it also shows up in the server's query log
+    return Query(query, metadata={"query_name": name})
+
+
+def _observe(name: str, query: str, parameters: dict | None, fn):
+    probe = breaker.before_query()
+    start = time.perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        request_costs.add_query(name, elapsed)
+        breaker.after_query(elapsed, e, probe, timed=request_costs.current() is not None)
+        db_query_errors.inc(query=name)
+        query_log.record(name, query, parameters, elapsed * 1000, error=True)
+        raise
+    elapsed = time.perf_counter() - start
+    request_costs.add_query(name, elapsed)
+    # Only queries run for a request count as slow; background work is slow by design
+    breaker.after_query(elapsed, None, probe, timed=request_costs.current() is not None)
+    db_query_seconds.observe(elapsed, query=name, phase="client")
+    query_log.record(name, query, parameters, elapsed * 1000)
+
+    summary = getattr(result, "summary", None)
+    if summary is not None:
+        if summary.result_available_after is not None:
+            db_query_seconds.observe(summary.result_available_after / 1000, query=name, phase="available")
+        if summary.result_consumed_after is not None:
+            db_query_seconds.observe(summary.result_consumed_after / 1000, query=name, phase="consumed")
+    return result
+
+
+@register_collector
+def _collect_pool_metrics():
+    # The driver has no public pool API; read its internals defensively
+    pool = getattr(driver, "_pool", None)
+    if pool is None:
+        return
+    db_pool_max_size.set(pool.pool_config.max_connection_size)
+    for address, connections in list(pool.connections.items()):
+        in_use = pool.in_use_connection_count(address)
+        db_pool_connections.set(in_use, address=str(address), state="in_use")
+        db_pool_connections.set(len(connections) - in_use, address=str(address), state="idle")
+
+
+def get_pwd_context():
+    global pwd_context
+    if pwd_context is None:
+        from passlib.context import CryptContext
+        pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+    return pwd_context
+
 def hash_password(password: str) -> str:
     if len(password) > 500:
         password = password[:500]
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     if len(plain_password) > 500:
         plain_password = plain_password[:500]
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
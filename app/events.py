@@ -0,0 +1,210 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+from app.config import EVENT_QUEUE_SIZE, EVENT_BATCH_SIZE
+from app.metrics import Counter, Gauge, Histogram, register_collector
+
+# In-process domain events. Write paths publish what happened (PostCreated,
+# CommentCreated, ReactionChanged, ...) once their transaction has committed, and
+# side effects such as notifications and trending scores subscribe to them instead of
+# being called from the controllers (see app.subscribers).
+#
+# Every subscriber has its own bounded queue and worker thread, so a slow one (the
+# notification writes) never delays the response or another subscriber. Workers take
+# up to EVENT_BATCH_SIZE queued events at a time, which lets a handler write a burst in
+# one UNWIND. A full queue drops the event rather than blocking the request; drops,
+# failures and the lag from publish to handling are exported per subscriber. Events
+# are not persisted: whatever is queued when the process dies is lost, as with the
+# view and reaction buffers.
+
+
+# ---- events ----------------------------------------------------------------
+@dataclass(frozen=True)
+class PostCreated:
+    post_id: str
+    author_id: str
+    # Users linked by @mentions (see app.mentions)
+    mentioned_ids: tuple = ()
+
+
+@dataclass(frozen=True)
+class PostDeleted:
+    post_id: str
+    author_id: str
+
+
+@dataclass(frozen=True)
+class CommentCreated:
+    comment_id: str
+    post_id: str
+    author_id: str
+    # Set for top-level comments, whose post author is notified
+    post_author_id: str | None = None
+    # Set for replies
+    parent_id: str | None = None
+    mentioned_ids: tuple = ()
+
+
+@dataclass(frozen=True)
+class CommentDeleted:
+    comment_id: str
+    author_id: str
+
+
+@dataclass(frozen=True)
+class ReactionChanged:
+    post_id: str
+    user_id: str
+    # None when the reaction was removed
+    type: str | None
+    # A new reaction rather than a changed type
+    created: bool
+    post_author_id: str | None = None
+    # For removals, when the removed reaction was made (epoch seconds), so trending can
+    # take back exactly what it added
+    reacted_at: float | None = None
+
+
+# ---- metrics ---------------------------------------------------------------
+event_lag_seconds = Histogram(
+    "event_lag_seconds",
+    "Time from publishing an event to a subscriber starting to handle it.",
+    ("subscriber",),
+)
+events_handled = Counter(
+    "events_handled_total",
+    "Events handled per subscriber and outcome (ok, error).",
+    ("subscriber", "outcome"),
+)
+events_dropped = Counter(
+    "events_dropped_total",
+    "Events dropped because the subscriber's queue was full.",
+    ("subscriber",),
+)
+event_queue_depth = Gauge("event_queue_depth", "Events waiting per subscriber.", ("subscriber",))
+
+
+# ---- bus -------------------------------------------------------------------
+class Subscriber:
+    def __init__(self, name: str, handler, maxsize: int, batch_size: int):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def offer(self, event) -> bool:
+        self._ensure_started()
+        try:
+            self.queue.put_nowait((time.monotonic(), event))
+            return True
+        except queue.Full:
+            events_dropped.inc(subscriber=self.name)
+            return False
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"events-{self.name}", daemon=True)
+                    self._thread.start()
+
+    def stop(self, timeout: float):
+        """Handle what is queued, then end the worker."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self.queue.put((time.monotonic(), None))
+            thread.join(timeout=timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = any(event is None for _, event in batch)
+            events = [event for _, event in batch if event is not None]
+            if events:
+                self._handle(events, [published for published, event in batch if event is not None])
+            for _ in batch:
+                self.queue.task_done()
+            if stopping:
+                return
+
+    def _handle(self, events: list, published: list):
+        now = time.monotonic()
+        for at in published:
+            event_lag_seconds.observe(now - at, subscriber=self.name)
+        try:
+            self.handler(events)
+        except Exception as e:
+            events_handled.inc(len(events), subscriber=self.name, outcome="error")
+            print(f"⚠️ Event subscriber {self.name} failed on {len(events)} events: {e}")
+        else:
+            events_handled.inc(len(events), subscriber=self.name, outcome="ok")
+
+
+class EventBus:
+    def __init__(self, maxsize: int, batch_size: int):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self._subscribers = {}  # name -> Subscriber
+        self._routes = {}       # event class -> [Subscriber]
+
+    def subscribe(self, name: str, *event_types, maxsize: int | None = None, batch_size: int | None = None):
+        """
+        Decorator registering `handler(events)` for the given event classes. The handler
+        gets a list of one or more events, in publish order, from its own worker thread.
+        """
+
+        def decorate(handler):
+            if name in self._subscribers:
+                raise ValueError(f"Event subscriber {name!r} is already registered")
+            subscriber = Subscriber(name, handler, maxsize or self.maxsize, batch_size or self.batch_size)
+            self._subscribers[name] = subscriber
+            for event_type in event_types:
+                self._routes.setdefault(event_type, []).append(subscriber)
+            return handler
+
+        return decorate
+
+    def publish(self, event):
+        """Queue `event` for its subscribers; never blocks and never raises."""
+        for subscriber in self._routes.get(type(event), ()):
+            subscriber.offer(event)
+
+    def drain(self):
+        """Block until every queued event has been handled (benchmarks, scripts)."""
+        for subscriber in self._subscribers.values():
+            subscriber.queue.join()
+
+    def stop(self, timeout: float = 10):
+        for subscriber in self._subscribers.values():
+            subscriber.stop(timeout)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "queued": s.queue.qsize(),
+                "handled": events_handled.value(subscriber=name, outcome="ok"),
+                "errors": events_handled.value(subscriber=name, outcome="error"),
+                "dropped": events_dropped.value(subscriber=name),
+            }
+            for name, s in self._subscribers.items()
+        }
+
+
+bus = EventBus(EVENT_QUEUE_SIZE, EVENT_BATCH_SIZE)
+
+
+@register_collector
+def _collect_queue_depth():
+    for name, subscriber in bus._subscribers.items():
+        event_queue_depth.set(subscriber.queue.qsize(), subscriber=name)
@@ -0,0 +1,178 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from app import comment_paths, db, events, purge, reaction_buffer, schema, subscribers, tracing, trending, typeahead, user_counters, views, warm_snapshot
+from app.cache import coherence
+from app.config import (
+    DB_CONNECT_TIMEOUT_S,
+    DB_WARM_CONNECTIONS,
+    SCHEMA_SETUP_ENABLED,
+    COMMENT_PATH_BACKFILL_ENABLED,
+    USER_COUNTER_BACKFILL_ENABLED,
+    WARM_SNAPSHOT_PATH,
+)
+
+# Filled in during startup; served by GET /debug/startup
+startup_report = {}
+_import_started = None
+
+
+def _ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+async def connect_database():
+    """
+    Verify connectivity, warm the pool, create missing indexes and load in-memory
+    indexes off the request path. Each step has its own
+    timeout; failures are logged and the app keeps serving (queries fail until AuraDB is back).
+    """
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.to_thread(db.verify_connectivity), DB_CONNECT_TIMEOUT_S)
+        startup_report["connect_ms"] = _ms(started)
+        print("✅ Successfully connected to Neo4j AuraDB!")
+
+        if DB_WARM_CONNECTIONS > 0:
+            warm_started = time.perf_counter()
+            await asyncio.wait_for(asyncio.to_thread(db.warm_pool, DB_WARM_CONNECTIONS), DB_CONNECT_TIMEOUT_S)
+            startup_report["warm_pool_ms"] = _ms(warm_started)
+        startup_report["database"] = "connected"
+    except asyncio.TimeoutError:
+        startup_report["database"] = f"timed out after {DB_CONNECT_TIMEOUT_S}s"
+        print(f"❌ Neo4j AuraDB connection timed out after {DB_CONNECT_TIMEOUT_S}s")
+    except Exception as e:
+        startup_report["database"] = f"failed: {e}"
+        print("❌ Failed to connect to Neo4j AuraDB:", e)
+
+    if startup_report["database"] == "connected":
+        if SCHEMA_SETUP_ENABLED:
+            await setup_schema()
+        await load_in_memory_indexes()
+        if startup_report.get("warm_snapshot"):
+            await revalidate_warm_snapshot()
+
+    if _import_started is not None:
+        startup_report["ready_ms"] = _ms(_import_started)
+    print("⏱️ Startup timing (ms): " + ", ".join(
+        f"{key}={value}" for key, value in startup_report.items() if key.endswith("_ms")
+    ))
+
+    # Data migrations, not part of getting ready to serve
+    if startup_report["database"] == "connected":
+        await run_backfills()
+
+
+async def setup_schema():
+    """Create missing indexes; a failure is logged and only affects the features that need them."""
+    started = time.perf_counter()
+    try:
+        applied = await asyncio.wait_for(asyncio.to_thread(schema.ensure_schema), DB_CONNECT_TIMEOUT_S)
+        startup_report["schema_ms"] = _ms(started)
+        startup_report["schema"] = applied
+    except asyncio.TimeoutError:
+        startup_report["schema"] = f"timed out after {DB_CONNECT_TIMEOUT_S}s"
+        print(f"⚠️ Schema setup timed out after {DB_CONNECT_TIMEOUT_S}s")
+    except Exception as e:
+        startup_report["schema"] = f"failed: {e}"
+        print("⚠️ Schema setup failed:", e)
+
+
+async def load_in_memory_indexes():
+    """
+    Fill the process-local indexes. A failure is logged; each index retries in the
+    background on first use.
+    """
+    for name, load in (("typeahead", typeahead.index.load), ("trending", trending.scores.reconcile)):
+        started = time.perf_counter()
+        try:
+            size = await asyncio.wait_for(asyncio.to_thread(load), DB_CONNECT_TIMEOUT_S)
+            startup_report[f"{name}_ms"] = _ms(started)
+            startup_report[f"{name}_size"] = size
+        except asyncio.TimeoutError:
+            print(f"⚠️ {name} load timed out after {DB_CONNECT_TIMEOUT_S}s")
+        except Exception as e:
+            print(f"⚠️ {name} load failed:", e)
+
+
+async def revalidate_warm_snapshot():
+    """Check restored cache entries against the graph and rebuild the feed, now that it is reachable."""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.to_thread(warm_snapshot.snapshot.revalidate), DB_CONNECT_TIMEOUT_S)
+        startup_report["warm_snapshot_revalidate_ms"] = _ms(started)
+    except asyncio.TimeoutError:
+        print(f"⚠️ Warm snapshot revalidation timed out after {DB_CONNECT_TIMEOUT_S}s")
+    except Exception as e:
+        print("⚠️ Warm snapshot revalidation failed:", e)
+
+
+async def run_backfills():
+    """
+    Fill in data that older writes did not store (comment paths, user counters). No
+    timeout: they run last, in batches, and an interrupted backfill resumes at the next start.
+    """
+    backfills = (
+        ("comment_paths", COMMENT_PATH_BACKFILL_ENABLED, comment_paths.backfill),
+        ("user_counters", USER_COUNTER_BACKFILL_ENABLED, user_counters.backfill),
+    )
+    for name, enabled, backfill in backfills:
+        if not enabled:
+            continue
+        started = time.perf_counter()
+        try:
+            startup_report[f"{name}_backfilled"] = await asyncio.to_thread(backfill)
+            startup_report[f"{name}_backfill_ms"] = _ms(started)
+        except Exception as e:
+            print(f"⚠️ {name} backfill failed:", e)
+
+
+def mark_imported(import_started: float):
+    """
+    Called at the bottom of app.main with a timestamp taken at its top, so the report
+    separates module import time from driver and connect time.
+    """
+    global _import_started
+    _import_started = import_started
+    startup_report["import_ms"] = _ms(import_started)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    started = time.perf_counter()
+    db.init_driver()
+    startup_report["driver_init_ms"] = _ms(started)
+    if _import_started is not None:
+        startup_report["serving_ms"] = _ms(_import_started)
+
+    # Restored before the database is reached, so the first requests are served from it
+    if WARM_SNAPSHOT_PATH:
+        snapshot_started = time.perf_counter()
+        startup_report["warm_snapshot"] = await asyncio.to_thread(warm_snapshot.snapshot.load)
+        startup_report["warm_snapshot_ms"] = _ms(snapshot_started)
+        warm_snapshot.snapshot.start()
+
+    subscribers.register()
+    connect_task = asyncio.create_task(connect_database())
+    purge.purger.start()
+    views.counter.start()
+    try:
+        yield
+    finally:
+        connect_task.cancel()
+        await asyncio.to_thread(purge.purger.stop)
+        # Both write out what is still buffered, so they run before the driver closes
+        await asyncio.to_thread(reaction_buffer.buffer.stop)
+        await asyncio.to_thread(views.counter.stop)
+        # After the reaction buffer, whose last flush publishes events
+        await asyncio.to_thread(events.bus.stop)
+        # Last, so the version bumps of every flush above reach the other workers
+        try:
+            await asyncio.to_thread(coherence.flush_bumps)
+        except Exception as e:
+            print(f"⚠️ Final cache version bump failed: {e}")
+        if WARM_SNAPSHOT_PATH:
+            await asyncio.to_thread(warm_snapshot.snapshot.stop)
+        await asyncio.to_thread(tracing.writer.stop)
+        await asyncio.to_thread(db.close_driver)
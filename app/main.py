@@ -1,11 +1,22 @@
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 from app.routes import comment_routes, reaction_routes, notification_routes
 
-from app.routes import user_routes, post_routes
-from app.db import get_db
+from app.routes import user_routes, post_routes, search_routes, debug_routes
+from app.lifespan import lifespan, mark_imported
+from app.db import BookmarkMiddleware, BOOKMARK_HEADER
 from app.auth import get_current_user
+from app.config import MAX_CONCURRENT_REQUESTS, MAX_QUEUE_WAIT_MS, TRACE_SAMPLE_RATE
+from app.rate_limit import rate_limit, ConcurrencyLimitMiddleware
+from app.circuit import circuit_guard, outage_exception_handler, StalenessMiddleware, OUTAGE_ERRORS, STALE_HEADER
+from app import metrics
+from app.tracing import TraceCaptureMiddleware
+from app.request_costs import RequestCostMiddleware, SERVER_TIMING_HEADER
 
 # =========================================================
 # ✅ APP SETUP
@@ -15,10 +26,49 @@ app = FastAPI(
     version="1.0.0",
     description="Social media API powered by FastAPI and Neo4j AuraDB, using HTTP Bearer JWT authentication.",
     swagger_ui_parameters={"persistAuthorization": True},  # keep token after refresh
+    lifespan=lifespan,  # DB connect + pool warm-up happen here, not at import time
 )
 
 # =========================================================
-# ✅ ENABLE CORS (optional but useful)
+# ✅ ADMISSION CONTROL (global concurrency cap)
+# =========================================================
+app.add_middleware(
+    ConcurrencyLimitMiddleware,
+    max_concurrent=MAX_CONCURRENT_REQUESTS,
+    max_queue_wait=MAX_QUEUE_WAIT_MS / 1000,
+    exempt_paths=("/metrics",),
+)
+
+# =========================================================
+# ✅ CAUSAL BOOKMARKS (read-your-writes across workers/replicas)
+# =========================================================
+app.add_middleware(BookmarkMiddleware)
+
+# =========================================================
+# ✅ STALE RESPONSES (X-Stale-Age while the database circuit is open)
+# =========================================================
+app.add_middleware(StalenessMiddleware)
+for outage_error in OUTAGE_ERRORS:
+    app.add_exception_handler(outage_error, outage_exception_handler)
+
+# =========================================================
+# ✅ TRACE CAPTURE (sampled request log for benchmarks.replay, off unless TRACE_SAMPLE_RATE > 0)
+# =========================================================
+if TRACE_SAMPLE_RATE > 0:
+    app.add_middleware(TraceCaptureMiddleware, sample_rate=TRACE_SAMPLE_RATE)
+
+# =========================================================
+# ✅ REQUEST COSTS (Server-Timing header and per-route query budgets; wraps trace capture)
+# =========================================================
+app.add_middleware(RequestCostMiddleware)
+
+# =========================================================
+# ✅ REQUEST METRICS (outside admission control so shed requests are counted)
+# =========================================================
+app.add_middleware(metrics.MetricsMiddleware)
+
+# =========================================================
+# ✅ ENABLE CORS (optional but useful, added last so it wraps everything)
 # =========================================================
 app.add_middleware(
     CORSMiddleware,
@@ -32,16 +82,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[BOOKMARK_HEADER, STALE_HEADER, SERVER_TIMING_HEADER],
 )
 
 # =========================================================
-# ✅ ROUTE REGISTRATION
+# ✅ ROUTE REGISTRATION (per-user / per-IP rate limits, fail fast while the DB circuit is open)
 # =========================================================
-app.include_router(user_routes.router, prefix="/users", tags=["Users"])
-app.include_router(post_routes.router, prefix="/posts", tags=["Posts"])
-app.include_router(comment_routes.router, prefix="/comments", tags=["Comments"])
-app.include_router(reaction_routes.router, prefix="/reactions", tags=["Reactions"])
-app.include_router(notification_routes.router, prefix="/notifications", tags=["Notifications"])
+limited = [Depends(rate_limit), Depends(circuit_guard)]
+app.include_router(user_routes.router, prefix="/users", tags=["Users"], dependencies=limited)
+app.include_router(post_routes.router, prefix="/posts", tags=["Posts"], dependencies=limited)
+app.include_router(comment_routes.router, prefix="/comments", tags=["Comments"], dependencies=limited)
+app.include_router(reaction_routes.router, prefix="/reactions", tags=["Reactions"], dependencies=limited)
+app.include_router(notification_routes.router, prefix="/notifications", tags=["Notifications"], dependencies=limited)
+app.include_router(search_routes.router, prefix="/search", tags=["Search"], dependencies=limited)
+app.include_router(debug_routes.router, prefix="/debug", tags=["Debug"], dependencies=limited)
 
 # =========================================================
 # ✅ PROTECTED ROOT ENDPOINT
@@ -57,6 +111,17 @@ def root(current_user: dict = Depends(get_current_user)):
     }
 
 
+# =========================================================
+# ✅ PROMETHEUS METRICS
+# =========================================================
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """
+    Prometheus text exposition of request, query, pool and upload metrics.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # =========================================================
 # ✅ CUSTOM OPENAPI (for HTTP Bearer Auth)
 # =========================================================
@@ -91,3 +156,5 @@ def custom_openapi():
 
 # Attach custom OpenAPI schema
 app.openapi = custom_openapi
+
+mark_imported(_import_started)
@@ -0,0 +1,43 @@
+import re
+
+from app.config import MENTIONS_MAX
+
+# @username mentions in posts, comments and replies. The create query links the
+# mentioned users with (:Post|Comment)-[:MENTIONS]->(:User) in the same statement
+# (see `link_mentions`), so resolving and linking any number of names costs no extra
+# round trip, and returns their ids; the notifications then go out as one UNWIND from
+# app.subscribers. Only the first MENTIONS_MAX distinct names in a text are linked, so a
+# post listing thousands of usernames cannot fan out into thousands of notifications.
+
+# Not preceded by a word character or "@", so e-mail addresses are not mentions
+MENTION_RE = re.compile(r"(?<![\w@])@([A-Za-z0-9_](?:[A-Za-z0-9_.]{0,48}[A-Za-z0-9_])?)")
+
+
+def parse_mentions(text: str | None, limit: int = MENTIONS_MAX) -> list:
+    """Distinct usernames mentioned in `text`, in order of appearance, at most `limit`."""
+    names = []
+    for match in MENTION_RE.finditer(text or ""):
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+            if len(names) >= limit:
+                break
+    return names
+
+
+def link_mentions(node: str, author: str) -> str:
+    """
+    Cypher linking `node` to the users named in $mentions (deleted users and the author
+    left out) and adding `mentioned_ids` to the row. The caller continues with a WITH
+    that carries mentioned_ids along.
+    """
+    return f"""
+    CALL {{
+        WITH {node}, {author}
+        UNWIND $mentions AS name
+        MATCH (mentioned:User {{username: name}})
+        WHERE mentioned.deleted_at IS NULL AND mentioned <> {author}
+        MERGE ({node})-[:MENTIONS]->(mentioned)
+        RETURN collect(mentioned.user_id) AS mentioned_ids
+    }}
+    """
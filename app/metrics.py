@@ -0,0 +1,227 @@
+import threading
+import time
+
+# Minimal Prometheus text-format metrics (no external client library needed).
+# Everything is per process; with several workers each one exposes its own /metrics.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+_collectors = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = self.header()
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def register_collector(fn):
+    """Register a callable run before each scrape (for gauges read from other objects)."""
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    for collect in _collectors:
+        try:
+            collect()
+        except Exception as e:
+            print(f"⚠️ Metrics collector failed: {e}")
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ===========================
+# ✅ APPLICATION METRICS
+# ===========================
+http_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+http_in_flight = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being processed (the route is unknown until routing finishes).",
+    ("method",),
+)
+db_query_seconds = Histogram(
+    "neo4j_query_duration_seconds",
+    "Cypher query timing by query name. phase=client is wall clock, "
+    "available/consumed come from the Neo4j result summary.",
+    ("query", "phase"),
+)
+db_query_errors = Counter(
+    "neo4j_query_errors_total",
+    "Cypher queries that raised, by query name.",
+    ("query",),
+)
+db_pool_connections = Gauge(
+    "neo4j_pool_connections",
+    "Neo4j driver pool connections by server address and state.",
+    ("address", "state"),
+)
+db_pool_max_size = Gauge(
+    "neo4j_pool_max_size",
+    "Configured Neo4j driver pool size.",
+)
+cloudinary_upload_seconds = Histogram(
+    "cloudinary_upload_duration_seconds",
+    "Cloudinary upload latency by folder.",
+    ("folder", "outcome"),
+)
+
+
+# ===========================
+# ✅ REQUEST MIDDLEWARE
+# ===========================
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency per route template (not per raw path, so
+    /posts/{post_id} stays a single series) and in-flight requests.
+    """
+
+    def __init__(self, app, exempt_paths: tuple = ("/metrics",)):
+        self.app = app
+        self.exempt_paths = set(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+        http_in_flight.inc(method=method)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method=method)
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=method,
+                route=getattr(route, "path", "unmatched"),
+                status=status_code,
+            )
@@ -22,7 +22,7 @@ class CommentUpdate(BaseModel):
     content: Optional[str] = Field(None, description="Updated text content")
     image_url: Optional[str] = Field(None, description="Updated image URL")
 
-# Reply response
+# Reply response; replies nest to any depth
 class ReplyResponse(BaseModel):
     reply_id: str
     content: str
@@ -31,6 +31,9 @@ class ReplyResponse(BaseModel):
     user_id: str
     image_url: Optional[str] = None
     profile_picture: Optional[str] = None
+    parent_id: Optional[str] = None
+    depth: int = 1
+    replies: List["ReplyResponse"] = []
 
 # Comment response with nested replies
 class CommentResponse(BaseModel):
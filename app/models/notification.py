@@ -9,7 +9,7 @@ class NotificationResponse(BaseModel):
     actor_id: str
     actor_username: str
     actor_profile_picture: Optional[str] = None
-    type: str  # "like", "love", "haha", "care", "comment", "reply"
+    type: str  # "like", "love", "haha", "care", "comment", "reply", "mention"
     post_id: Optional[str] = None
     comment_id: Optional[str] = None
     message: str
@@ -0,0 +1,70 @@
+from app.cache import LocalCache
+from app.config import PROFILE_CACHE_SIZE
+
+# Read queries return author ids only; author fields are filled in here from a bounded
+# per-worker cache, with one UNWIND query for all misses. Any user write (register,
+# update, delete, profile picture) bumps the "users" cache domain, which clears this
+# cache on every worker (see app.cache).
+
+profile_cache = LocalCache("profiles", domains=("users",), maxsize=PROFILE_CACHE_SIZE)
+
+# Only these fields go into warm snapshots on disk (app.warm_snapshot). A profile
+# restored from one lacks the private fields (email) and is refetched when they are asked for.
+PUBLIC_FIELDS = ("user_id", "username", "name", "profile_picture")
+
+
+def public_profile(profile: dict) -> dict:
+    return {field: profile.get(field) for field in PUBLIC_FIELDS}
+
+
+def get_profiles(user_ids, private: bool = False) -> dict:
+    """
+    {user_id: profile} for the given ids; deleted or unknown users are left out.
+    With `private`, cached profiles without the private fields are read again.
+    """
+    from app.db import read_query
+
+    profiles, missing = {}, []
+    for user_id in {user_id for user_id in user_ids if user_id}:
+        profile = profile_cache.get(user_id)
+        if profile is not None and (not private or "email" in profile):
+            profiles[user_id] = profile
+        else:
+            missing.append(user_id)
+
+    if missing:
+        query = """
+        UNWIND $ids AS id
+        MATCH (u:User {user_id: id})
+        WHERE u.deleted_at IS NULL
+        RETURN u.user_id AS user_id, u.username AS username, u.name AS name,
+               u.email AS email, u.profile_picture AS profile_picture
+        """
+        generation = profile_cache.generation
+        result = read_query("users.profiles", query, {"ids": missing})
+        for record in result.records:
+            profile = record.data()
+            profile_cache.set(profile["user_id"], profile, generation)
+            profiles[profile["user_id"]] = profile
+    return profiles
+
+
+def get_profile(user_id: str, private: bool = False) -> dict | None:
+    return get_profiles([user_id], private).get(user_id)
+
+
+def hydrate(items: list, id_key: str = "user_id", fields=("username", "profile_picture"), prefix: str = "") -> list:
+    """
+    Set `prefix + field` on each dict in `items` from the profile of `item[id_key]`.
+    Items whose user no longer exists are dropped, as the old joins on :User did.
+    """
+    profiles = get_profiles(item.get(id_key) for item in items)
+    hydrated = []
+    for item in items:
+        profile = profiles.get(item.get(id_key))
+        if profile is None:
+            continue
+        for field in fields:
+            item[prefix + field] = profile.get(field)
+        hydrated.append(item)
+    return hydrated
@@ -0,0 +1,274 @@
+import threading
+import time
+
+from app.cache import coherence
+from app.cloudinary_util import delete_images, public_id_from_url
+from app.config import PURGE_INTERVAL_S, PURGE_BATCH_SIZE, PURGE_PAUSE_MS, POST_TOMBSTONE_RETENTION_DAYS
+from app.metrics import Counter
+
+# Deletes set `deleted_at` and return; reads skip marked entities. The purger then works
+# through the marks in bounded transactions: first `deleted_at` spreads down the tree
+# (a deleted user's posts and comments, a deleted post's comments, replies to deleted
+# comments), then the leaves are removed (notifications and reactions that reference
+# marked entities), then the marked nodes themselves once nothing points at them.
+# Images of removed nodes are deleted from Cloudinary in bulk. Marking a post also
+# leaves a PostTombstone for delta sync (GET /posts/changes), expired after
+# POST_TOMBSTONE_RETENTION_DAYS. Marking comments and removing reactions also keeps
+# their authors' counters (app.user_counters) in step.
+#
+# Every worker runs a purger, and the delete routes mark entities too. Steps that keep a
+# counter or leave a tombstone therefore `claim` each row (take its write lock) and
+# re-check it before writing, so a row marked by someone else in the meantime is skipped
+# rather than counted twice.
+
+
+def claim(node: str) -> str:
+    """Cypher taking `node`'s write lock by setting and removing a property; later checks see committed writes."""
+    return f"SET {node}.purge_claim = true REMOVE {node}.purge_claim"
+
+
+purged_rows = Counter(
+    "purged_rows_total",
+    "Rows marked or removed by the background purger, by step.",
+    ("step",),
+)
+purged_images = Counter(
+    "purged_images_total",
+    "Cloudinary assets deleted by the background purger, by outcome.",
+    ("outcome",),
+)
+
+# (step, cache domains whose reads change when the step touches rows, query)
+# Every query handles at most $batch rows and returns `purged` and `images`.
+# `$tombstone_days` is passed to all of them.
+STEPS = [
+    # ---- mark: spread deleted_at down the tree ----------------------------
+    ("mark_user_posts", ("posts",), """
+    MATCH (u:User)-[:CREATED]->(p:Post)
+    WHERE u.deleted_at IS NOT NULL AND p.deleted_at IS NULL
+    WITH p LIMIT $batch
+    """ + claim("p") + """
+    WITH p WHERE p.deleted_at IS NULL
+    SET p.deleted_at = datetime()
+    MERGE (t:PostTombstone {post_id: p.id})
+    ON CREATE SET t.deleted_at = p.deleted_at
+    RETURN count(p) AS purged, [] AS images
+    """),
+    ("mark_user_comments", ("comments",), """
+    MATCH (u:User)-[:COMMENTED]->(c:Comment)
+    WHERE u.deleted_at IS NOT NULL AND c.deleted_at IS NULL
+    WITH c LIMIT $batch
+    SET c.deleted_at = datetime()
+    RETURN count(c) AS purged, [] AS images
+    """),
+    ("mark_post_comments", (), """
+    MATCH (c:Comment)-[:ON]->(p:Post)
+    WHERE p.deleted_at IS NOT NULL AND c.deleted_at IS NULL
+    WITH c LIMIT $batch
+    """ + claim("c") + """
+    WITH c WHERE c.deleted_at IS NULL
+    SET c.deleted_at = datetime()
+    WITH c
+    OPTIONAL MATCH (author:User)-[:COMMENTED]->(c)
+    SET author.comment_count = author.comment_count - 1
+    RETURN count(c) AS purged, [] AS images
+    """),
+    ("mark_replies", ("comments",), """
+    MATCH (r:Comment)-[:REPLIED_TO]->(c:Comment)
+    WHERE c.deleted_at IS NOT NULL AND r.deleted_at IS NULL
+    WITH r LIMIT $batch
+    """ + claim("r") + """
+    WITH r WHERE r.deleted_at IS NULL
+    SET r.deleted_at = datetime()
+    WITH r
+    OPTIONAL MATCH (author:User)-[:COMMENTED]->(r)
+    SET author.comment_count = author.comment_count - 1
+    RETURN count(r) AS purged, [] AS images
+    """),
+    # ---- remove what references marked entities ---------------------------
+    ("post_notifications", (), """
+    MATCH (p:Post) WHERE p.deleted_at IS NOT NULL
+    MATCH (n:Notification {post_id: p.id})
+    WITH n LIMIT $batch
+    DETACH DELETE n
+    RETURN count(n) AS purged, [] AS images
+    """),
+    ("comment_notifications", (), """
+    MATCH (c:Comment) WHERE c.deleted_at IS NOT NULL
+    MATCH (n:Notification {comment_id: c.id})
+    WITH n LIMIT $batch
+    DETACH DELETE n
+    RETURN count(n) AS purged, [] AS images
+    """),
+    ("user_notifications", (), """
+    MATCH (u:User)-[:HAS_NOTIFICATION]->(n:Notification)
+    WHERE u.deleted_at IS NOT NULL
+    WITH n LIMIT $batch
+    DETACH DELETE n
+    RETURN count(n) AS purged, [] AS images
+    """),
+    ("actor_notifications", (), """
+    MATCH (u:User) WHERE u.deleted_at IS NOT NULL
+    MATCH (n:Notification {actor_id: u.user_id})
+    WITH n LIMIT $batch
+    DETACH DELETE n
+    RETURN count(n) AS purged, [] AS images
+    """),
+    ("post_views", (), """
+    MATCH (p:Post) WHERE p.deleted_at IS NOT NULL
+    MATCH (v:PostViews {post_id: p.id})
+    WITH v LIMIT $batch
+    DELETE v
+    RETURN count(v) AS purged, [] AS images
+    """),
+    # Claims the reacting users, then deletes only the reactions still there
+    ("post_reactions", (), """
+    MATCH (u:User)-[:REACTED]->(p:Post)
+    WHERE p.deleted_at IS NOT NULL
+    WITH DISTINCT u LIMIT $batch
+    """ + claim("u") + """
+    WITH u
+    MATCH (u)-[r:REACTED]->(p:Post)
+    WHERE p.deleted_at IS NOT NULL
+    WITH u, r LIMIT $batch
+    DELETE r
+    WITH u, count(r) AS removed
+    SET u.reaction_count = u.reaction_count - removed
+    RETURN sum(removed) AS purged, [] AS images
+    """),
+    ("user_reactions", ("reactions",), """
+    MATCH (u:User)-[r:REACTED]->(:Post)
+    WHERE u.deleted_at IS NOT NULL
+    WITH r LIMIT $batch
+    DELETE r
+    RETURN count(r) AS purged, [] AS images
+    """),
+    # ---- remove marked nodes once nothing points at them ------------------
+    ("comments", (), """
+    MATCH (c:Comment)
+    WHERE c.deleted_at IS NOT NULL
+      AND NOT EXISTS { MATCH (:Comment)-[:REPLIED_TO]->(c) }
+      AND NOT EXISTS { MATCH (n:Notification {comment_id: c.id}) }
+    WITH c, c.image_url AS image_url LIMIT $batch
+    DETACH DELETE c
+    RETURN count(*) AS purged, collect(image_url) AS images
+    """),
+    ("posts", (), """
+    MATCH (p:Post)
+    WHERE p.deleted_at IS NOT NULL
+      AND NOT EXISTS { MATCH (:Comment)-[:ON]->(p) }
+      AND NOT EXISTS { MATCH ()-[:REACTED]->(p) }
+      AND NOT EXISTS { MATCH (n:Notification {post_id: p.id}) }
+    WITH p, p.image_url AS image_url LIMIT $batch
+    DETACH DELETE p
+    RETURN count(*) AS purged, collect(image_url) AS images
+    """),
+    ("users", (), """
+    MATCH (u:User)
+    WHERE u.deleted_at IS NOT NULL
+      AND NOT EXISTS { MATCH (u)-[:CREATED|COMMENTED|REACTED|HAS_NOTIFICATION]->() }
+      AND NOT EXISTS { MATCH (n:Notification {actor_id: u.user_id}) }
+    WITH u, u.profile_picture AS image_url LIMIT $batch
+    DETACH DELETE u
+    RETURN count(*) AS purged, collect(image_url) AS images
+    """),
+    # ---- expire delta-sync tombstones --------------------------------------
+    ("post_tombstones", (), """
+    MATCH (t:PostTombstone)
+    WHERE t.deleted_at < datetime() - duration({days: $tombstone_days})
+    WITH t LIMIT $batch
+    DELETE t
+    RETURN count(t) AS purged, [] AS images
+    """),
+]
+
+
+class Purger:
+    """Background thread running purge passes every `interval` seconds, or sooner when woken."""
+
+    def __init__(self, interval: float, batch_size: int, pause: float):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.failed_images = []   # public_ids to retry on the next pass
+        self.last_pass = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="purger", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def wake(self):
+        """Called after a delete so the subtree goes soon rather than at the next interval."""
+        self._wake.set()
+
+    def _run(self):
+        # Wait first: at startup the connection check and index setup go ahead of us
+        while True:
+            self._wake.wait(self.interval)
+            if self._stop.is_set():
+                return
+            self._wake.clear()
+            try:
+                self.purge()
+            except Exception as e:
+                print(f"⚠️ Purge pass failed: {e}")
+
+    def purge(self) -> dict:
+        """Run passes over all steps until one finds nothing left to do."""
+        from app.db import execute_query
+
+        started = time.perf_counter()
+        totals = {}
+        while not self._stop.is_set():
+            touched_domains, images, progress = set(), [], 0
+            for step, domains, query in STEPS:
+                params = {"batch": self.batch_size, "tombstone_days": POST_TOMBSTONE_RETENTION_DAYS}
+                record = execute_query(f"purge.{step}", query, params).records[0]
+                purged = record["purged"]
+                if purged:
+                    purged_rows.inc(purged, step=step)
+                    totals[step] = totals.get(step, 0) + purged
+                    touched_domains.update(domains)
+                    images.extend(record["images"])
+                    progress += purged
+                    time.sleep(self.pause)
+            if touched_domains:
+                coherence.bump(*touched_domains)
+            self._delete_images(images)
+            if not progress:
+                break
+
+        if totals:
+            print(f"🧹 Purged {totals} in {time.perf_counter() - started:.1f}s")
+        self.last_pass = {
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "purged": totals,
+            "pending_images": len(self.failed_images),
+        }
+        return totals
+
+    def _delete_images(self, urls: list):
+        public_ids = [pid for pid in map(public_id_from_url, urls) if pid]
+        public_ids, self.failed_images = self.failed_images + public_ids, []
+        if not public_ids:
+            return
+        failed = delete_images(public_ids)
+        purged_images.inc(len(public_ids) - len(failed), outcome="deleted")
+        if failed:
+            purged_images.inc(len(failed), outcome="failed")
+            self.failed_images = failed
+
+
+purger = Purger(PURGE_INTERVAL_S, PURGE_BATCH_SIZE, PURGE_PAUSE_MS / 1000)
@@ -0,0 +1,222 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import SLOW_QUERY_MS, SLOW_QUERY_PROFILE_RATE
+
+# Per-name query statistics, a slow-query log and sampled PROFILE capture.
+# Parameter *values* never leave this module: logs and /debug/queries only show shapes.
+# Only read queries are ever re-run under PROFILE, so samples are only kept for them,
+# and with credentials and contact details replaced by REDACTED.
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_WRITE_CLAUSE = re.compile(r"\b(?:CREATE|MERGE|SET|DELETE|REMOVE|FOREACH|LOAD\s+CSV|IN\s+TRANSACTIONS)\b", re.IGNORECASE)
+_SENSITIVE_PARAMETER = re.compile(r"password|hash|token|secret|email", re.IGNORECASE)
+REDACTED = "REDACTED"
+
+_stats = {}
+_lock = threading.Lock()
+# One worker: profiling is diagnostics and must never compete with request traffic
+_profiler = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-profile")
+
+
+def normalize(query: str) -> str:
+    """Collapse whitespace and replace inline literals so equivalent queries compare equal."""
+    text = _STRING_LITERAL.sub("?", query)
+    text = _NUMBER_LITERAL.sub("?", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def fingerprint(query: str) -> str:
+    return hashlib.sha1(normalize(query).encode()).hexdigest()[:12]
+
+
+def is_write(query: str) -> bool:
+    """Whether the query may change the graph (checked on the text with literals removed)."""
+    return bool(_WRITE_CLAUSE.search(normalize(query)))
+
+
+def redact(parameters: dict | None) -> dict:
+    """A copy of `parameters` with sensitive values replaced, at any nesting depth."""
+    return {key: _redact_value(key, value) for key, value in (parameters or {}).items()}
+
+
+def _redact_value(key: str, value):
+    if _SENSITIVE_PARAMETER.search(key):
+        return REDACTED
+    if isinstance(value, dict):
+        return redact(value)
+    if isinstance(value, (list, tuple)):
+        return [redact(item) if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def parameter_shapes(parameters: dict | None) -> dict:
+    """Describe parameters by type (and size for collections) without their values."""
+    shapes = {}
+    for key, value in (parameters or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            shapes[key] = f"{type(value).__name__}[{len(value)}]"
+        elif isinstance(value, dict):
+            shapes[key] = f"map{{{','.join(sorted(value))}}}"
+        elif value is None:
+            shapes[key] = "null"
+        else:
+            shapes[key] = type(value).__name__
+    return shapes
+
+
+class QueryStats:
+    __slots__ = (
+        "name", "fingerprint", "query", "text", "write", "count", "errors", "total_ms", "max_ms",
+        "slow_count", "last_slow_at", "sample_shapes", "sample_parameters", "profile",
+    )
+
+    def __init__(self, name: str, query: str):
+        self.name = name
+        self.fingerprint = fingerprint(query)
+        self.query = query
+        self.text = normalize(query)
+        self.write = is_write(query)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow_count = 0
+        self.last_slow_at = None
+        self.sample_shapes = None
+        # Redacted, in memory only and for read queries only, so an on-demand PROFILE can re-run the query
+        self.sample_parameters = None
+        self.profile = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "fingerprint": self.fingerprint,
+            "query": self.text,
+            "write": self.write,
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "slow_count": self.slow_count,
+            "last_slow_at": self.last_slow_at,
+            "parameter_shapes": self.sample_shapes or {},
+            "profile": self.profile,
+        }
+
+
+def _get_stats(name: str, query: str) -> QueryStats:
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = QueryStats(name, query)
+    return stats
+
+
+def record(name: str, query: str, parameters: dict | None, elapsed_ms: float, error: bool = False):
+    """Called by app.db for every instrumented query."""
+    with _lock:
+        stats = _get_stats(name, query)
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        if error:
+            stats.errors += 1
+        slow = not error and elapsed_ms >= SLOW_QUERY_MS
+        if slow:
+            stats.slow_count += 1
+            stats.last_slow_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        # Prefer the latest slow sample, but keep any sample so PROFILE works on demand
+        if slow or stats.sample_shapes is None:
+            stats.sample_shapes = parameter_shapes(parameters)
+            if not stats.write:
+                stats.sample_parameters = redact(parameters)
+
+    if slow:
+        print(
+            f"🐢 Slow query {name} [{stats.fingerprint}] {elapsed_ms:.1f}ms "
+            f"params={parameter_shapes(parameters)}"
+        )
+        if not stats.write and random.random() < SLOW_QUERY_PROFILE_RATE:
+            _profiler.submit(_profile_safely, name)
+
+
+def top_queries(limit: int = 20, order_by: str = "total_ms") -> list:
+    with _lock:
+        rows = [s.to_dict() for s in _stats.values()]
+    rows.sort(key=lambda r: r.get(order_by) or 0, reverse=True)
+    return rows[:limit]
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+# ===========================
+# ✅ PROFILE CAPTURE
+# ===========================
+def profile(name: str) -> dict | None:
+    """
+    Re-run the latest (redacted) sample of read query `name` (slow samples preferred)
+    under PROFILE on a reader, inside a transaction that is rolled back.
+    Returns the captured profile, or None if the query has not run yet; raises
+    ValueError for write queries, which are never re-run.
+    """
+    from app.db import open_session
+
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            return None
+        if stats.write:
+            raise ValueError(f"{name} writes to the graph and is not re-run under PROFILE")
+        if stats.sample_parameters is None:
+            return None
+        query, parameters = stats.query, stats.sample_parameters
+
+    with open_session(read=True) as session:
+        tx = session.begin_transaction(metadata={"query_name": f"profile:{name}"})
+        try:
+            summary = tx.run("PROFILE " + query, parameters).consume()
+        finally:
+            tx.rollback()
+
+    plan = summary.profile or {}
+    captured = {
+        "captured_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "db_hits": _total_db_hits(plan),
+        "plan": _compact_plan(plan),
+    }
+    with _lock:
+        stats.profile = captured
+    return captured
+
+
+def _profile_safely(name: str):
+    try:
+        captured = profile(name)
+        if captured:
+            print(f"🔬 Profiled {name}: {captured['db_hits']} db hits")
+    except Exception as e:
+        print(f"⚠️ PROFILE capture failed for {name}: {e}")
+
+
+def _total_db_hits(plan: dict) -> int:
+    return plan.get("dbHits", 0) + sum(_total_db_hits(child) for child in plan.get("children", []))
+
+
+def _compact_plan(plan: dict) -> dict:
+    return {
+        "operator": plan.get("operatorType"),
+        "db_hits": plan.get("dbHits", 0),
+        "rows": plan.get("rows", 0),
+        "details": (plan.get("args") or {}).get("Details"),
+        "children": [_compact_plan(child) for child in plan.get("children", [])],
+    }
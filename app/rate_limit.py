@@ -0,0 +1,210 @@
+import asyncio
+import math
+import threading
+import time
+
+from fastapi import HTTPException, Request, status
+from starlette.responses import JSONResponse
+
+from app.auth import get_optional_user_id
+from app.metrics import Counter, Gauge
+from app.config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMIT_DEFAULT,
+    RATE_LIMITS,
+    RATE_LIMIT_IP_MULTIPLIER,
+)
+
+# Idle buckets are dropped once we track more than this many clients
+MAX_BUCKETS = 10_000
+
+rate_limited_total = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by the per-client token buckets.",
+    ("route",),
+)
+shed_total = Counter(
+    "shed_requests_total",
+    "Requests rejected with 503 by the global concurrency limit.",
+)
+admission_waiting = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for a global concurrency slot.",
+)
+
+
+def parse_limit(spec: str) -> tuple[float, float]:
+    """Parse a "<tokens per second>:<burst>" spec."""
+    rate, burst = spec.split(":", 1)
+    return float(rate), float(burst)
+
+
+def parse_route_limits(spec: str) -> dict:
+    """Parse "METHOD /path=rate:burst;..." into {"METHOD /path": (rate, burst)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(";"))):
+        route, limit = item.rsplit("=", 1)
+        limits[route.strip()] = parse_limit(limit.strip())
+    return limits
+
+
+# ===========================
+# ✅ TOKEN BUCKET
+# ===========================
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def wait(self, now: float) -> float:
+        """
+        Refill, without taking a token. Returns 0 if one is available, otherwise the
+        seconds until there is.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return 60.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Take the token `wait` just reported as available."""
+        self.tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    """
+    In-process token buckets keyed by (route, client). Each worker keeps its own buckets,
+    so the effective limit is per worker.
+    """
+
+    def __init__(self, default: tuple[float, float], route_limits: dict, ip_multiplier: float = 1.0):
+        self.default = default
+        self.route_limits = route_limits
+        self.ip_multiplier = ip_multiplier
+        self._buckets: dict[tuple, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def limit_for(self, route_key: str) -> tuple[float, float]:
+        return self.route_limits.get(route_key, self.default)
+
+    def check(self, route_key: str, user_id: str | None, ip: str | None) -> float:
+        """Return 0 if the request is admitted, otherwise a Retry-After in seconds."""
+        rate, burst = self.limit_for(route_key)
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > MAX_BUCKETS:
+                self._prune(now)
+            buckets = []
+            if user_id:
+                buckets.append(self._bucket((route_key, "user", user_id), rate, burst))
+            if ip:
+                buckets.append(self._bucket(
+                    (route_key, "ip", ip),
+                    rate * self.ip_multiplier,
+                    burst * self.ip_multiplier,
+                ))
+            # Both buckets must admit the request before either is charged, so a
+            # rejection by one does not cost a token from the other
+            wait = max((bucket.wait(now) for bucket in buckets), default=0.0)
+            if not wait:
+                for bucket in buckets:
+                    bucket.take()
+            return wait
+
+    def _bucket(self, key: tuple, rate: float, burst: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def _prune(self, now: float):
+        for key in [k for k, b in self._buckets.items() if b.is_idle(now)]:
+            del self._buckets[key]
+
+
+limiter = RateLimiter(
+    parse_limit(RATE_LIMIT_DEFAULT),
+    parse_route_limits(RATE_LIMITS),
+    RATE_LIMIT_IP_MULTIPLIER,
+)
+
+
+# ===========================
+# ✅ PER-ROUTE DEPENDENCY
+# ===========================
+async def rate_limit(request: Request):
+    """
+    Router-level dependency: limits each user and each client IP per route template.
+    Async because it never blocks, so it runs on the event loop instead of taking a
+    threadpool slot on every request.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+
+    route = request.scope.get("route")
+    route_key = f"{request.method} {getattr(route, 'path', request.url.path)}"
+    ip = request.client.host if request.client else None
+
+    retry_after = limiter.check(route_key, get_optional_user_id(request), ip)
+    if retry_after:
+        rate_limited_total.inc(route=route_key)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please slow down.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+# ===========================
+# ✅ GLOBAL CONCURRENCY LIMIT
+# ===========================
+class ConcurrencyLimitMiddleware:
+    """
+    ASGI middleware capping in-flight requests. Requests wait for a slot for at most
+    `max_queue_wait` seconds and are then shed with 503 + Retry-After.
+    """
+
+    def __init__(self, app, max_concurrent: int, max_queue_wait: float, exempt_paths: tuple = ()):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.max_queue_wait = max_queue_wait
+        self.exempt_paths = set(exempt_paths)
+        self._semaphore = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        admission_waiting.inc()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_queue_wait)
+        except asyncio.TimeoutError:
+            shed_total.inc()
+            response = JSONResponse(
+                {"detail": "Server is busy. Please retry shortly."},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(max(1, math.ceil(self.max_queue_wait)))},
+            )
+            await response(scope, receive, send)
+            return
+        finally:
+            admission_waiting.dec()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._semaphore.release()
@@ -0,0 +1,182 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.cache import coherence
+from app.config import REACTION_COALESCE_ENABLED, REACTION_COALESCE_WINDOW_MS, REACTION_COALESCE_MAX_BATCH
+from app.metrics import Counter, Histogram
+
+# Optional write coalescing for reactions. Instead of one MERGE transaction per request,
+# upserts and deletes wait in a per-post buffer for REACTION_COALESCE_WINDOW_MS; only the
+# last action per (user, post) survives, and the whole buffer is written in one UNWIND
+# transaction. On a viral post that turns N transactions queueing for the same Post
+# lock into one. Requests return once their action is buffered; the user's own reaction
+# is read back from the buffer until it has been written.
+
+coalesced_actions = Counter(
+    "reaction_coalesced_actions_total",
+    "Reaction actions accepted into the write buffer, and those superseded before a flush.",
+    ("result",),
+)
+reaction_flush_size = Histogram(
+    "reaction_flush_size",
+    "Reaction rows written per coalesced transaction.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+
+# One row per (user, post): a non-null type upserts the reaction, a null type deletes it
+FLUSH_QUERY = """
+UNWIND $rows AS row
+MATCH (u:User {user_id: row.user_id}), (p:Post {id: $post_id})
+WHERE p.deleted_at IS NULL AND u.deleted_at IS NULL
+CALL {
+    WITH u, p, row
+    WITH u, p, row WHERE row.type IS NOT NULL
+    MERGE (u)-[r:REACTED]->(p)
+    WITH u, r, row, r.type IS NULL AS created
+    SET r.type = row.type, r.created_at = row.at,
+        u.reaction_count = u.reaction_count + CASE WHEN created THEN 1 ELSE 0 END
+    RETURN created, true AS changed, null AS reacted_at
+    UNION
+    WITH u, p, row
+    WITH u, p, row WHERE row.type IS NULL
+    OPTIONAL MATCH (u)-[r:REACTED]->(p)
+    WITH u, r, r.created_at AS reacted_at
+    DELETE r
+    SET u.reaction_count = u.reaction_count - CASE WHEN r IS NULL THEN 0 ELSE 1 END
+    RETURN false AS created, r IS NOT NULL AS changed, reacted_at
+}
+WITH collect({user_id: row.user_id, type: row.type, created: created, changed: changed, reacted_at: reacted_at}) AS results
+UNWIND results AS result
+RETURN result.user_id AS user_id, result.type AS type, result.created AS created, result.changed AS changed,
+       result.reacted_at AS reacted_at
+"""
+
+
+class ReactionBuffer:
+    """Per-post buffers of the latest action per user, flushed by one background thread."""
+
+    def __init__(self, enabled: bool, window: float, max_batch: int):
+        self.enabled = enabled
+        self.window = window
+        self.max_batch = max_batch
+        self._buffers = {}       # post_id -> {user_id: (type or None, at)}
+        self._deadlines = {}     # post_id -> monotonic flush time
+        self._flushing = {}      # post_id -> buffer being written, still visible to reads
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        # Called with (post_id, [rows]) after each flush; set by the reaction controller
+        self.on_flush = None
+
+    # ---- requests ----------------------------------------------------------
+    def add(self, post_id: str, user_id: str, reaction_type: str | None):
+        """Buffer an upsert (a type) or a delete (None); the last action per user wins."""
+        self._ensure_started()
+        with self._cond:
+            buffer = self._buffers.get(post_id)
+            if buffer is None:
+                buffer = self._buffers[post_id] = {}
+                self._deadlines[post_id] = time.monotonic() + self.window
+            if user_id in buffer:
+                coalesced_actions.inc(result="superseded")
+            buffer[user_id] = (reaction_type, datetime.now(timezone.utc))
+            coalesced_actions.inc(result="buffered")
+            if len(buffer) >= self.max_batch:
+                self._deadlines[post_id] = 0
+            self._cond.notify()
+
+    def pending_reaction(self, post_id: str, user_id: str):
+        """(True, type or None) while the user's action on the post is not yet written, else (False, None)."""
+        with self._cond:
+            for buffer in (self._buffers.get(post_id), self._flushing.get(post_id)):
+                if buffer and user_id in buffer:
+                    return True, buffer[user_id][0]
+        return False, None
+
+    # ---- flushing ----------------------------------------------------------
+    def flush_post(self, post_id: str):
+        from app.db import execute_query
+
+        with self._cond:
+            buffer = self._buffers.pop(post_id, None)
+            self._deadlines.pop(post_id, None)
+            if not buffer:
+                return
+            self._flushing[post_id] = buffer
+
+        rows = [{"user_id": user_id, "type": t, "at": at} for user_id, (t, at) in buffer.items()]
+        try:
+            result = execute_query(
+                "reactions.flush",
+                FLUSH_QUERY,
+                {"post_id": post_id, "rows": rows},
+            )
+        except Exception as e:
+            print(f"⚠️ Reaction flush for post {post_id} failed, retrying: {e}")
+            self._requeue(post_id, buffer)
+            return
+        finally:
+            with self._cond:
+                self._flushing.pop(post_id, None)
+
+        coherence.bump("reactions")
+        reaction_flush_size.observe(len(rows))
+        if self.on_flush:
+            try:
+                self.on_flush(post_id, [record.data() for record in result.records])
+            except Exception as e:
+                print(f"⚠️ Reaction flush follow-up failed for post {post_id}: {e}")
+
+    def _requeue(self, post_id: str, buffer: dict):
+        """Put a failed batch back without overwriting actions that arrived since."""
+        with self._cond:
+            current = self._buffers.setdefault(post_id, {})
+            for user_id, action in buffer.items():
+                current.setdefault(user_id, action)
+            # Back off a little so an outage is not hammered every window
+            self._deadlines[post_id] = time.monotonic() + max(self.window, 1.0)
+            self._cond.notify()
+
+    def flush_all(self):
+        with self._cond:
+            post_ids = list(self._buffers)
+        for post_id in post_ids:
+            self.flush_post(post_id)
+
+    # ---- background thread -------------------------------------------------
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._cond:
+                if self._thread is None:
+                    self._stopped = False
+                    self._thread = threading.Thread(target=self._run, name="reaction-flusher", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.monotonic()
+                    due = [post_id for post_id, deadline in self._deadlines.items() if deadline <= now]
+                    if due:
+                        break
+                    timeout = min(self._deadlines.values()) - now if self._deadlines else None
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+            for post_id in due:
+                self.flush_post(post_id)
+
+    def stop(self):
+        """Stop the flusher and write whatever is still buffered."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush_all()
+
+
+buffer = ReactionBuffer(REACTION_COALESCE_ENABLED, REACTION_COALESCE_WINDOW_MS / 1000, REACTION_COALESCE_MAX_BATCH)
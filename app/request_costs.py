@@ -0,0 +1,131 @@
+import json
+import time
+from contextvars import ContextVar
+
+from app.config import SERVER_TIMING_ENABLED, QUERY_BUDGET_MODE
+from app.metrics import Counter, Histogram
+
+# What each request cost outside the process: Neo4j round trips and time (added by
+# app.db._observe for every query) and Cloudinary time (app.cloudinary_util). They are
+# reported in a Server-Timing header, so browser dev tools show them per request:
+#
+#   Server-Timing: db;dur=12.4;desc="3 queries", cloudinary;dur=410.2, app;dur=431.0
+#
+# Routes declare how many queries they may use with @query_budget(n). Going over is
+# counted in query_budget_exceeded_total and logged; with QUERY_BUDGET_MODE=enforce
+# (benchmarks, tests) the response is replaced by a 500 instead, so an N+1 pattern
+# fails the run that introduced it.
+
+SERVER_TIMING_HEADER = "Server-Timing"
+# Infrastructure reads any request may trigger; they are shown but not budgeted
+UNBUDGETED_QUERIES = {"cache.versions"}
+
+request_db_queries = Histogram(
+    "http_request_db_queries",
+    "Neo4j queries per request by route template.",
+    ("route",),
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 34),
+)
+query_budget_exceeded = Counter(
+    "query_budget_exceeded_total",
+    "Requests that ran more queries than their route's @query_budget.",
+    ("route",),
+)
+
+_request_costs: ContextVar[dict | None] = ContextVar("request_costs", default=None)
+
+
+def current() -> dict | None:
+    """The current request's totals, or None outside a request."""
+    return _request_costs.get()
+
+
+def add_query(name: str, elapsed: float):
+    costs = _request_costs.get()
+    if costs is not None:
+        costs["queries"] += 1
+        costs["db_ms"] += elapsed * 1000
+        if name not in UNBUDGETED_QUERIES:
+            costs["budgeted"] += 1
+
+
+def add_cloudinary(elapsed: float):
+    costs = _request_costs.get()
+    if costs is not None:
+        costs["cloudinary_ms"] += elapsed * 1000
+
+
+def query_budget(max_queries: int):
+    """Declare the most queries a route may run per request (checked by RequestCostMiddleware)."""
+
+    def decorate(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+
+    return decorate
+
+
+def server_timing(costs: dict, total_ms: float) -> str:
+    parts = [f'db;dur={costs["db_ms"]:.1f};desc="{costs["queries"]} queries"']
+    if costs["cloudinary_ms"]:
+        parts.append(f'cloudinary;dur={costs["cloudinary_ms"]:.1f}')
+    parts.append(f"app;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+class RequestCostMiddleware:
+    """
+    ASGI middleware starting the per-request totals, adding Server-Timing to the
+    response and checking the route's query budget.
+    """
+
+    def __init__(self, app, server_timing_enabled: bool = SERVER_TIMING_ENABLED, budget_mode: str = QUERY_BUDGET_MODE):
+        self.app = app
+        self.server_timing_enabled = server_timing_enabled
+        self.budget_mode = budget_mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # A mutable holder: sync routes run in a worker thread with a copy of this context
+        costs = {"queries": 0, "budgeted": 0, "db_ms": 0.0, "cloudinary_ms": 0.0}
+        _request_costs.set(costs)
+        start = time.perf_counter()
+        replaced = False
+
+        async def send_wrapper(message):
+            nonlocal replaced
+            if replaced:
+                return
+            if message["type"] != "http.response.start":
+                await send(message)
+                return
+
+            route = getattr(scope.get("route"), "path", "unmatched")
+            request_db_queries.observe(costs["queries"], route=route)
+            budget = getattr(scope.get("endpoint"), "query_budget", None)
+            headers = list(message.get("headers", []))
+            if self.server_timing_enabled:
+                value = server_timing(costs, (time.perf_counter() - start) * 1000)
+                headers.append((SERVER_TIMING_HEADER.encode("latin-1"), value.encode("latin-1")))
+
+            if budget is not None and costs["budgeted"] > budget and self.budget_mode != "off":
+                query_budget_exceeded.inc(route=route)
+                detail = f"{scope['method']} {route} ran {costs['budgeted']} queries, budget is {budget}"
+                print(f"🧮 Query budget exceeded: {detail}")
+                if self.budget_mode == "enforce":
+                    replaced = True
+                    body = json.dumps({"detail": f"Query budget exceeded: {detail}"}).encode()
+                    headers = [h for h in headers if h[0].lower() in (b"server-timing",)] + [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode("latin-1")),
+                    ]
+                    await send({"type": "http.response.start", "status": 500, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+            await send({**message, "headers": headers})
+
+        await self.app(scope, receive, send_wrapper)
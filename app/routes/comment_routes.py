@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Form, UploadFile, File, Query
 from typing import Optional
 from app.auth import get_current_user
 from app.models.comment import CommentCreate, ReplyCreate, CommentUpdate
 from app.controllers import comment_controller
+from app.circuit import serves_stale
+from app.config import COMMENTS_PAGE_MAX
+from app.request_costs import query_budget
 
 router = APIRouter(tags=["Comments"])
 
 # ✅ Create comment
 @router.post("/", status_code=status.HTTP_201_CREATED)
+@query_budget(2)
 async def create_comment(
     post_id: str = Form(...),
     content: str = Form(...),
@@ -21,6 +25,7 @@ async def create_comment(
 
 # ✅ Create reply
 @router.post("/reply", status_code=status.HTTP_201_CREATED)
+@query_budget(1)
 async def create_reply(
     post_id: str = Form(...),
     parent_comment_id: str = Form(...),
@@ -33,14 +38,23 @@ async def create_reply(
     return await comment_controller.create_reply(post_id, parent_comment_id, content, image, current_user)
 
 
-# ✅ Get comments + replies
+# ✅ Get comments + nested replies, one page at a time
 @router.get("/{post_id}", status_code=status.HTTP_200_OK)
-def get_comments(post_id: str):
-    return comment_controller.get_comments(post_id)
+@query_budget(2)
+@serves_stale
+def get_comments(
+    post_id: str,
+    root_id: Optional[str] = Query(None, description="Only the replies under this comment"),
+    depth: Optional[int] = Query(None, ge=1, description="Levels below the post (or root_id) to include"),
+    limit: Optional[int] = Query(None, ge=1, le=COMMENTS_PAGE_MAX),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+):
+    return comment_controller.get_comments(post_id, root_id, depth, limit, cursor)
 
 
 # ✅ Update comment/reply
 @router.put("/{comment_id}", status_code=status.HTTP_200_OK)
+@query_budget(2)
 def update_comment(
     comment_id: str,
     content: Optional[str] = Form(None),
@@ -54,6 +68,7 @@ def update_comment(
 
 # ✅ Delete comment/reply
 @router.delete("/{comment_id}", status_code=status.HTTP_200_OK)
+@query_budget(2)
 def delete_comment(comment_id: str, current_user: dict = Depends(get_current_user)):
     if not current_user:
         raise HTTPException(status_code=401, detail="Authentication required")
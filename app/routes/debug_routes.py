@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.auth import get_current_user
+from app.config import DEBUG_QUERIES_ENABLED, DEBUG_ADMIN_USER_IDS, TRACE_SAMPLE_RATE
+from app import circuit, events, purge, query_log, tracing, typeahead, views, warm_snapshot
+from app.lifespan import startup_report
+
+router = APIRouter(tags=["Debug"])
+
+ORDER_FIELDS = {"total_ms", "avg_ms", "max_ms", "count", "slow_count", "errors"}
+
+
+def require_debug_admin(current_user: dict = Depends(get_current_user)):
+    """The debug routes exist only when enabled, and only for DEBUG_ADMIN_USER_IDS."""
+    if not DEBUG_QUERIES_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if current_user["user_id"] not in DEBUG_ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Debug routes are restricted to admins")
+    return current_user
+
+
+@router.get("/queries", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def list_queries(
+    limit: int = 20,
+    order_by: str = "total_ms",
+):
+    """Top-N Cypher queries by total time (or another stats field), with their latest PROFILE."""
+    if order_by not in ORDER_FIELDS:
+        raise HTTPException(status_code=400, detail=f"order_by must be one of {sorted(ORDER_FIELDS)}")
+    return {"queries": query_log.top_queries(limit, order_by)}
+
+
+@router.post("/queries/{name}/profile", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def profile_query(name: str):
+    """Re-run the latest redacted sample of a named read query under PROFILE (rolled back) and return the plan."""
+    try:
+        captured = query_log.profile(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"⚠️ Error profiling {name}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if captured is None:
+        raise HTTPException(status_code=404, detail="Query has not run yet")
+    return {"name": name, "profile": captured}
+
+
+@router.get("/startup", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def startup_timing():
+    """Cold-start breakdown: module import, driver creation, connectivity check and pool warm-up (ms)."""
+    return {"startup": startup_report}
+
+
+@router.get("/typeahead", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def typeahead_stats():
+    """Size, approximate memory and last load time of the @-mention typeahead index."""
+    return typeahead.index.stats()
+
+
+@router.get("/purge", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def purge_status():
+    """Rows removed by the last background purge and images still waiting for a Cloudinary retry."""
+    return purge.purger.last_pass or {"purged": None}
+
+
+@router.get("/views", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def view_counter_status():
+    """Views waiting in this worker for the next write-behind flush, and the last flush."""
+    return views.counter.stats()
+
+
+@router.get("/circuit", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def circuit_status():
+    """State of the database circuit breaker in this worker."""
+    return circuit.breaker.stats()
+
+
+@router.get("/warm-snapshot", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def warm_snapshot_status():
+    """Last warm cache snapshot written by this worker (restore details are in /debug/startup)."""
+    return warm_snapshot.snapshot.last_save or {"saved_at": None}
+
+
+@router.get("/traces", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def trace_capture_status():
+    """Trace capture of this worker: sample rate, file size and records dropped."""
+    return {"sample_rate": TRACE_SAMPLE_RATE, **tracing.writer.stats()}
+
+
+@router.get("/events", status_code=status.HTTP_200_OK, dependencies=[Depends(require_debug_admin)])
+def event_subscribers():
+    """Queued, handled, failed and dropped events per subscriber of this worker."""
+    return events.bus.stats()
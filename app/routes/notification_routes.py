@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.auth import get_current_user
 from app.controllers import notification_controller
+from app.request_costs import query_budget
 
 router = APIRouter(tags=["Notifications"])
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
+@query_budget(2)
 def get_notifications(
     limit: int = 20,
     current_user: dict = Depends(get_current_user)
@@ -18,6 +20,7 @@ def get_notifications(
 
 
 @router.put("/{notification_id}/read", status_code=status.HTTP_200_OK)
+@query_budget(1)
 def mark_notification_read(
     notification_id: str,
     current_user: dict = Depends(get_current_user)
@@ -30,6 +33,7 @@ def mark_notification_read(
 
 
 @router.put("/read-all", status_code=status.HTTP_200_OK)
+@query_budget(1)
 def mark_all_read(current_user: dict = Depends(get_current_user)):
     """Mark all notifications as read"""
     if not current_user:
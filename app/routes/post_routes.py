@@ -5,13 +5,16 @@ from fastapi import (
     status,
     Form,
     UploadFile,
-    File
+    File,
+    Query
 )
 from typing import Optional
 
 from app.models.post import PostCreate, PostUpdate
 from app.controllers import post_controller
 from app.auth import get_current_user
+from app.circuit import serves_stale
+from app.request_costs import query_budget
 
 router = APIRouter(tags=["Posts"])
 
@@ -20,6 +23,7 @@ router = APIRouter(tags=["Posts"])
 # ✅ CREATE POST (Authenticated)
 # ============================================
 @router.post("/", status_code=status.HTTP_201_CREATED)
+@query_budget(2)
 async def create_post(
     content: str = Form(...),
     image: Optional[UploadFile] = File(None),
@@ -39,15 +43,38 @@ async def create_post(
 # ✅ GET ALL POSTS (Public)
 # ============================================
 @router.get("/", status_code=status.HTTP_200_OK)
+@query_budget(2)
+@serves_stale
 def get_all_posts():
     """✅ Get all posts (public access)."""
     return post_controller.get_all_posts()
 
 
+# ============================================
+# ✅ TRENDING POSTS (Public, declared before /{post_id})
+# ============================================
+@router.get("/trending", status_code=status.HTTP_200_OK)
+@query_budget(2)
+def get_trending_posts(limit: int = Query(20, ge=1, le=50)):
+    """✅ Posts ranked by time-decayed reactions and comments."""
+    return post_controller.get_trending_posts(limit)
+
+
+# ============================================
+# ✅ POST CHANGES SINCE A TOKEN (Public, declared before /{post_id})
+# ============================================
+@router.get("/changes", status_code=status.HTTP_200_OK)
+@query_budget(2)
+def get_post_changes(since: Optional[str] = Query(None, description="Token from the previous call")):
+    """✅ Posts created, edited or deleted since `since`, for incremental feed refresh."""
+    return post_controller.get_post_changes(since)
+
+
 # ============================================
 # ✅ GET POST BY ID (Authenticated)
 # ============================================
 @router.get("/{post_id}", status_code=status.HTTP_200_OK)
+@query_budget(2)
 def get_post_by_id(
     post_id: str,
     current_user: dict = Depends(get_current_user)
@@ -56,13 +83,14 @@ def get_post_by_id(
     if not current_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication required")
 
-    return post_controller.get_post_by_id(post_id)
+    return post_controller.get_post_by_id(post_id, viewer_id=current_user.get("user_id"))
 
 
 # ============================================
 # ✅ UPDATE POST (Authenticated + Ownership Check)
 # ============================================
 @router.put("/{post_id}", status_code=status.HTTP_200_OK)
+@query_budget(2)
 async def update_post(
     post_id: str,
     content: Optional[str] = Form(None),
@@ -83,6 +111,7 @@ async def update_post(
 # ✅ DELETE POST (Authenticated + Ownership Check)
 # ============================================
 @router.delete("/{post_id}", status_code=status.HTTP_200_OK)
+@query_budget(2)
 def delete_post(
     post_id: str,
     current_user: dict = Depends(get_current_user)
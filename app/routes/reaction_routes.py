@@ -4,10 +4,13 @@ from typing import List
 from app.controllers.reaction_controller import create_reaction, get_all_reactions, delete_reaction, get_reactions_for_post
 from app.models.reaction import ReactionCreate, ReactionResponse
 from app.auth import get_current_user  # adjust if using a different auth setup
+from app.circuit import serves_stale
+from app.request_costs import query_budget
 
 router = APIRouter(tags=["Reactions"])
 
 @router.post("/", response_model=ReactionResponse)
+@query_budget(2)
 def create_reaction_route(
     reaction: ReactionCreate,
     current_user: dict = Depends(get_current_user)
@@ -19,6 +22,7 @@ def create_reaction_route(
 
 
 @router.get("/", response_model=List[ReactionResponse])
+@query_budget(1)
 def get_all_reactions_route():
     """
     Retrieve all reactions, including user details (username).
@@ -27,6 +31,7 @@ def get_all_reactions_route():
 
 
 @router.delete("/{post_id}")
+@query_budget(1)
 def delete_reaction_route(post_id: str, current_user: dict = Depends(get_current_user)):
     """
     Delete the current user's reaction on the given post.
@@ -35,6 +40,8 @@ def delete_reaction_route(post_id: str, current_user: dict = Depends(get_current
 
 
 @router.get("/post/{post_id}")
+@query_budget(2)
+@serves_stale
 def get_reactions_for_post_route(post_id: str, request: Request):
     """Return aggregated reaction counts for a post and the current user's reaction if provided via Bearer token."""
     auth = request.headers.get("authorization")
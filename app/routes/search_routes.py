@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Query, status
+from app.controllers import search_controller
+from app.request_costs import query_budget
+
+router = APIRouter(tags=["Search"])
+
+
+# ============================================
+# ✅ FULL-TEXT SEARCH (Public)
+# ============================================
+@router.get("", status_code=status.HTTP_200_OK)
+@query_budget(2)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: str = Query("posts", description="posts, comments or users"),
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=50),
+):
+    """✅ Ranked full-text search over posts, comments or users, paginated with `next_cursor`."""
+    return search_controller.search(q, type, cursor, limit)
@@ -1,75 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from app.controllers import user_controller
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from app import profiles, typeahead
+from app.controllers import user_controller, post_controller
 from app.auth import get_current_user
 from app.models.user_model import User, UpdateUser, LoginRequest
+from app.config import AUTHOR_POSTS_PAGE_SIZE
+from app.request_costs import query_budget
 
 router = APIRouter(tags=["Users"])
 
 
 @router.post("/register")
+@query_budget(2)
 def register(user: User):
     """Register a new user"""
     return user_controller.register_user(user)
 
 @router.get("/me")
+@query_budget(1)
 def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """
     Return full info about the currently logged-in user.
     """
-    from app.db import get_db
-    db = get_db()
-
     user_id = current_user.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid user token")
 
-    with db.session() as session:
-        query = """
-        MATCH (u:User {user_id: $user_id})
-        RETURN u
-        """
-        result = session.run(query, user_id=user_id)
-        record = result.single()
-
-        if not record:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        user = record["u"]
+    user = profiles.get_profile(user_id, private=True)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
 
-        return {
-            "user_id": user["user_id"],
-            "username": user.get("username"),
-            "name": user.get("name"),
-            "email": user.get("email")
-        }
+    return {
+        "user_id": user["user_id"],
+        "username": user.get("username"),
+        "name": user.get("name"),
+        "email": user.get("email")
+    }
 
 @router.post("/login")
+@query_budget(1)
 def login(login_request: LoginRequest):
     """Login and get JWT token"""
     return user_controller.authenticate_user(login_request)
 
 
 @router.get("/")
+@query_budget(1)
 def list_users():
     return user_controller.get_users()
 
 
+@router.get("/suggest")
+@query_budget(1)
+def suggest_users(prefix: str = Query(..., min_length=1, max_length=50), limit: int = Query(10, ge=1, le=25)):
+    """Username / name autocomplete for @-mentions, served from the in-memory typeahead index."""
+    return {"prefix": prefix, "users": typeahead.index.suggest(prefix, limit)}
+
+
+@router.get("/{user_id}/posts")
+@query_budget(2)
+def get_user_posts(
+    user_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(AUTHOR_POSTS_PAGE_SIZE, ge=1, le=50),
+):
+    """A user's posts, newest first, for their profile page."""
+    return post_controller.get_posts_by_author(user_id, cursor, limit)
+
+
+@router.get("/{user_id}/profile")
+@query_budget(1)
+def get_user_profile(user_id: str):
+    """Public profile with post, comment and reaction totals."""
+    return user_controller.get_user_profile(user_id)
+
+
 @router.get("/{email}")
+@query_budget(1)
 def get_user(email: str):
     return user_controller.get_user_by_email(email)
 
 
 @router.put("/{email}")
+@query_budget(2)
 def update_user(email: str, data: UpdateUser):
     return user_controller.update_user(email, data)
 
 
 @router.delete("/{email}")
+@query_budget(2)
 def remove_user(email: str):
     return user_controller.delete_user(email)
 
 
 @router.post("/upload-profile-picture")
+@query_budget(2)
 async def upload_profile_picture(
     image: UploadFile = File(...),
     current_user: dict = Depends(get_current_user)
@@ -0,0 +1,118 @@
+from app.db import execute_query
+
+# Indexes and constraints the app's queries rely on. Every statement is idempotent,
+# so the whole list runs on each startup; add new entries here rather than by hand.
+SCHEMA = {
+    # Full-text (Lucene) indexes used by GET /search
+    "post_content_fulltext": """
+    CREATE FULLTEXT INDEX post_content_fulltext IF NOT EXISTS
+    FOR (p:Post) ON EACH [p.content]
+    """,
+    "comment_content_fulltext": """
+    CREATE FULLTEXT INDEX comment_content_fulltext IF NOT EXISTS
+    FOR (c:Comment) ON EACH [c.content]
+    """,
+    "user_name_fulltext": """
+    CREATE FULLTEXT INDEX user_name_fulltext IF NOT EXISTS
+    FOR (u:User) ON EACH [u.username, u.name]
+    """,
+    # Lookups by id (trending hydration, bulk import MERGEs) and recent-activity scans
+    # (trending reconciliation)
+    "user_user_id": """
+    CREATE INDEX user_user_id IF NOT EXISTS
+    FOR (u:User) ON (u.user_id)
+    """,
+    "post_id": """
+    CREATE INDEX post_id IF NOT EXISTS
+    FOR (p:Post) ON (p.id)
+    """,
+    "comment_id": """
+    CREATE INDEX comment_id IF NOT EXISTS
+    FOR (c:Comment) ON (c.id)
+    """,
+    "notification_id": """
+    CREATE INDEX notification_id IF NOT EXISTS
+    FOR (n:Notification) ON (n.id)
+    """,
+    # Background purge (app.purge): find marked entities and what references them
+    "user_deleted_at": """
+    CREATE INDEX user_deleted_at IF NOT EXISTS
+    FOR (u:User) ON (u.deleted_at)
+    """,
+    "post_deleted_at": """
+    CREATE INDEX post_deleted_at IF NOT EXISTS
+    FOR (p:Post) ON (p.deleted_at)
+    """,
+    "comment_deleted_at": """
+    CREATE INDEX comment_deleted_at IF NOT EXISTS
+    FOR (c:Comment) ON (c.deleted_at)
+    """,
+    "notification_post_id": """
+    CREATE INDEX notification_post_id IF NOT EXISTS
+    FOR (n:Notification) ON (n.post_id)
+    """,
+    "notification_comment_id": """
+    CREATE INDEX notification_comment_id IF NOT EXISTS
+    FOR (n:Notification) ON (n.comment_id)
+    """,
+    "notification_actor_id": """
+    CREATE INDEX notification_actor_id IF NOT EXISTS
+    FOR (n:Notification) ON (n.actor_id)
+    """,
+    "reacted_created_at": """
+    CREATE INDEX reacted_created_at IF NOT EXISTS
+    FOR ()-[r:REACTED]-() ON (r.created_at)
+    """,
+    "comment_created_at": """
+    CREATE INDEX comment_created_at IF NOT EXISTS
+    FOR (c:Comment) ON (c.created_at)
+    """,
+    # Per-author post listing (GET /users/{user_id}/posts), newest first
+    "post_author_created_at": """
+    CREATE INDEX post_author_created_at IF NOT EXISTS
+    FOR (p:Post) ON (p.author_id, p.created_at)
+    """,
+    # Comment threads (app.comment_paths): a thread or subtree is one range seek
+    "comment_post_path": """
+    CREATE INDEX comment_post_path IF NOT EXISTS
+    FOR (c:Comment) ON (c.post_id, c.path)
+    """,
+    # Delta sync (GET /posts/changes): posts written and tombstones of posts deleted since a token
+    "post_updated_at": """
+    CREATE INDEX post_updated_at IF NOT EXISTS
+    FOR (p:Post) ON (p.updated_at)
+    """,
+    # One tombstone per post, however many deletes race (app.purge)
+    "post_tombstone_post_id": """
+    CREATE CONSTRAINT post_tombstone_post_id IF NOT EXISTS
+    FOR (t:PostTombstone) REQUIRE t.post_id IS UNIQUE
+    """,
+    "post_tombstone_deleted_at": """
+    CREATE INDEX post_tombstone_deleted_at IF NOT EXISTS
+    FOR (t:PostTombstone) ON (t.deleted_at)
+    """,
+    # Cache coherence (app.cache): one version counter per domain, however many workers bump it first
+    "cache_version_domain": """
+    CREATE CONSTRAINT cache_version_domain IF NOT EXISTS
+    FOR (v:CacheVersion) REQUIRE v.domain IS UNIQUE
+    """,
+    # View sketches (app.views): one PostViews node per post, merged by every flush
+    "post_views_post_id": """
+    CREATE CONSTRAINT post_views_post_id IF NOT EXISTS
+    FOR (v:PostViews) REQUIRE v.post_id IS UNIQUE
+    """,
+    # @mentions (app.mentions): resolving usernames inside the create queries
+    "user_username": """
+    CREATE INDEX user_username IF NOT EXISTS
+    FOR (u:User) ON (u.username)
+    """,
+}
+
+
+def ensure_schema() -> list:
+    """Create any missing index or constraint. Returns the names that were applied."""
+    applied = []
+    for name, statement in SCHEMA.items():
+        execute_query(f"schema.{name}", statement)
+        applied.append(name)
+    return applied
@@ -0,0 +1,63 @@
+import threading
+
+from app.metrics import Counter
+
+# Single-flight reads: while a query for a key is in flight, identical requests wait for
+# it and share its result (or its exception) instead of sending the same Cypher again.
+# Nothing is kept once the call returns, so this only merges truly concurrent requests;
+# caching is app.cache's job. Shared results must be treated as read-only.
+
+singleflight_requests = Counter(
+    "singleflight_requests_total",
+    "Single-flight reads by query name; role=leader ran the query, role=shared waited for it.",
+    ("query", "role"),
+)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, name: str, key, fn):
+        """
+        Run `fn()` once for all concurrent callers with the same `name` and `key` (the
+        parameters the result depends on, hashable) and return its result to each of them.
+        """
+        flight = (name, key)
+        with self._lock:
+            call = self._calls.get(flight)
+            leader = call is None
+            if leader:
+                call = self._calls[flight] = _Call()
+
+        if not leader:
+            singleflight_requests.inc(query=name, role="shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        singleflight_requests.inc(query=name, role="leader")
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[flight]
+            call.done.set()
+
+
+flights = SingleFlight()
@@ -0,0 +1,65 @@
+from app import trending
+from app.controllers import notification_controller
+from app.events import bus, CommentCreated, PostCreated, PostDeleted, ReactionChanged
+
+# Side effects of writes, run from app.events workers after the response is sent.
+# Controllers only publish events; anything new that has to follow a write (another
+# cache, a counter, a search index) subscribes in `register`, which the lifespan calls.
+
+_registered = False
+
+
+def register():
+    """Subscribe the handlers below to the bus; later calls do nothing."""
+    global _registered
+    if _registered:
+        return
+    bus.subscribe("trending", CommentCreated, ReactionChanged, PostDeleted)(update_trending)
+    bus.subscribe("notifications", PostCreated, CommentCreated, ReactionChanged)(notify_users)
+    _registered = True
+
+
+def update_trending(events: list):
+    for event in events:
+        if isinstance(event, PostDeleted):
+            trending.scores.remove(event.post_id)
+        elif isinstance(event, CommentCreated):
+            trending.scores.record(event.post_id, trending.COMMENT_WEIGHT)
+        elif event.type is None:
+            # Without the reaction's time the right amount is unknown; the next
+            # reconciliation drops it instead
+            if event.reacted_at is not None:
+                trending.scores.record(event.post_id, -trending.REACTION_WEIGHT, at=event.reacted_at)
+        elif event.created:
+            trending.scores.record(event.post_id, trending.REACTION_WEIGHT)
+
+
+def notify_users(events: list):
+    # One UNWIND for the whole batch; self-notifications are skipped by create_notifications
+    notifications = []
+    for event in events:
+        if isinstance(event, ReactionChanged):
+            if event.post_author_id and event.type is not None:
+                notifications.append(
+                    {"user_id": event.post_author_id, "actor_id": event.user_id, "type": event.type, "post_id": event.post_id}
+                )
+            continue
+
+        comment_id = event.comment_id if isinstance(event, CommentCreated) else None
+        notified = set()
+        if isinstance(event, CommentCreated) and event.post_author_id:
+            notified.add(event.post_author_id)
+            notifications.append({
+                "user_id": event.post_author_id,
+                "actor_id": event.author_id,
+                "type": "comment",
+                "post_id": event.post_id,
+                "comment_id": comment_id,
+            })
+        # A post author mentioned in a comment on their post already hears about it
+        notifications.extend(
+            {"user_id": user_id, "actor_id": event.author_id, "type": "mention", "post_id": event.post_id, "comment_id": comment_id}
+            for user_id in event.mentioned_ids
+            if user_id not in notified
+        )
+    notification_controller.create_notifications(notifications)
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qsl
+
+from jose import jwt
+
+from app.auth import SECRET_KEY
+from app.config import TRACE_SAMPLE_RATE, TRACE_PATH, TRACE_MAX_MB, TRACE_VERBATIM_PARAMS
+from app import request_costs
+
+# Sampled capture of production traffic, for replaying its shape against a build with
+# benchmarks.replay. One JSON line per sampled request:
+#
+#   {"t": 1760000000.123, "method": "GET", "route": "/comments/{post_id}",
+#    "path": {"post_id": "uuid#3f9a1c2e"}, "query": {"depth": "=2"}, "encoding": null, "body": {},
+#    "subject": "7b0e44d1", "status": 200, "ms": 18.4, "db_ms": 11.9, "db_queries": 2,
+#    "cloudinary_ms": 0.0}
+#
+# No values are kept, only their shapes: "int", "num", "bool", "str:<length>", "file",
+# and "uuid#<hash>" / "email#<hash>" for identifiers. Hashes are keyed with SECRET_KEY,
+# so they cannot be matched against known ids, but the same post or user gets the same
+# hash throughout a trace and the replay can keep the traffic's skew. Parameters in
+# TRACE_VERBATIM_PARAMS (reaction type, limits, depth) are enumerations, not user data,
+# and are kept as "=<value>". The subject is the hashed `sub` of the bearer token.
+# Secrets (SECRET_PARAMS) are always recorded as "secret", so not even their length is kept.
+
+SECRET = "secret"
+SECRET_PARAMS = frozenset({"password", "new_password", "current_password", "token", "access_token", "refresh_token"})
+
+# Request bodies are only read this far for their field shapes
+BODY_SAMPLE_BYTES = 8192
+EXEMPT_PREFIXES = ("/metrics", "/debug")
+
+UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+INT_RE = re.compile(r"^-?\d+$")
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+$")
+PART_NAME_RE = re.compile(rb'name="([^"]*)"')
+
+
+def _hash(value: str) -> str:
+    return hashlib.blake2b(value.encode(), digest_size=4, key=SECRET_KEY.encode()[:64]).hexdigest()
+
+
+def shape(name: str, value) -> str:
+    """The recorded form of one parameter value."""
+    if name in SECRET_PARAMS:
+        return SECRET
+    if name in TRACE_VERBATIM_PARAMS and isinstance(value, (str, int, float, bool)):
+        return f"={value}"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "num"
+    if isinstance(value, list):
+        return f"list:{len(value)}"
+    if isinstance(value, dict):
+        return "obj"
+    if value is None:
+        return "null"
+    value = str(value)
+    if UUID_RE.match(value):
+        return f"uuid#{_hash(value.lower())}"
+    if INT_RE.match(value):
+        return "int"
+    if EMAIL_RE.match(value):
+        return f"email#{_hash(value.lower())}"
+    return f"str:{len(value)}"
+
+
+def _shapes(params) -> dict:
+    return {name: shape(name, value) for name, value in params}
+
+
+def _subject(headers: dict) -> str | None:
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        # Only hashed for grouping; the route's own dependency verifies the token
+        sub = jwt.get_unverified_claims(auth.split(" ", 1)[1]).get("sub")
+    except Exception:
+        return "invalid"
+    return _hash(str(sub)) if sub else None
+
+
+def _body_shapes(content_type: str, body: bytes, truncated: bool) -> tuple[str | None, dict]:
+    """(encoding, field shapes) of a request body; encoding is "json", "form", "multipart" or "other"."""
+    if not body:
+        return None, {}
+    kind = content_type.lower()
+    if kind.startswith("application/json"):
+        if truncated:
+            return "json", {"_json": f"str:{len(body)}+"}
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return "json", {"_json": "invalid"}
+        return "json", _shapes(data.items()) if isinstance(data, dict) else {"_json": shape("", data)}
+    if kind.startswith("application/x-www-form-urlencoded"):
+        return "form", _shapes(parse_qsl(body.decode("latin-1"), keep_blank_values=True))
+    if kind.startswith("multipart/form-data"):
+        # Only the part headers are needed: field names and whether a part is a file
+        fields = {}
+        boundary = content_type.partition("boundary=")[2].strip('"').encode("latin-1")
+        for part in body.split(b"--" + boundary)[1:]:
+            head, _, value = part.partition(b"\r\n\r\n")
+            name = PART_NAME_RE.search(head)
+            if not name:
+                continue
+            name = name.group(1).decode("latin-1")
+            if b"filename=" in head:
+                fields[name] = "file"
+            elif value.endswith(b"\r\n"):
+                fields[name] = shape(name, value[:-2].decode("utf-8", "replace"))
+            else:
+                fields[name] = "str:?"  # cut off by BODY_SAMPLE_BYTES
+        return "multipart", fields
+    return "other", {"_body": f"bytes:{len(body)}" + ("+" if truncated else "")}
+
+
+class TraceWriter:
+    """Appends records to a JSONL file from a background thread; stops at max_bytes."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.written = 0
+        self.dropped = 0
+        self.full = False
+        self._queue = queue.Queue(maxsize=10_000)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        if self.full:
+            return
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                try:
+                    self.written = os.path.getsize(self.path)
+                except OSError:
+                    self.written = 0
+                self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Write out what is queued and stop the thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                line = json.dumps(record, separators=(",", ":")) + "\n"
+                if self.written + len(line) > self.max_bytes:
+                    if not self.full:
+                        self.full = True
+                        print(f"⏹️ Trace {self.path} reached {self.max_bytes // (1024 * 1024)}MB, capture stopped")
+                    continue
+                f.write(line)
+                self.written += len(line)
+                if self._queue.empty():
+                    f.flush()
+
+    def stats(self) -> dict:
+        return {"path": self.path, "bytes": self.written, "dropped": self.dropped, "full": self.full}
+
+
+writer = TraceWriter(TRACE_PATH, int(TRACE_MAX_MB * 1024 * 1024))
+
+
+class TraceCaptureMiddleware:
+    """
+    ASGI middleware recording a TRACE_SAMPLE_RATE sample of requests to `writer`.
+    Unsampled requests only pay for one random() call.
+    """
+
+    def __init__(self, app, sample_rate: float = TRACE_SAMPLE_RATE, exempt_prefixes: tuple = EXEMPT_PREFIXES):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.exempt_prefixes = exempt_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or writer.full
+            or scope["path"].startswith(self.exempt_prefixes)
+            or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.time()
+        start = time.perf_counter()
+        status_code = 500
+        body = bytearray()
+        truncated = False
+
+        async def receive_wrapper():
+            nonlocal truncated
+            message = await receive()
+            if message["type"] == "http.request" and not truncated:
+                chunk = message.get("body", b"")
+                room = BODY_SAMPLE_BYTES - len(body)
+                body.extend(chunk[:room])
+                truncated = len(chunk) > room
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Started by app.request_costs.RequestCostMiddleware, which wraps this one
+            costs = request_costs.current() or {}
+            headers = dict(scope.get("headers") or [])
+            route = scope.get("route")
+            encoding, body_shapes = _body_shapes(headers.get(b"content-type", b"").decode("latin-1"), bytes(body), truncated)
+            writer.write({
+                "t": round(started_at, 3),
+                "method": scope["method"],
+                "route": getattr(route, "path", "unmatched"),
+                "path": _shapes((scope.get("path_params") or {}).items()),
+                "query": _shapes(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)),
+                "encoding": encoding,
+                "body": body_shapes,
+                "subject": _subject(headers),
+                "status": status_code,
+                "ms": round(elapsed * 1000, 2),
+                "db_ms": round(costs.get("db_ms", 0.0), 2),
+                "db_queries": costs.get("queries", 0),
+                "cloudinary_ms": round(costs.get("cloudinary_ms", 0.0), 2),
+            })
@@ -0,0 +1,141 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.config import TRENDING_HALF_LIFE_H, TRENDING_WINDOW_H, TRENDING_RECONCILE_S, TRENDING_CAPACITY
+from app.metrics import Counter
+
+# Time-decayed hot scores, maintained incrementally per worker.
+#
+# An event at time t adds weight * e^((t - epoch) / tau) to its post. Comparing these
+# raw sums ranks posts exactly as comparing their decayed scores would, so nothing has
+# to be re-decayed as time passes; the epoch moves forward on every reconciliation to
+# keep the exponent small. Reconciliation rebuilds the scores from recent graph
+# activity, which also folds in events handled by other workers.
+
+REACTION_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+
+trending_reconciliations = Counter(
+    "trending_reconciliations_total",
+    "Trending score rebuilds from the graph by outcome.",
+    ("outcome",),
+)
+
+
+class HotScores:
+    def __init__(self, half_life_h: float, capacity: int):
+        self.tau = half_life_h * 3600 / math.log(2)
+        self.capacity = capacity
+        self.epoch = time.time()
+        self._scores = {}          # post_id -> raw score relative to self.epoch
+        self._lock = threading.Lock()
+        self._reconciling = threading.Lock()
+        self._replay = None        # events seen while a reconciliation is in flight
+        self.last_reconciled = 0.0
+
+    def _raw(self, weight: float, at: float) -> float:
+        return weight * math.exp((at - self.epoch) / self.tau)
+
+    def record(self, post_id: str, weight: float, at: float | None = None):
+        """
+        Apply a reaction/comment (positive weight) made at `at` (default now), or the
+        removal of one (negative weight, with the time it was made so its decayed
+        contribution is what gets subtracted).
+        """
+        at = time.time() if at is None else at
+        if weight < 0 and at < time.time() - TRENDING_WINDOW_H * 3600:
+            return  # older than reconciliation looks, so never part of the score
+        with self._lock:
+            score = max(0.0, self._scores.get(post_id, 0.0) + self._raw(weight, at))
+            if score > 0:
+                self._scores[post_id] = score
+            else:
+                self._scores.pop(post_id, None)
+            if len(self._scores) > self.capacity:
+                del self._scores[min(self._scores, key=self._scores.get)]
+            if self._replay is not None:
+                self._replay.append((post_id, weight, at))
+
+    def remove(self, post_id: str):
+        with self._lock:
+            self._scores.pop(post_id, None)
+
+    def top(self, limit: int) -> list:
+        """[(post_id, score decayed to now)] best first."""
+        with self._lock:
+            ranked = sorted(self._scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            decay = math.exp(-(time.time() - self.epoch) / self.tau)
+        return [(post_id, score * decay) for post_id, score in ranked]
+
+    # ---- reconciliation --------------------------------------------------
+    def reconcile(self):
+        from app.db import read_query
+
+        epoch = time.time()
+        with self._lock:
+            self._replay = []
+        query = """
+        CALL {
+            MATCH (:User)-[r:REACTED]->(p:Post)
+            WHERE r.created_at >= $since AND p.deleted_at IS NULL
+            RETURN p.id AS post_id, $reaction_weight * exp((r.created_at.epochSeconds - $epoch) / $tau) AS s
+            UNION ALL
+            MATCH (c:Comment)-[:ON]->(p:Post)
+            WHERE c.created_at >= $since AND p.deleted_at IS NULL
+            RETURN p.id AS post_id, $comment_weight * exp((c.created_at.epochSeconds - $epoch) / $tau) AS s
+        }
+        WITH post_id, sum(s) AS score
+        ORDER BY score DESC
+        LIMIT $limit
+        RETURN post_id, score
+        """
+        try:
+            result = read_query("posts.trending_scores", query, {
+                "since": datetime.now(timezone.utc) - timedelta(hours=TRENDING_WINDOW_H),
+                "epoch": epoch,
+                "tau": self.tau,
+                "reaction_weight": REACTION_WEIGHT,
+                "comment_weight": COMMENT_WEIGHT,
+                "limit": self.capacity,
+            })
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+
+        with self._lock:
+            replay, self._replay = self._replay, None
+            self.epoch = epoch
+            self._scores = {r["post_id"]: r["score"] for r in result.records if r["score"] > 0}
+        # Events that arrived while the query ran may not be in its snapshot
+        for post_id, weight, at in replay:
+            with self._lock:
+                self._scores[post_id] = max(0.0, self._scores.get(post_id, 0.0) + self._raw(weight, at))
+        self.last_reconciled = time.monotonic()
+        return len(self._scores)
+
+    def maybe_reconcile(self):
+        """Start a background rebuild if one is due; requests keep using the current scores."""
+        if self.last_reconciled and time.monotonic() - self.last_reconciled < TRENDING_RECONCILE_S:
+            return
+        if not self._reconciling.acquire(blocking=False):
+            return
+        # Claim this interval up front so a failure doesn't retry on every request
+        self.last_reconciled = time.monotonic()
+
+        def run():
+            try:
+                self.reconcile()
+                trending_reconciliations.inc(outcome="ok")
+            except Exception as e:
+                trending_reconciliations.inc(outcome="error")
+                print(f"⚠️ Trending reconciliation failed: {e}")
+            finally:
+                self._reconciling.release()
+
+        threading.Thread(target=run, name="trending-reconcile", daemon=True).start()
+
+
+scores = HotScores(TRENDING_HALF_LIFE_H, TRENDING_CAPACITY)
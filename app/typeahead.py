@@ -0,0 +1,173 @@
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+
+from app.cache import coherence
+from app.metrics import Gauge, Histogram, register_collector
+
+# Process-local prefix index for @-mention autocomplete. Entries are (key, user_id)
+# tuples in one sorted list: a lookup is a binary search plus a short scan, with no
+# database round trip. Each worker loads the index once and applies its own user
+# writes directly; writes on other workers arrive through app.cache's version counters
+# and trigger a background reload.
+
+typeahead_lookup_seconds = Histogram(
+    "typeahead_lookup_seconds",
+    "Username typeahead lookup time.",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01),
+)
+typeahead_memory_bytes = Gauge(
+    "typeahead_memory_bytes",
+    "Approximate memory held by the username typeahead index.",
+)
+
+
+def _keys(user: dict) -> set:
+    """Lower-cased username, full name and each word of the name."""
+    keys = set()
+    for value in (user.get("username"), user.get("name")):
+        if value:
+            value = value.lower()
+            keys.add(value)
+            keys.update(value.split())
+    return keys
+
+
+class TypeaheadIndex:
+    domains = ("users",)
+
+    def __init__(self):
+        self.name = "typeahead"
+        self._entries = []   # sorted [(key, user_id)]
+        self._users = {}     # user_id -> {"user_id", "username", "name", "profile_picture"}
+        self._lock = threading.Lock()
+        self._reloading = threading.Lock()
+        self.loaded = False
+        self.stale = False
+        self.last_load = {}
+
+    # ---- reads -----------------------------------------------------------
+    def suggest(self, prefix: str, limit: int = 10) -> list:
+        coherence.maybe_sync()
+        if self.stale or not self.loaded:
+            self.reload_in_background()
+
+        with typeahead_lookup_seconds.time():
+            prefix = prefix.lower()
+            entries, users = self._entries, self._users
+            results, seen = [], set()
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and len(results) < limit:
+                key, user_id = entries[i]
+                if not key.startswith(prefix):
+                    break
+                user = users.get(user_id)
+                if user is not None and user_id not in seen:
+                    seen.add(user_id)
+                    results.append(user)
+                i += 1
+        return results
+
+    # ---- writes ----------------------------------------------------------
+    def upsert(self, user: dict):
+        entry = {
+            "user_id": user["user_id"],
+            "username": user.get("username"),
+            "name": user.get("name"),
+            "profile_picture": user.get("profile_picture"),
+        }
+        with self._lock:
+            self._remove_locked(entry["user_id"])
+            self._users[entry["user_id"]] = entry
+            for key in _keys(entry):
+                insort(self._entries, (key, entry["user_id"]))
+
+    def remove(self, user_id: str):
+        with self._lock:
+            self._remove_locked(user_id)
+
+    def _remove_locked(self, user_id: str):
+        old = self._users.pop(user_id, None)
+        if old is None:
+            return
+        for key in _keys(old):
+            i = bisect_left(self._entries, (key, user_id))
+            if i < len(self._entries) and self._entries[i] == (key, user_id):
+                del self._entries[i]
+
+    def load(self):
+        """Rebuild from the graph and swap the new index in at once."""
+        from app.db import read_query
+
+        started = time.perf_counter()
+        self.stale = False
+        query = """
+        MATCH (u:User)
+        WHERE u.deleted_at IS NULL
+        RETURN u.user_id AS user_id, u.username AS username, u.name AS name, u.profile_picture AS profile_picture
+        """
+        result = read_query("users.typeahead", query)
+        users = {r["user_id"]: r.data() for r in result.records if r["user_id"]}
+        entries = sorted((key, user_id) for user_id, user in users.items() for key in _keys(user))
+        with self._lock:
+            self._users, self._entries = users, entries
+            self.loaded = True
+        self.last_load = {
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "load_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return len(users)
+
+    def reload_in_background(self):
+        if not self._reloading.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                self.stale = True
+                print(f"⚠️ Typeahead reload failed: {e}")
+            finally:
+                self._reloading.release()
+
+        threading.Thread(target=run, name="typeahead-reload", daemon=True).start()
+
+    # Called by app.cache when the "users" domain changes
+    def invalidate(self, key=None, reason: str = "explicit"):
+        # This worker's own writes are applied by upsert/remove; any version change seen
+        # by a sync (including, one interval later, our own) rebuilds off the request path
+        if reason != "local_write":
+            self.stale = True
+
+    # ---- reporting -------------------------------------------------------
+    def memory_bytes(self) -> int:
+        entries, users = self._entries, self._users
+        total = sys.getsizeof(entries) + sys.getsizeof(users)
+        for key, user_id in entries:
+            total += sys.getsizeof((key, user_id)) + sys.getsizeof(key)
+        for user_id, user in users.items():
+            total += sys.getsizeof(user_id) + sys.getsizeof(user)
+            total += sum(sys.getsizeof(v) for v in user.values() if v is not None)
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "stale": self.stale,
+            "users": len(self._users),
+            "entries": len(self._entries),
+            "memory_bytes": self.memory_bytes(),
+            **self.last_load,
+        }
+
+
+index = TypeaheadIndex()
+coherence.register(index)
+
+
+@register_collector
+def _collect_memory():
+    typeahead_memory_bytes.set(index.memory_bytes())
+
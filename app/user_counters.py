@@ -0,0 +1,41 @@
+import time
+
+from app.config import USER_COUNTER_BACKFILL_BATCH
+
+# Per-user totals for profile pages, maintained on the User node by the writes that
+# change them instead of being aggregated per request:
+#
+#   post_count      posts the user has written (create_post / delete_post)
+#   comment_count   comments and replies (create_*, delete_comment, app.purge marks)
+#   reaction_count  reactions the user has given (upsert, delete, flush, app.purge)
+#
+# Every update is `counter = counter ± n`, which leaves a missing counter missing:
+# users from before the counters existed keep none until `backfill` counts them once
+# at startup, rather than starting from zero and undercounting.
+
+BACKFILL_QUERY = """
+MATCH (u:User)
+WHERE u.post_count IS NULL AND u.deleted_at IS NULL
+WITH u LIMIT $batch
+SET u.post_count = COUNT { (u)-[:CREATED]->(p:Post) WHERE p.deleted_at IS NULL },
+    u.comment_count = COUNT { (u)-[:COMMENTED]->(c:Comment) WHERE c.deleted_at IS NULL },
+    // Reactions on marked posts are still counted: app.purge subtracts them when it removes them
+    u.reaction_count = COUNT { (u)-[:REACTED]->(:Post) }
+RETURN count(u) AS updated
+"""
+
+
+def backfill(batch_size: int = USER_COUNTER_BACKFILL_BATCH) -> int:
+    """Count posts, comments and reactions of every user without counters. Returns the number updated."""
+    from app.db import execute_query
+
+    started = time.perf_counter()
+    total = 0
+    while True:
+        updated = execute_query("users.backfill_counters", BACKFILL_QUERY, {"batch": batch_size}).records[0]["updated"]
+        total += updated
+        if not updated:
+            break
+    if total:
+        print(f"🔢 Backfilled counters of {total} users in {time.perf_counter() - started:.1f}s")
+    return total
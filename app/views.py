@@ -0,0 +1,315 @@
+import glob
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+from app.config import CACHE_TTL_S, VIEWS_FLUSH_INTERVAL_S, VIEWS_FLUSH_BATCH_SIZE, VIEWS_SPOOL_PATH
+from app.metrics import Counter, Gauge, register_collector
+
+# Post views are counted in memory and written behind: every VIEWS_FLUSH_INTERVAL_S the
+# pending totals go to the graph in batched UNWIND updates. Unique viewers are estimated
+# with a HyperLogLog sketch per post. The graph keeps the merged registers on a
+# (:PostViews {post_id}) node, so sketches from every worker (and every flush) combine by
+# element-wise max and the estimate is recomputed in the same query; the Post node only
+# gets the two totals, so reads that return the post do not carry the 1 KiB sketch.
+#
+# A flush bumps no cache version: payloads cached before it are corrected by `overlay`,
+# which never shows fewer views than this worker has written, and other workers catch
+# up when their cached payloads are rebuilt (at the latest after CACHE_TTL_S).
+# Whatever cannot be flushed at shutdown is spooled to a file of its own per worker
+# next to VIEWS_SPOOL_PATH, and every worker's spool is picked up again at the next start.
+
+HLL_PRECISION = 10                 # 2^10 registers: ~3.3% standard error, 1 KiB per post
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+post_views = Counter("post_views_total", "Post views recorded by this worker.")
+view_flushes = Counter(
+    "post_view_flushes_total",
+    "Write-behind view flushes by outcome.",
+    ("outcome",),
+)
+pending_view_posts = Gauge("post_views_pending_posts", "Posts with views not yet written to the graph.")
+
+
+class HyperLogLog:
+    """Fixed-precision HyperLogLog over strings; registers are plain ints so they round-trip through Cypher."""
+
+    __slots__ = ("registers",)
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers or HLL_REGISTERS)
+
+    def add(self, item: str):
+        h = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - HLL_PRECISION)
+        rest = h & ((1 << (64 - HLL_PRECISION)) - 1)
+        # Position of the leftmost 1-bit in the remaining bits
+        rank = (64 - HLL_PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        harmonic = sum(2.0 ** -r for r in self.registers)
+        estimate = HLL_ALPHA * HLL_REGISTERS * HLL_REGISTERS / harmonic
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * HLL_REGISTERS and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+        return round(estimate)
+
+
+class PendingViews:
+    __slots__ = ("views", "viewers")
+
+    def __init__(self, views: int = 0, viewers: HyperLogLog = None):
+        self.views = views
+        self.viewers = viewers or HyperLogLog()
+
+    def merge(self, other: "PendingViews"):
+        self.views += other.views
+        self.viewers.merge(other.viewers)
+
+
+FLUSH_QUERY = """
+UNWIND $rows AS row
+MATCH (p:Post {id: row.post_id})
+WHERE p.deleted_at IS NULL
+MERGE (v:PostViews {post_id: p.id})
+// Take the sketch node's write lock before reading the counters, so concurrent flushes
+// from other workers cannot interleave between the read and the write
+SET v.flushed_at = datetime()
+WITH p, v, row, coalesce(v.registers, [r IN row.registers | 0]) AS current
+WITH p, v, row, [i IN range(0, size(row.registers) - 1) |
+    CASE WHEN row.registers[i] > current[i] THEN row.registers[i] ELSE current[i] END] AS registers
+WITH p, v, row, registers,
+     $alpha * size(registers) * size(registers) / reduce(s = 0.0, r IN registers | s + 2.0 ^ (-r)) AS raw,
+     size([r IN registers WHERE r = 0]) AS zeros
+SET v.registers = registers,
+    p.view_count = coalesce(p.view_count, 0) + row.views,
+    p.unique_viewers = toInteger(round(CASE
+        WHEN raw <= 2.5 * size(registers) AND zeros > 0 THEN size(registers) * log(toFloat(size(registers)) / zeros)
+        ELSE raw
+    END))
+RETURN p.id AS post_id, p.view_count AS views, p.unique_viewers AS unique_viewers
+"""
+
+
+class ViewCounter:
+    """Per-worker view accumulator with a background flusher thread."""
+
+    def __init__(self, interval: float, batch_size: int, spool_path: str):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.spool_path = spool_path
+        self._pending = {}       # post_id -> PendingViews
+        self._inflight = {}      # the batch being written, still shown in payloads
+        self._flushed = {}       # post_id -> (views, unique_viewers, monotonic time) after our last write
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_flush = {}
+
+    # ---- recording and reading -------------------------------------------
+    def record(self, post_id: str, viewer_id: str):
+        with self._lock:
+            pending = self._pending.get(post_id)
+            if pending is None:
+                pending = self._pending[post_id] = PendingViews()
+            pending.views += 1
+            pending.viewers.add(viewer_id)
+        post_views.inc()
+
+    def overlay(self, post: dict) -> dict:
+        """Add this worker's unflushed views to a post payload built from the graph."""
+        with self._lock:
+            extra = [p for p in (self._pending.get(post["id"]), self._inflight.get(post["id"])) if p]
+            flushed = self._flushed.get(post["id"])
+        if not extra and not flushed:
+            return post
+        post = dict(post)
+        if flushed:
+            # The payload may have been cached before our last flush; totals only grow
+            post["views"] = max(post.get("views", 0), flushed[0])
+            post["unique_viewers"] = max(post.get("unique_viewers", 0), flushed[1])
+        if not extra:
+            return post
+        post["views"] = post.get("views", 0) + sum(p.views for p in extra)
+        # The node's estimate lags until the next flush; never report fewer than we have seen here
+        local = HyperLogLog()
+        for p in extra:
+            local.merge(p.viewers)
+        post["unique_viewers"] = max(post.get("unique_viewers", 0), local.count())
+        return post
+
+    def overlay_all(self, posts: list) -> list:
+        if not self._pending and not self._inflight and not self._flushed:
+            return posts
+        return [self.overlay(post) for post in posts]
+
+    # ---- flushing ----------------------------------------------------------
+    def flush(self) -> int:
+        """Write all pending views; on failure they go back to pending for the next attempt."""
+        from app.db import execute_query
+
+        with self._flushing:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            items = list(batch.items())
+            unwritten = dict(batch)
+            totals = {}
+            try:
+                for start in range(0, len(items), self.batch_size):
+                    chunk = items[start:start + self.batch_size]
+                    rows = [
+                        {"post_id": post_id, "views": p.views, "registers": list(p.viewers.registers)}
+                        for post_id, p in chunk
+                    ]
+                    result = execute_query(
+                        "posts.flush_views",
+                        FLUSH_QUERY,
+                        {"rows": rows, "alpha": HLL_ALPHA},
+                    )
+                    # Deleted posts return no row
+                    for record in result.records:
+                        totals[record["post_id"]] = (record["views"], record["unique_viewers"])
+                    for post_id, _ in chunk:
+                        del unwritten[post_id]
+            except Exception:
+                view_flushes.inc(outcome="failed")
+                self._requeue(unwritten)
+                raise
+            finally:
+                # The written totals replace the batch in `overlay` in one step
+                now = time.monotonic()
+                with self._lock:
+                    self._flushed = {
+                        post_id: entry for post_id, entry in self._flushed.items() if now - entry[2] < CACHE_TTL_S
+                    }
+                    for post_id, (views, unique_viewers) in totals.items():
+                        self._flushed[post_id] = (views, unique_viewers, now)
+                    self._inflight = {}
+
+        view_flushes.inc(outcome="ok")
+        self.last_flush = {
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "posts": len(items),
+            "flushed": len(totals),
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return len(totals)
+
+    def _requeue(self, batch: dict):
+        with self._lock:
+            for post_id, p in batch.items():
+                pending = self._pending.get(post_id)
+                if pending is None:
+                    self._pending[post_id] = p
+                else:
+                    pending.merge(p)
+
+    # ---- restart survival --------------------------------------------------
+    def _spool_files(self) -> list:
+        """Spools left by any worker: <stem>.<pid>-<suffix><ext>."""
+        stem, ext = os.path.splitext(self.spool_path)
+        return sorted(glob.glob(glob.escape(stem) + ".*-*" + ext))
+
+    def spool(self):
+        """
+        Save unflushed views to this worker's own spool file (best effort) so the next
+        start can flush them. Written to a temporary file and renamed, so a crash never
+        leaves a partial spool behind.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        rows = {post_id: {"views": p.views, "registers": p.viewers.registers.hex()} for post_id, p in batch.items()}
+        stem, ext = os.path.splitext(self.spool_path)
+        path = f"{stem}.{os.getpid()}-{uuid.uuid4().hex[:8]}{ext}"
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(rows, f)
+            os.replace(path + ".tmp", path)
+            print(f"💾 Spooled views of {len(rows)} posts to {path}")
+        except OSError as e:
+            print(f"⚠️ Could not spool views, {sum(p.views for p in batch.values())} views lost: {e}")
+
+    def load_spool(self) -> int:
+        """Merge every spool file into pending views. Returns the number of posts restored."""
+        restored = 0
+        for path in self._spool_files():
+            # Renaming claims the file, so workers starting together never load one twice
+            claimed = f"{path}.loading-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            try:
+                with open(claimed) as f:
+                    rows = json.load(f)
+                os.remove(claimed)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not read view spool {claimed}: {e}")
+                continue
+            self._requeue({
+                post_id: PendingViews(row["views"], HyperLogLog(bytes.fromhex(row["registers"])))
+                for post_id, row in rows.items()
+            })
+            restored += len(rows)
+        return restored
+
+    # ---- background thread -------------------------------------------------
+    def start(self):
+        if self._thread is None:
+            restored = self.load_spool()
+            if restored:
+                print(f"📥 Restored spooled views of {restored} posts")
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="view-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Final flush; anything that still cannot be written is spooled to disk."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ Final view flush failed: {e}")
+        self.spool()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ View flush failed, retrying next interval: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = {"posts": len(self._pending), "views": sum(p.views for p in self._pending.values())}
+        return {"pending": pending, "last_flush": self.last_flush or None}
+
+
+counter = ViewCounter(VIEWS_FLUSH_INTERVAL_S, VIEWS_FLUSH_BATCH_SIZE, VIEWS_SPOOL_PATH)
+
+
+@register_collector
+def _collect_pending():
+    pending_view_posts.set(len(counter._pending))
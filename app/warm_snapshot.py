@@ -0,0 +1,148 @@
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+from app.cache import coherence
+from app.config import WARM_SNAPSHOT_PATH, WARM_SNAPSHOT_INTERVAL_S, WARM_SNAPSHOT_MAX_AGE_S, WARM_SNAPSHOT_HOLD_S
+
+# After an idle spin-down the first requests would pay for connecting, planning and
+# the full feed query. Instead, the caches that serve the first screens (the feed,
+# author profiles and reaction counts) are saved to a gzipped JSON file every
+# WARM_SNAPSHOT_INTERVAL_S and at shutdown, along with the cache versions they were
+# read at. At startup they are restored before the database is reached, and served
+# for up to WARM_SNAPSHOT_HOLD_S; once connected, one version check drops whatever
+# changed since the snapshot and the feed is rebuilt in the background.
+# Profiles are saved with their public fields only, and the file is readable by its owner only.
+
+FORMAT = 1
+
+
+def _caches() -> dict:
+    # Imported here: the controllers pull in most of the app
+    from app import profiles
+    from app.controllers.post_controller import feed_cache
+    from app.controllers.reaction_controller import counts_cache
+
+    return {cache.name: cache for cache in (feed_cache, profiles.profile_cache, counts_cache)}
+
+
+def _snapshot_items(cache) -> list:
+    from app import profiles
+
+    items = cache.items()
+    if cache is profiles.profile_cache:
+        items = [(key, profiles.public_profile(profile)) for key, profile in items]
+    return items
+
+
+def _json_default(value):
+    # Values are API payloads; datetimes are sent as ISO strings either way
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class WarmSnapshot:
+    def __init__(self, path: str, interval: float, max_age: float, hold: float):
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.hold = hold
+        self.last_save = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- saving ------------------------------------------------------------
+    def save(self) -> int:
+        """Write the cached entries atomically; returns how many were saved."""
+        if not coherence.synced:
+            # Never checked against the graph: nothing to revalidate the entries by later
+            return 0
+        caches = {name: _snapshot_items(cache) for name, cache in _caches().items()}
+        entries = sum(len(items) for items in caches.values())
+        if not entries:
+            return 0
+
+        started = time.perf_counter()
+        snapshot = {"format": FORMAT, "saved_at": time.time(), "versions": dict(coherence.versions), "caches": caches}
+        # Every worker writes its own temp file; the last rename wins
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with open(fd, "wb") as raw, gzip.open(raw, "wt", compresslevel=5) as f:
+            json.dump(snapshot, f, default=_json_default, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self.last_save = {
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "entries": entries,
+            "bytes": os.path.getsize(self.path),
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return entries
+
+    # ---- restoring ---------------------------------------------------------
+    def load(self) -> dict | None:
+        """Restore a recent snapshot into the caches; returns per-cache entry counts, or None."""
+        try:
+            with gzip.open(self.path, "rt") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read warm snapshot {self.path}: {e}")
+            return None
+
+        age = time.time() - snapshot.get("saved_at", 0)
+        if snapshot.get("format") != FORMAT or age > self.max_age:
+            print(f"⏭️ Ignoring warm snapshot {self.path} (format {snapshot.get('format')}, {age:.0f}s old)")
+            return None
+
+        restored = {}
+        caches = _caches()
+        for name, items in snapshot["caches"].items():
+            if name in caches:
+                caches[name].restore(items)
+                restored[name] = len(items)
+        coherence.restore(snapshot["versions"], self.hold)
+        print(f"📥 Restored warm snapshot from {age:.0f}s ago: {restored}")
+        return restored
+
+    def revalidate(self):
+        """Once the database is reachable: drop entries of domains written since the snapshot, then rebuild the feed."""
+        from app.controllers import post_controller
+
+        coherence.sync()
+        post_controller.get_all_posts()
+
+    # ---- background thread -------------------------------------------------
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="warm-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the saver and write a final snapshot for the next start."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.save()
+        except Exception as e:
+            print(f"⚠️ Final warm snapshot failed: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.save()
+            except Exception as e:
+                print(f"⚠️ Warm snapshot failed: {e}")
+
+
+snapshot = WarmSnapshot(WARM_SNAPSHOT_PATH, WARM_SNAPSHOT_INTERVAL_S, WARM_SNAPSHOT_MAX_AGE_S, WARM_SNAPSHOT_HOLD_S)
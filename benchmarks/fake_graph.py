@@ -0,0 +1,693 @@
+"""
+Deterministic in-memory stand-in for the Neo4j driver.
+
+Queries are dispatched on the query name that app.db attaches as transaction metadata,
+not on the Cypher text, so each handler below mirrors one named query in the
+controllers. A query without a handler raises, so a new or renamed query fails the
+benchmark loudly instead of silently returning nothing.
+"""
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from neo4j import EagerResult, GraphDatabase, Query, Record
+
+REACTION_TYPES = ("like", "love", "haha", "care")
+DEFAULT_PASSWORD = "benchmark-password"
+
+
+class FakeGraph:
+    """Users, posts, comments, reactions and notifications with the indexes the handlers need."""
+
+    def __init__(self):
+        self.users = {}            # user_id -> props
+        self.users_by_email = {}   # email -> user_id
+        self.posts = {}            # post id -> props (author_id included)
+        self.comments = {}         # comment id -> props (post_id, parent_id, depth, path included)
+        self.comments_by_post = {} # post id -> [comment id] in creation order
+        self.reactions = {}        # (user_id, post_id) -> props
+        self.reactions_by_post = {}  # post id -> {user_id}
+        self.notifications = {}    # user_id -> [props] newest last
+        self.tombstones = {}       # deleted post id -> deleted_at (PostTombstone)
+        self.cache_versions = {}   # domain -> version (see app.cache)
+        self.mentions = set()      # (post or comment id, mentioned user_id)
+        self.post_views = {}       # post id -> HLL registers (PostViews)
+        self.lock = threading.RLock()
+
+    # ---- seeding -------------------------------------------------------
+    @classmethod
+    def synthetic(cls, users=200, posts=1000, comments_per_post=5, replies_per_comment=1,
+                  reactions_per_post=10, notifications_per_user=30, seed=42):
+        """Build a reproducible social graph; the same arguments always give the same graph."""
+        from app.db import hash_password
+
+        rng = random.Random(seed)
+        graph = cls()
+        # One hash for everyone: argon2 is deliberately slow and seeding is not what we measure
+        password_hash = hash_password(DEFAULT_PASSWORD)
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+        def next_id():
+            return str(uuid.UUID(int=rng.getrandbits(128)))
+
+        user_ids = []
+        for i in range(users):
+            user_id = next_id()
+            user_ids.append(user_id)
+            graph._add_user({
+                "user_id": user_id,
+                "username": f"user{i}",
+                "name": f"User {i}",
+                "email": f"user{i}@example.com",
+                "password": password_hash,
+                "profile_picture": f"https://res.cloudinary.com/demo/profiles/{i}.jpg" if i % 2 else None,
+            })
+
+        clock = start
+        for i in range(posts):
+            clock += timedelta(seconds=rng.randint(1, 600))
+            post_id = next_id()
+            graph._add_post({
+                "id": post_id,
+                "content": f"Post {i} " + "lorem ipsum " * rng.randint(1, 20),
+                "image_url": None,
+                "created_at": clock,
+                "author_id": rng.choice(user_ids),
+            })
+            for j in range(comments_per_post):
+                comment_id = next_id()
+                graph._add_comment({
+                    "id": comment_id,
+                    "content": f"Comment {j} on post {i}",
+                    "image_url": None,
+                    "created_at": clock + timedelta(seconds=j + 1),
+                    "author_id": rng.choice(user_ids),
+                }, post_id, None)
+                for k in range(replies_per_comment):
+                    graph._add_comment({
+                        "id": next_id(),
+                        "content": f"Reply {k} to comment {j}",
+                        "image_url": None,
+                        "created_at": clock + timedelta(seconds=j + k + 2),
+                        "author_id": rng.choice(user_ids),
+                    }, post_id, comment_id)
+            for user_id in rng.sample(user_ids, min(reactions_per_post, len(user_ids))):
+                graph._set_reaction(user_id, post_id, rng.choice(REACTION_TYPES), clock)
+
+        post_ids = list(graph.posts)
+        for user_id in user_ids:
+            for n in range(notifications_per_user):
+                actor_id = rng.choice(user_ids)
+                graph.notifications.setdefault(user_id, []).append({
+                    "id": next_id(),
+                    "actor_id": actor_id,
+                    "type": rng.choice(REACTION_TYPES + ("comment",)),
+                    "post_id": rng.choice(post_ids) if post_ids else None,
+                    "comment_id": None,
+                    "message": "Someone interacted with your content",
+                    "is_read": rng.random() < 0.5,
+                    "created_at": start + timedelta(minutes=n),
+                })
+        return graph
+
+    def _add_user(self, props):
+        self.users[props["user_id"]] = props
+        self.users_by_email[props["email"]] = props["user_id"]
+
+    def _add_post(self, props):
+        self.posts[props["id"]] = props
+        self.comments_by_post.setdefault(props["id"], [])
+        self.reactions_by_post.setdefault(props["id"], set())
+
+    def _add_comment(self, props, post_id, parent_id):
+        # Materialized path as app.comment_paths builds it
+        segment = f"{int(props['created_at'].timestamp() * 1000):013d}{props['id'][:8]}"
+        parent = self.comments.get(parent_id) if parent_id else None
+        props = dict(
+            props,
+            post_id=post_id,
+            parent_id=parent_id,
+            depth=parent["depth"] + 1 if parent else 0,
+            path=f"{parent['path']}/{segment}" if parent else segment,
+        )
+        self.comments[props["id"]] = props
+        self.comments_by_post.setdefault(post_id, []).append(props["id"])
+        return props
+
+    def _set_reaction(self, user_id, post_id, reaction_type, created_at):
+        rel = {"type": reaction_type, "created_at": created_at}
+        self.reactions[(user_id, post_id)] = rel
+        self.reactions_by_post.setdefault(post_id, set()).add(user_id)
+        return rel
+
+    @staticmethod
+    def node(props, *internal):
+        """Public node properties (drop the bookkeeping keys the fake adds)."""
+        return {k: v for k, v in props.items() if k not in internal}
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _new_id():
+    return str(uuid.uuid4())
+
+
+# =====================================================================
+# Query handlers: name -> fn(graph, params) -> list of row dicts
+# =====================================================================
+HANDLERS = {}
+
+
+def handles(*names):
+    def register(fn):
+        for name in names:
+            HANDLERS[name] = fn
+        return fn
+    return register
+
+
+def _comment_node(c):
+    # Top-level comments have no parent_id property in the graph
+    return FakeGraph.node(c, *(() if c["parent_id"] else ("parent_id",)))
+
+
+# ---- users -----------------------------------------------------------
+@handles("users.exists")
+def _users_exists(g, p):
+    return [{"u": u} for u in g.users.values() if u["email"] == p["email"] or u["username"] == p["username"]][:1]
+
+
+@handles("users.create")
+def _users_create(g, p):
+    props = {k: p[k] for k in ("user_id", "username", "name", "email", "password")}
+    g._add_user(props)
+    return [{"u": props}]
+
+
+@handles("users.login", "users.by_email")
+def _users_by_email(g, p):
+    user_id = g.users_by_email.get(p["email"])
+    return [{"u": g.users[user_id]}] if user_id else []
+
+
+@handles("users.profiles")
+def _users_profiles(g, p):
+    fields = ("user_id", "username", "name", "email", "profile_picture")
+    return [{k: g.users[i].get(k) for k in fields} for i in p["ids"] if i in g.users]
+
+
+@handles("users.list")
+def _users_list(g, p):
+    return [{"u": u} for u in g.users.values()]
+
+
+@handles("users.update")
+def _users_update(g, p):
+    user_id = g.users_by_email.get(p["email"])
+    if not user_id:
+        return []
+    u = g.users[user_id]
+    if "email" in p["updates"]:
+        del g.users_by_email[u["email"]]
+    u.update(p["updates"])
+    g.users_by_email[u["email"]] = user_id
+    return [{"u": u}]
+
+
+@handles("users.delete")
+def _users_delete(g, p):
+    user_id = g.users_by_email.pop(p["email"], None)
+    if user_id:
+        del g.users[user_id]
+    return [{"deleted": 1 if user_id else 0, "user_ids": [user_id] if user_id else []}]
+
+
+@handles("users.typeahead")
+def _users_typeahead(g, p):
+    return [
+        {"user_id": u["user_id"], "username": u["username"], "name": u.get("name"),
+         "profile_picture": u.get("profile_picture")}
+        for u in g.users.values()
+    ]
+
+
+@handles("users.set_profile_picture")
+def _users_set_picture(g, p):
+    u = g.users.get(p["user_id"])
+    if not u:
+        return []
+    u["profile_picture"] = p["profile_picture"]
+    return [{"u": u}]
+
+
+@handles("users.profile")
+def _users_profile(g, p):
+    u = g.users.get(p["user_id"])
+    if not u:
+        return []
+    # The app keeps these as counters on the User node; the fake just counts
+    return [{
+        "user_id": u["user_id"], "username": u["username"], "name": u.get("name"),
+        "profile_picture": u.get("profile_picture"),
+        "post_count": sum(1 for post in g.posts.values() if post["author_id"] == u["user_id"]),
+        "comment_count": sum(1 for c in g.comments.values() if c["author_id"] == u["user_id"]),
+        "reaction_count": sum(1 for user_id, _ in g.reactions if user_id == u["user_id"]),
+    }]
+
+
+# ---- posts -----------------------------------------------------------
+@handles("posts.create")
+def _posts_create(g, p):
+    u = g.users.get(p["author_id"])
+    if not u:
+        return []
+    now = _now()
+    post = {"id": _new_id(), "content": p["content"], "image_url": p["image_url"],
+            "created_at": now, "updated_at": now, "author_id": p["author_id"]}
+    g._add_post(post)
+    return [{"p": post, "username": u["username"], "profile_picture": u.get("profile_picture"),
+             "mentioned_ids": _link_mentions(g, post["id"], p["mentions"], u["user_id"])}]
+
+
+@handles("posts.list")
+def _posts_list(g, p):
+    return [{"p": post} for post in sorted(g.posts.values(), key=lambda x: x["created_at"], reverse=True)]
+
+
+@handles("posts.get")
+def _posts_get(g, p):
+    post = g.posts.get(p["id"])
+    return [{"p": post}] if post else []
+
+
+@handles("posts.by_ids")
+def _posts_by_ids(g, p):
+    return [{"p": g.posts[post_id]} for post_id in p["ids"] if post_id in g.posts]
+
+
+@handles("posts.flush_views")
+def _posts_flush_views(g, p):
+    from app.views import HyperLogLog
+
+    rows = []
+    for row in p["rows"]:
+        post = g.posts.get(row["post_id"])
+        if not post:
+            continue
+        sketch = HyperLogLog(g.post_views.get(row["post_id"]))
+        sketch.merge(HyperLogLog(row["registers"]))
+        g.post_views[row["post_id"]] = list(sketch.registers)
+        post["view_count"] = post.get("view_count", 0) + row["views"]
+        post["unique_viewers"] = sketch.count()
+        rows.append({"post_id": row["post_id"], "views": post["view_count"], "unique_viewers": post["unique_viewers"]})
+    return rows
+
+
+@handles("posts.trending_scores")
+def _posts_trending_scores(g, p):
+    scores = {}
+
+    def add(post_id, weight, at):
+        if at >= p["since"]:
+            scores[post_id] = scores.get(post_id, 0.0) + weight * math.exp((at.timestamp() - p["epoch"]) / p["tau"])
+
+    for (_, post_id), rel in g.reactions.items():
+        add(post_id, p["reaction_weight"], rel["created_at"])
+    for c in g.comments.values():
+        add(c["post_id"], p["comment_weight"], c["created_at"])
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[: p["limit"]]
+    return [{"post_id": post_id, "score": score} for post_id, score in ranked]
+
+
+@handles("posts.check_owner")
+def _posts_check_owner(g, p):
+    post = g.posts.get(p["id"])
+    return [{"p": post}] if post and post["author_id"] == p["user_id"] else []
+
+
+@handles("posts.update")
+def _posts_update(g, p):
+    post = g.posts.get(p["id"])
+    if not post:
+        return []
+    post.update(p["updates"], updated_at=_now())
+    return [{"p": post}]
+
+
+@handles("posts.delete")
+def _posts_delete(g, p):
+    if g.posts.pop(p["id"], None) is None:
+        return []
+    g.tombstones[p["id"]] = _now()
+    for user_id in g.reactions_by_post.pop(p["id"], set()):
+        g.reactions.pop((user_id, p["id"]), None)
+    # The app only marks the post; the fake applies app.purge's end state at once
+    for cid in g.comments_by_post.pop(p["id"], []):
+        g.comments.pop(cid, None)
+    return [{"id": p["id"]}]
+
+
+@handles("posts.by_author")
+def _posts_by_author(g, p):
+    posts = sorted((post for post in g.posts.values()
+                    if post["author_id"] == p["user_id"] and post["created_at"] < p["before"]),
+                   key=lambda x: x["created_at"], reverse=True)
+    return [{"p": post} for post in posts[:p["limit"]]]
+
+
+@handles("posts.changes")
+def _posts_changes(g, p):
+    since, limit = p["since"], p["limit"]
+    changed = sorted((post for post in g.posts.values() if post.get("updated_at") and post["updated_at"] > since),
+                     key=lambda x: x["updated_at"])[:limit]
+    deleted = sorted((at, post_id) for post_id, at in g.tombstones.items() if at > since)[:limit]
+    return [{"posts": changed, "deleted": [post_id for _, post_id in deleted], "now": _now()}]
+
+
+# ---- comments --------------------------------------------------------
+@handles("comments.post_author", "reactions.post_author")
+def _post_author(g, p):
+    post = g.posts.get(p["post_id"])
+    return [{"author_id": post["author_id"]}] if post else []
+
+
+def _link_mentions(g, node_id, names, author_id):
+    names = set(names)
+    mentioned = [uid for uid, u in g.users.items() if u["username"] in names and uid != author_id]
+    g.mentions.update((node_id, uid) for uid in mentioned)
+    return mentioned
+
+
+def _create_comment(g, p, parent_id):
+    u = g.users.get(p["user_id"])
+    if not u or p["post_id"] not in g.posts:
+        return []
+    if parent_id and (parent_id not in g.comments or g.comments[parent_id]["post_id"] != p["post_id"]):
+        return []
+    c = g._add_comment({"id": _new_id(), "content": p["content"], "image_url": p["image_url"],
+                        "created_at": _now(), "author_id": p["user_id"]}, p["post_id"], parent_id)
+    return [{"c": _comment_node(c), "username": u["username"], "user_id": u["user_id"],
+             "profile_picture": u.get("profile_picture"),
+             "mentioned_ids": _link_mentions(g, c["id"], p["mentions"], u["user_id"])}]
+
+
+@handles("comments.create")
+def _comments_create(g, p):
+    return _create_comment(g, p, None)
+
+
+@handles("comments.reply")
+def _comments_reply(g, p):
+    return _create_comment(g, p, p["parent_comment_id"])
+
+
+def _page(nodes, p, after, end, keep):
+    rows = sorted((c for c in nodes if after < c["path"] < end and keep(c)), key=lambda c: c["path"])
+    return [{"c": _comment_node(c)} for c in rows[:p["limit"]]]
+
+
+@handles("comments.thread")
+def _comments_thread(g, p):
+    if p["post_id"] not in g.posts:
+        return []
+    nodes = (g.comments[cid] for cid in g.comments_by_post.get(p["post_id"], []))
+    return _page(nodes, p, p["after"], p["end"], lambda c: p["depth"] is None or c["depth"] < p["depth"])
+
+
+@handles("comments.subtree")
+def _comments_subtree(g, p):
+    root = g.comments.get(p["root_id"])
+    if p["post_id"] not in g.posts or not root or root["post_id"] != p["post_id"]:
+        return []
+    nodes = (g.comments[cid] for cid in g.comments_by_post.get(p["post_id"], []))
+    after = p["after"] if p["after"] is not None else root["path"] + p["separator"]
+    max_depth = root["depth"] + p["depth"] if p["depth"] is not None else None
+    return _page(nodes, p, after, root["path"] + p["end"], lambda c: max_depth is None or c["depth"] <= max_depth)
+
+
+@handles("comments.check_owner")
+def _comments_check_owner(g, p):
+    c = g.comments.get(p["comment_id"])
+    return [{"c": _comment_node(c), "author_id": c["author_id"]}] if c else []
+
+
+@handles("comments.delete")
+def _comments_delete(g, p):
+    c = g.comments.pop(p["comment_id"], None)
+    if c:
+        # The whole subtree goes too, as app.purge would remove it
+        doomed = {c["id"]} | {cid for cid, r in g.comments.items() if r["path"].startswith(c["path"] + "/")}
+        for cid in doomed:
+            g.comments.pop(cid, None)
+        g.comments_by_post[c["post_id"]] = [cid for cid in g.comments_by_post.get(c["post_id"], []) if cid not in doomed]
+    return [{"deleted": 1 if c else 0}]
+
+
+# ---- reactions -------------------------------------------------------
+@handles("reactions.upsert")
+def _reactions_upsert(g, p):
+    u = g.users.get(p["user_id"])
+    if not u or p["post_id"] not in g.posts:
+        return []
+    created = (p["user_id"], p["post_id"]) not in g.reactions
+    rel = g._set_reaction(p["user_id"], p["post_id"], p["type"], _now())
+    return [{"r": rel, "user_id": u["user_id"], "username": u["username"], "post_id": p["post_id"],
+             "created": created}]
+
+
+@handles("reactions.flush")
+def _reactions_flush(g, p):
+    if p["post_id"] not in g.posts:
+        return []
+    rows = []
+    for row in p["rows"]:
+        if row["user_id"] not in g.users:
+            continue
+        key = (row["user_id"], p["post_id"])
+        if row["type"] is None:
+            rel = g.reactions.pop(key, None)
+            g.reactions_by_post.get(p["post_id"], set()).discard(row["user_id"])
+            rows.append({"user_id": row["user_id"], "type": None, "created": False, "changed": rel is not None,
+                         "reacted_at": rel["created_at"] if rel else None})
+        else:
+            created = key not in g.reactions
+            g._set_reaction(row["user_id"], p["post_id"], row["type"], row["at"])
+            rows.append({"user_id": row["user_id"], "type": row["type"], "created": created, "changed": True,
+                         "reacted_at": None})
+    return rows
+
+
+@handles("reactions.list")
+def _reactions_list(g, p):
+    rows = [{"reaction": rel, "user": g.users.get(user_id), "post": g.posts.get(post_id)}
+            for (user_id, post_id), rel in g.reactions.items()]
+    rows = [row for row in rows if row["user"] and row["post"]]
+    rows.sort(key=lambda row: row["reaction"]["created_at"], reverse=True)
+    return rows
+
+
+@handles("reactions.delete")
+def _reactions_delete(g, p):
+    rel = g.reactions.pop((p["user_id"], p["post_id"]), None)
+    if not rel:
+        return []
+    g.reactions_by_post.get(p["post_id"], set()).discard(p["user_id"])
+    return [{"user_id": p["user_id"], "post_id": p["post_id"], "type": rel["type"], "reacted_at": rel["created_at"]}]
+
+
+@handles("reactions.counts")
+def _reactions_counts(g, p):
+    counts = {}
+    for user_id in g.reactions_by_post.get(p["post_id"], ()):
+        t = g.reactions[(user_id, p["post_id"])]["type"]
+        counts[t] = counts.get(t, 0) + 1
+    return [{"type": t, "cnt": n} for t, n in counts.items()]
+
+
+@handles("reactions.user_reaction")
+def _reactions_user(g, p):
+    rel = g.reactions.get((p["user_id"], p["post_id"]))
+    return [{"type": rel["type"]}] if rel else []
+
+
+# ---- notifications ---------------------------------------------------
+@handles("notifications.create_many")
+def _notifications_create_many(g, p):
+    created = 0
+    for row in p["rows"]:
+        if row["user_id"] in g.users:
+            g.notifications.setdefault(row["user_id"], []).append(
+                {"id": _new_id(), **{k: v for k, v in row.items() if k != "user_id"},
+                 "is_read": False, "created_at": _now()})
+            created += 1
+    return [{"created": created}]
+
+
+@handles("notifications.list")
+def _notifications_list(g, p):
+    notifications = sorted(g.notifications.get(p["user_id"], []), key=lambda x: x["created_at"], reverse=True)
+    return [{"n": n} for n in notifications[: p["limit"]]]
+
+
+@handles("notifications.mark_read")
+def _notifications_mark_read(g, p):
+    for n in g.notifications.get(p["user_id"], []):
+        if n["id"] == p["notification_id"]:
+            n["is_read"] = True
+            return [{"n": n}]
+    return []
+
+
+@handles("notifications.mark_all_read")
+def _notifications_mark_all_read(g, p):
+    count = 0
+    for n in g.notifications.get(p["user_id"], []):
+        if not n["is_read"]:
+            n["is_read"] = True
+            count += 1
+    return [{"count": count}]
+
+
+# ---- search ----------------------------------------------------------
+def _search_terms(lucene_query):
+    # Undo app.controllers.search_controller.to_lucene: escaped terms, last one "(t OR t*)"
+    words = [w for w in re.findall(r"[\w]+\*?", lucene_query.lower()) if w != "or"]
+    return [w for w in words if not w.endswith("*")], [w[:-1] for w in words if w.endswith("*")]
+
+
+def _search(items, text_of, p):
+    """Score = share of terms found; stands in for Lucene's relevance ranking."""
+    exact, prefixes = _search_terms(p["q"])
+    terms = len(exact) + len(prefixes) or 1
+    hits = []
+    for item in items:
+        words = set(re.findall(r"\w+", text_of(item).lower()))
+        matched = sum(t in words for t in exact) + sum(any(w.startswith(t) for w in words) for t in prefixes)
+        if matched:
+            hits.append((matched / terms, item))
+    hits.sort(key=lambda hit: -hit[0])
+    return hits[p["skip"]: p["skip"] + p["limit"]]
+
+
+@handles("search.posts")
+def _search_posts(g, p):
+    rows = []
+    for score, post in _search(g.posts.values(), lambda x: x["content"], p):
+        rows.append({"post_id": post["id"], "content": post["content"], "image_url": post["image_url"],
+                     "created_at": post["created_at"], "user_id": post["author_id"], "score": score})
+    return rows
+
+
+@handles("search.comments")
+def _search_comments(g, p):
+    rows = []
+    for score, c in _search(g.comments.values(), lambda x: x["content"], p):
+        rows.append({"comment_id": c["id"], "post_id": c["post_id"], "content": c["content"],
+                     "image_url": c["image_url"], "created_at": c["created_at"], "user_id": c["author_id"],
+                     "score": score})
+    return rows
+
+
+@handles("search.users")
+def _search_users(g, p):
+    return [
+        {"user_id": u["user_id"], "username": u["username"], "name": u.get("name"),
+         "profile_picture": u.get("profile_picture"), "score": score}
+        for score, u in _search(g.users.values(), lambda x: f"{x['username']} {x.get('name') or ''}", p)
+    ]
+
+
+@handles("cache.versions")
+def _cache_versions(g, p):
+    return [{"domain": d, "version": g.cache_versions[d]} for d in p["domains"] if d in g.cache_versions]
+
+
+@handles("cache.bump_versions")
+def _bump_cache_versions(g, p):
+    for domain in p["cache_domains"]:
+        g.cache_versions[domain] = g.cache_versions.get(domain, 0) + 1
+    return [{"bumped": len(p["cache_domains"])}]
+
+
+# =====================================================================
+# Driver / session facade
+# =====================================================================
+# Writes that take the Post node's lock; with lock_ms > 0 each holds it that long
+POST_LOCKING_QUERIES = {"reactions.upsert", "reactions.delete", "reactions.flush"}
+
+
+class FakeDriver:
+    """
+    Implements the slice of neo4j.Driver the app uses. `latency_ms` adds a fixed
+    sleep per query to emulate the network round trip to AuraDB; `lock_ms` makes
+    reaction writes on the same post queue behind each other for that long.
+    """
+
+    def __init__(self, graph: FakeGraph, latency_ms: float = 0.0, lock_ms: float = 0.0):
+        self.graph = graph
+        self.latency = latency_ms / 1000
+        self.lock_hold = lock_ms / 1000
+        self._post_locks = {}
+        self.queries = 0
+        self.execute_query_bookmark_manager = GraphDatabase.bookmark_manager()
+
+    def execute_query(self, query_, parameters_=None, **kwargs):
+        return self._run(query_, parameters_)
+
+    def session(self, **config):
+        return FakeSession(self)
+
+    def verify_connectivity(self, **config):
+        return None
+
+    def close(self):
+        pass
+
+    def _run(self, query, parameters):
+        name = query.metadata.get("query_name") if isinstance(query, Query) else None
+        handler = HANDLERS.get(name)
+        if handler is None:
+            raise NotImplementedError(f"FakeDriver has no handler for query {name!r}")
+
+        start = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        if self.lock_hold and name in POST_LOCKING_QUERIES:
+            # Transactions writing to the same Post queue for its lock, as they do in Neo4j
+            with self._post_locks.setdefault(parameters["post_id"], threading.Lock()):
+                time.sleep(self.lock_hold)
+        with self.graph.lock:
+            self.queries += 1
+            params = dict(parameters or {})
+            rows = handler(self.graph, params)
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+
+        keys = list(rows[0]) if rows else []
+        records = [Record(row) for row in rows]
+        summary = SimpleNamespace(result_available_after=elapsed_ms, result_consumed_after=0, profile=None)
+        return EagerResult(records, summary, keys)
+
+
+class FakeSession:
+    def __init__(self, driver: FakeDriver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwargs):
+        result = self.driver._run(query, {**(parameters or {}), **kwargs})
+        return SimpleNamespace(to_eager_result=lambda: result)
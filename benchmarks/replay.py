@@ -0,0 +1,273 @@
+"""
+Replay a trace captured by app.tracing against the real FastAPI app and an in-memory graph.
+
+    TRACE_SAMPLE_RATE=0.05 uvicorn app.main:app        # capture to traces.jsonl
+    python -m benchmarks.replay traces.jsonl --speed 4 --out replay.json
+
+Requests are sent open-loop at the recorded offsets divided by --speed (a slow
+response does not delay the ones after it, like real clients), through the same
+in-process transport and fake graph as benchmarks.run. Traces only hold parameter
+shapes, so values are filled in deterministically from --seed: every recorded id
+hash maps to one seeded post, comment or user (keeping the traffic's skew), every
+subject hash to one user's token, lengths become filler text of that length.
+Pagination cursors are dropped and uploads are left out (Cloudinary is not
+replayed), so those requests replay as first pages without images.
+
+The report has per-route latency percentiles, how many responses differ from the
+recorded status, and how late requests were sent relative to the schedule.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from benchmarks.run import build_context, percentile  # also sets the app's benchmark settings
+from benchmarks.fake_graph import FakeGraph, FakeDriver, DEFAULT_PASSWORD
+from app.tracing import SECRET  # after benchmarks.run, which sets the app's settings
+
+# Parameters that name an entity, by the pool a recorded id hash is mapped into
+ID_POOLS = {
+    "post_id": "post_ids",
+    "comment_id": "comment_ids",
+    "parent_comment_id": "comment_ids",
+    "root_id": "comment_ids",
+    "user_id": "user_ids",
+    "notification_id": "notification_ids",
+}
+DROPPED_PARAMS = {"cursor"}
+
+
+def load_trace(path: str) -> list:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    records.sort(key=lambda r: r["t"])
+    return records
+
+
+class Filler:
+    """Turns recorded shapes back into values, the same value for the same hash."""
+
+    def __init__(self, ctx, graph, seed):
+        from app.auth import create_access_token
+
+        self.ctx = ctx
+        self.graph = graph
+        self.rng = random.Random(seed)
+        self.pools = {
+            "post_ids": ctx["post_ids"],
+            "comment_ids": sorted(graph.comments),
+            "user_ids": ctx["user_ids"],
+            "notification_ids": sorted(n["id"] for items in graph.notifications.values() for n in items),
+        }
+        self.mapped = {}
+        self._token = create_access_token
+
+    def _pick(self, kind, digest, choices):
+        key = (kind, digest)
+        if key not in self.mapped:
+            self.mapped[key] = self.rng.choice(choices) if choices else f"missing-{digest}"
+        return self.mapped[key]
+
+    def value(self, name: str, shape: str, route: str):
+        if shape.startswith("="):
+            return shape[1:]
+        kind, _, digest = shape.partition("#")
+        if kind == "uuid":
+            return self._pick(name, digest, self.pools.get(ID_POOLS.get(name), []))
+        if kind == "email":
+            if route == "/users/register":
+                return f"replay-{digest}@example.com"
+            user_id = self._pick("user_ids", digest, self.pools["user_ids"])
+            return self.graph.users[user_id]["email"]
+        if kind == SECRET:
+            return DEFAULT_PASSWORD
+        if name == "since":
+            return self.ctx["changes_token"]
+        if kind == "int":
+            return str(self.rng.randrange(1, 100))
+        if kind == "num":
+            return self.rng.randrange(1, 100)
+        if kind == "bool":
+            return True
+        if kind.startswith("str:"):
+            length = kind[4:].rstrip("+")
+            return "lorem " * (int(length) // 6) + "x" * (int(length) % 6) if length.isdigit() else "lorem"
+        return "x"
+
+    def auth(self, subject):
+        if not subject or subject == "invalid":
+            return {}
+        user_id = self._pick("user_ids", subject, self.pools["user_ids"])
+        token = self._token({"sub": user_id, "username": self.graph.users[user_id]["username"]})
+        return {"Authorization": f"Bearer {token}"}
+
+    def request(self, record: dict):
+        """(method, url, kwargs) for one trace record."""
+        route = record["route"]
+        url = route
+        for name, shape in record["path"].items():
+            url = url.replace("{" + name + "}", str(self.value(name, shape, route)))
+        params = {
+            name: self.value(name, shape, route)
+            for name, shape in record["query"].items()
+            if name not in DROPPED_PARAMS
+        }
+        kwargs = {"params": params, "headers": self.auth(record.get("subject"))}
+
+        encoding = record.get("encoding")
+        body = {name: shape for name, shape in record.get("body", {}).items() if shape != "file"}
+        fields = {name: self.value(name, shape, route) for name, shape in body.items()}
+        if encoding == "json":
+            kwargs["json"] = fields
+        elif encoding in ("form", "multipart"):
+            kwargs["data"] = fields
+        return record["method"], url, kwargs
+
+
+async def replay(args):
+    import app.db
+    from app.main import app as fastapi_app
+
+    records = load_trace(args.trace)
+    if args.routes:
+        records = [r for r in records if r["route"] in args.routes]
+
+    print(f"🌱 Seeding graph: {args.users} users, {args.posts} posts (seed {args.seed})")
+    graph = FakeGraph.synthetic(
+        users=args.users,
+        posts=args.posts,
+        comments_per_post=args.comments_per_post,
+        reactions_per_post=args.reactions_per_post,
+        seed=args.seed,
+    )
+    driver = FakeDriver(graph, latency_ms=args.db_latency_ms, lock_ms=args.lock_ms)
+    app.db.driver = driver
+    ctx = build_context(SimpleNamespace(hot_posts=3), graph, driver)
+    filler = Filler(ctx, graph, args.seed)
+    plan = [(record, filler.request(record)) for record in records if record["route"] != "unmatched"]
+    if not plan:
+        sys.exit(f"❌ No replayable records in {args.trace}")
+
+    first = plan[0][0]["t"]
+    duration = (plan[-1][0]["t"] - first) / args.speed
+    print(f"▶️ Replaying {len(plan)} requests over {duration:.1f}s ({args.speed:g}× recorded rate)")
+
+    results = {}
+    lags = []
+    inflight = asyncio.Semaphore(args.max_inflight)
+    transport = httpx.ASGITransport(app=fastapi_app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+
+        async def send(record, method, url, kwargs):
+            async with inflight:
+                start = time.perf_counter()
+                response = await client.request(method, url, **kwargs)
+                elapsed = (time.perf_counter() - start) * 1000
+            stats = results.setdefault(f"{record['method']} {record['route']}", {
+                "latencies": [], "recorded_ms": [], "recorded_db_queries": 0, "errors": 0, "status_mismatches": 0,
+            })
+            stats["latencies"].append(elapsed)
+            stats["recorded_ms"].append(record["ms"])
+            stats["recorded_db_queries"] += record.get("db_queries", 0)
+            if response.status_code >= 500:
+                stats["errors"] += 1
+            if response.status_code != record["status"]:
+                stats["status_mismatches"] += 1
+
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            started = time.perf_counter()
+            tasks = []
+            for record, (method, url, kwargs) in plan:
+                due = (record["t"] - first) / args.speed
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                lags.append(max(0.0, -delay) * 1000)
+                tasks.append(asyncio.create_task(send(record, method, url, kwargs)))
+            await asyncio.gather(*tasks)
+            wall = time.perf_counter() - started
+
+    report = {}
+    for name, stats in sorted(results.items()):
+        latencies = sorted(stats["latencies"])
+        count = len(latencies)
+        report[name] = {
+            "requests": count,
+            "errors": stats["errors"],
+            "status_mismatches": stats["status_mismatches"],
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "recorded_p95_ms": round(percentile(sorted(stats["recorded_ms"]), 95), 3),
+            "recorded_db_queries_per_request": round(stats["recorded_db_queries"] / count, 2),
+        }
+        r = report[name]
+        print(
+            f"  {name:<36} {count:>6}  p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  "
+            f"p99 {r['p99_ms']:>8.2f}ms  (recorded p95 {r['recorded_p95_ms']:.2f}ms)  "
+            f"{r['recorded_db_queries_per_request']:>5} q/req recorded  errors {r['errors']}  status ≠ {r['status_mismatches']}"
+        )
+    lags.sort()
+    summary = {
+        "requests": len(plan),
+        "wall_s": round(wall, 2),
+        "achieved_rps": round(len(plan) / wall, 1) if wall else 0.0,
+        "target_rps": round(len(plan) / duration, 1) if duration else 0.0,
+        "send_lag_p95_ms": round(percentile(lags, 95), 3),
+    }
+    print(
+        f"📈 {summary['achieved_rps']} req/s achieved for {summary['target_rps']} req/s scheduled, "
+        f"send lag p95 {summary['send_lag_p95_ms']:.1f}ms"
+    )
+    return {"summary": summary, "routes": report}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a captured request trace against an in-memory graph.")
+    parser.add_argument("trace", help="JSONL trace written by app.tracing")
+    parser.add_argument("--speed", type=float, default=1.0, help="multiple of the recorded request rate")
+    parser.add_argument("--max-inflight", type=int, default=256, help="cap on concurrent requests")
+    parser.add_argument("--routes", type=lambda s: s.split(","), help="comma-separated route templates to keep")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--reactions-per-post", type=int, default=10)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated per-query round trip")
+    parser.add_argument("--lock-ms", type=float, default=0.0, help="simulated Post lock hold time of reaction writes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output while running")
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(replay(args))
+    report["meta"] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "verbose")},
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
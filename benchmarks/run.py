@@ -0,0 +1,343 @@
+"""
+Endpoint benchmarks against the real FastAPI app and an in-memory graph.
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.run --posts 2000 --requests 300 --out bench.json
+    python -m benchmarks.run --out new.json --compare bench.json
+    python -m benchmarks.run --only react,react_coalesced --db-latency-ms 5 --lock-ms 5
+
+Requests go through httpx's in-process ASGI transport, so routing, dependencies,
+middleware and serialization are all measured; only the database is replaced by
+benchmarks.fake_graph. Use --db-latency-ms to add a fixed per-query delay that
+emulates the AuraDB round trip, and --lock-ms to make reaction writes on the same
+post contend for its lock.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+# The app reads its settings at import time: give it dummy Neo4j settings (the fake
+# driver is swapped in before any query runs) and turn off limits that would skew the numbers.
+# Routes over their query budget (app.request_costs) answer 500 and show up as errors.
+os.environ["NEO4J_URI"] = "bolt://127.0.0.1:9"
+os.environ["NEO4J_USER"] = "benchmark"
+os.environ["NEO4J_PASSWORD"] = "benchmark"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SLOW_QUERY_PROFILE_RATE"] = "0"
+os.environ.setdefault("QUERY_BUDGET_MODE", "enforce")
+
+import httpx  # noqa: E402
+
+from benchmarks.fake_graph import FakeGraph, FakeDriver, DEFAULT_PASSWORD, REACTION_TYPES  # noqa: E402
+
+
+# =====================================================================
+# Scenarios: each returns (method, url, kwargs) for one request
+# =====================================================================
+def scenario_feed(ctx, rng):
+    return "GET", "/posts/", {}
+
+
+def scenario_feed_changes(ctx, rng):
+    # A client refreshing its feed a minute after the last sync
+    return "GET", "/posts/changes", {"params": {"since": ctx["changes_token"]}}
+
+
+def scenario_author_posts(ctx, rng):
+    return "GET", f"/users/{rng.choice(ctx['user_ids'])}/posts", {}
+
+
+def scenario_profile(ctx, rng):
+    return "GET", f"/users/{rng.choice(ctx['user_ids'])}/profile", {}
+
+
+def scenario_trending(ctx, rng):
+    return "GET", "/posts/trending", {}
+
+
+def scenario_view_post(ctx, rng):
+    return "GET", f"/posts/{rng.choice(ctx['hot_post_ids'])}", {"headers": ctx["auth"](rng)}
+
+
+def scenario_comments(ctx, rng):
+    return "GET", f"/comments/{rng.choice(ctx['post_ids'])}", {}
+
+
+def scenario_comments_hot(ctx, rng):
+    # A freshly shared post: concurrent identical reads (see app.singleflight)
+    return "GET", f"/comments/{rng.choice(ctx['hot_post_ids'])}", {}
+
+
+def scenario_reaction_counts(ctx, rng):
+    return "GET", f"/reactions/post/{rng.choice(ctx['post_ids'])}", {"headers": ctx["auth"](rng)}
+
+
+def scenario_react(ctx, rng):
+    body = {"post_id": rng.choice(ctx["hot_post_ids"]), "type": rng.choice(REACTION_TYPES)}
+    return "POST", "/reactions/", {"json": body, "headers": ctx["auth"](rng)}
+
+
+@contextlib.contextmanager
+def coalesced_reactions():
+    """Run with app.reaction_buffer enabled; the timed run includes writing out the buffer."""
+    from app import reaction_buffer
+
+    buffer = reaction_buffer.buffer
+    enabled, buffer.enabled = buffer.enabled, True
+    try:
+        yield buffer.flush_all
+    finally:
+        buffer.flush_all()
+        buffer.enabled = enabled
+
+
+def scenario_notifications(ctx, rng):
+    return "GET", "/notifications/", {"headers": ctx["auth"](rng)}
+
+
+def scenario_search(ctx, rng):
+    search_type, q = rng.choice([
+        ("posts", "lorem ipsum"),
+        ("posts", f"post {rng.randrange(100)}"),
+        ("comments", f"comment {rng.randrange(5)}"),
+        ("users", f"user{rng.randrange(ctx['users'])}"),
+        ("users", "use"),
+    ])
+    return "GET", "/search", {"params": {"q": q, "type": search_type}}
+
+
+def scenario_suggest(ctx, rng):
+    username = f"user{rng.randrange(ctx['users'])}"
+    return "GET", "/users/suggest", {"params": {"prefix": username[: rng.randint(1, len(username))]}}
+
+
+def scenario_login(ctx, rng):
+    body = {"email": f"user{rng.randrange(ctx['users'])}@example.com", "password": DEFAULT_PASSWORD}
+    return "POST", "/users/login", {"json": body}
+
+
+SCENARIOS = {
+    "feed": scenario_feed,
+    "feed_changes": scenario_feed_changes,
+    "trending": scenario_trending,
+    "author_posts": scenario_author_posts,
+    "profile": scenario_profile,
+    "view_post": scenario_view_post,
+    "comments": scenario_comments,
+    "comments_hot": scenario_comments_hot,
+    "reaction_counts": scenario_reaction_counts,
+    "react": scenario_react,
+    "react_coalesced": scenario_react,
+    "notifications": scenario_notifications,
+    "search": scenario_search,
+    "suggest": scenario_suggest,
+    "login": scenario_login,
+}
+
+# Scenarios that need app settings changed while they run: name -> context manager
+# yielding a callable that completes any deferred work before the clock stops
+MODES = {
+    "react_coalesced": coalesced_reactions,
+}
+
+
+# =====================================================================
+# Runner
+# =====================================================================
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_scenario(client, name, ctx, requests, concurrency, seed, finish=None):
+    from app import events
+
+    scenario = SCENARIOS[name]
+    rng = random.Random(f"{seed}:{name}")
+    plan = [scenario(ctx, rng) for _ in range(requests)]
+    latencies, errors = [], 0
+    driver = ctx["driver"]
+    queries_before = driver.queries
+    queue = iter(plan)
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in queue:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    if finish:
+        await asyncio.to_thread(finish)
+    # Side effects run off the response path (app.events); count their queries and time too
+    await asyncio.to_thread(events.bus.drain)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "throughput_rps": round(requests / wall, 1) if wall else 0.0,
+        "db_queries_per_request": round((driver.queries - queries_before) / requests, 2) if requests else 0.0,
+    }
+
+
+def build_context(args, graph, driver):
+    from datetime import datetime, timedelta, timezone
+    from app.auth import create_access_token
+    from app import subscribers
+    from app.controllers.post_controller import _encode_timestamp
+
+    # The ASGI transport runs no lifespan; subscribe the event handlers as it would
+    subscribers.register()
+
+    user_ids = sorted(graph.users)
+    tokens = [
+        create_access_token({"sub": uid, "username": graph.users[uid]["username"]})
+        for uid in user_ids[: min(len(user_ids), 50)]
+    ]
+    post_ids = sorted(graph.posts)
+    return {
+        "users": len(user_ids),
+        "user_ids": user_ids,
+        "post_ids": post_ids,
+        # A handful of "viral" posts so write scenarios contend on the same nodes
+        "hot_post_ids": post_ids[: max(1, args.hot_posts)],
+        "auth": lambda rng: {"Authorization": f"Bearer {rng.choice(tokens)}"},
+        "changes_token": _encode_timestamp(datetime.now(timezone.utc) - timedelta(minutes=1)),
+        "driver": driver,
+    }
+
+
+async def run(args):
+    import app.db
+    from app.main import app as fastapi_app
+
+    print(f"🌱 Seeding graph: {args.users} users, {args.posts} posts (seed {args.seed})")
+    graph = FakeGraph.synthetic(
+        users=args.users,
+        posts=args.posts,
+        comments_per_post=args.comments_per_post,
+        reactions_per_post=args.reactions_per_post,
+        seed=args.seed,
+    )
+    driver = FakeDriver(graph, latency_ms=args.db_latency_ms, lock_ms=args.lock_ms)
+    app.db.driver = driver
+    ctx = build_context(args, graph, driver)
+
+    results = {}
+    transport = httpx.ASGITransport(app=fastapi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in args.only:
+            # The controllers print on every login/error; keep that out of the report
+            quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+            mode = MODES.get(name, lambda: contextlib.nullcontext(None))
+            with quiet, mode() as finish:
+                # Warm-up pass so imports and first-call costs are not in the numbers. Its
+                # errors still count: cold caches are where query budgets are tightest
+                cold = await run_scenario(client, name, ctx, min(10, args.requests), 1, args.seed + 1, finish)
+                results[name] = await run_scenario(
+                    client, name, ctx, args.requests, args.concurrency, args.seed, finish
+                )
+                results[name]["cold_errors"] = cold["errors"]
+            r = results[name]
+            print(
+                f"  {name:<16} p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  "
+                f"p99 {r['p99_ms']:>8.2f}ms  {r['throughput_rps']:>8.1f} req/s  "
+                f"{r['db_queries_per_request']:>5} q/req  errors {r['errors']} (cold {r['cold_errors']})"
+            )
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Print p95/throughput deltas per endpoint; return the names that regressed."""
+    regressed = []
+    print(f"\n📊 Compared with baseline (regression threshold {threshold:.0%} on p95):")
+    for name, now in current.items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before or not before.get("p95_ms"):
+            print(f"  {name:<16} (no baseline)")
+            continue
+        delta = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        tput = (now["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] if before["throughput_rps"] else 0
+        flag = "❌" if delta > threshold else "✅"
+        print(f"  {flag} {name:<16} p95 {before['p95_ms']:.2f} → {now['p95_ms']:.2f}ms ({delta:+.1%}), throughput {tput:+.1%}")
+        if delta > threshold:
+            regressed.append(name)
+    return regressed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints against an in-memory graph.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--reactions-per-post", type=int, default=10)
+    parser.add_argument("--hot-posts", type=int, default=3, help="posts targeted by write scenarios")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="simulated per-query round trip")
+    parser.add_argument("--lock-ms", type=float, default=0.0, help="simulated Post lock hold time of reaction writes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", type=lambda s: s.split(","), default=list(SCENARIOS),
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed p95 regression (fraction)")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output while running")
+    args = parser.parse_args(argv)
+    unknown = set(args.only) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "verbose")},
+        },
+        "endpoints": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.out}")
+
+    failing = [name for name, r in results.items() if r["errors"] or r["cold_errors"]]
+    if failing:
+        print(f"❌ Errors (including query budgets exceeded) in: {', '.join(failing)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 1 if failing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+import os
+
+# The app reads its settings at import time: dummy Neo4j settings (tests swap in
+# benchmarks.fake_graph's driver before any query runs), no rate limits or PROFILE
+# sampling, and routes over their query budget (app.request_costs) answer 500.
+os.environ["NEO4J_URI"] = "bolt://127.0.0.1:9"
+os.environ["NEO4J_USER"] = "test"
+os.environ["NEO4J_PASSWORD"] = "test"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SLOW_QUERY_PROFILE_RATE"] = "0"
+os.environ["QUERY_BUDGET_MODE"] = "enforce"
@@ -0,0 +1,56 @@
+"""GET /posts/changes against the in-memory graph of benchmarks.fake_graph."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks import fake_graph
+from benchmarks.fake_graph import FakeGraph, FakeDriver
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    import app.db
+
+    graph = FakeGraph.synthetic(users=5, posts=20, comments_per_post=0, reactions_per_post=0, seed=1)
+    monkeypatch.setattr(app.db, "driver", FakeDriver(graph))
+    return graph
+
+
+@pytest.fixture
+def client(graph):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+def _token(ago: timedelta) -> str:
+    from app.controllers.post_controller import _encode_timestamp
+
+    return _encode_timestamp(datetime.now(timezone.utc) - ago)
+
+
+def test_no_token_asks_for_a_resync(client):
+    response = client.get("/posts/changes")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["full_resync"] is True
+    assert body["token"]
+
+
+def test_token_without_deletions(client, graph):
+    graph.tombstones.clear()
+    response = client.get("/posts/changes", params={"since": _token(timedelta(minutes=1))})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["full_resync"] is False
+    assert body["deleted"] == []
+
+
+def test_zero_rows_from_the_database(client, monkeypatch):
+    # What the query returned before each CALL aggregated: no row at all
+    monkeypatch.setitem(fake_graph.HANDLERS, "posts.changes", lambda g, p: [])
+    for params in ({}, {"since": _token(timedelta(minutes=1))}):
+        response = client.get("/posts/changes", params=params)
+        assert response.status_code == 200
+        assert response.json()["full_resync"] is True